@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+메모리 인지 작업 입장(admission) 스케줄러 - 상주 워커의 동시 작업을 메모리 예산 안에서만 실행
+- 작업별 최대 메모리 추정: 단계별 (기본 MB + MP당 MB) × 보정 계수, 이미지 크기는 헤더로 확인
+  기본 계수는 scripts/benchmark_stages.py 합성 인물 사진(1~12.6MP) 측정값
+- 보정: 작업이 단독 실행된 경우 실측 최대 RSS 증가량으로 단계별 계수 갱신 (증가는 빠르게, 감소는 천천히)
+  계수는 파일로 저장해 워커 재시작 후에도 유지
+- 입장: 예상 사용량 합이 예산 이내이고 동시 실행 수가 상한 미만일 때만 실행, 나머지는 우선순위 대기열
+  대기열은 우선순위 → 도착 순 (앞 작업이 들어갈 자리가 날 때까지 뒤 작업도 대기 - 큰 작업 기아 방지)
+  예산보다 큰 작업은 다른 작업이 없을 때 단독 실행
+
+환경 변수:
+- MEART_MEMORY_BUDGET_MB=<MB>     작업 메모리 예산 (기본: 사용 가능 메모리(cgroup 제한 반영)의 70%)
+- MEART_MAX_JOBS=<정수>            동시 실행 상한 (기본 CPU 수)
+- MEART_MEMORY_PROFILE=<경로>      보정 계수 파일 (기본 cache/memory_profile.json)
+"""
+import os
+import json
+import time
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+from image_loader import probe_image, temp_path
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_PATH = os.environ.get("MEART_MEMORY_PROFILE", os.path.join(BASE_DIR, "cache", "memory_profile.json"))
+
+# 작업 → (기본 MB, MP당 MB) - 예열된 프로세스 기준 최대 RSS 증가량
+# (pyramid GrabCut, 3:4 합성 인물 사진 1024/2048/4096px 측정. brush_effect는 TensorFlow 미측정 추정값)
+DEFAULT_COSTS = {
+    "u2net_remove_bg": (10.0, 80.0),
+    "advanced_bg_remove": (10.0, 105.0),
+    "simple_bg_remove": (12.0, 14.0),
+    "simple_emotion": (10.0, 30.0),
+    "emotion_analysis": (20.0, 3.0),
+    "emotion_analysis_batch": (20.0, 3.0),
+    "brush_effect_minimal": (20.0, 12.0),
+    "brush_effect_batch": (600.0, 40.0),
+    "pipeline": (40.0, 150.0),
+    "recommend_artworks": (1.0, 0.0),
+}
+UNKNOWN_COST = (100.0, 100.0)
+# 크기를 알 수 없는 입력은 12MP(4000x3000 업로드)로 가정
+DEFAULT_MEGAPIXELS = 12.0
+# 작업 인자 중 이미지 경로로 볼 키 (앞에서부터)
+_PATH_KEYS = ("input_path", "image_path")
+_FACTOR_RANGE = (0.5, 4.0)
+_SAMPLE_INTERVAL = 0.02
+
+def _cgroup_limit_bytes():
+    """컨테이너 메모리 제한 (cgroup v2/v1, 없으면 None)"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < (1 << 60):
+            return int(value)
+    return None
+
+def default_budget_mb():
+    """기본 예산: 사용 가능 메모리의 70% (cgroup 제한이 더 작으면 제한 - 현재 RSS 기준)"""
+    env = os.environ.get("MEART_MEMORY_BUDGET_MB")
+    if env:
+        return float(env)
+    available = None
+    if HAS_PSUTIL:
+        available = psutil.virtual_memory().available
+        limit = _cgroup_limit_bytes()
+        if limit is not None:
+            available = min(available, limit - psutil.Process().memory_info().rss)
+    if not available or available <= 0:
+        return 1024.0
+    return round(available * 0.7 / 1024 / 1024, 1)
+
+def _megapixels(task, args):
+    paths = [args.get(key) for key in _PATH_KEYS] + list(args.get("image_paths") or ())[:1]
+    for path in paths:
+        if path:
+            try:
+                info = probe_image(path)
+            except (OSError, ValueError):
+                info = None
+            if info is not None:
+                return info.width * info.height / 1e6
+    return DEFAULT_MEGAPIXELS
+
+def _job_count(task, args):
+    """배치 작업의 이미지/스타일 수 (추정치에 곱함)"""
+    if task == "emotion_analysis_batch":
+        return max(1, len(args.get("image_paths") or ()))
+    if task == "brush_effect_batch":
+        return max(1, len(args.get("style_paths") or ()))
+    return 1
+
+class MemoryModel:
+    """작업별 메모리 추정 + 실측 보정"""
+
+    def __init__(self, costs=None, profile_path=PROFILE_PATH):
+        self.costs = dict(DEFAULT_COSTS, **(costs or {}))
+        self.profile_path = profile_path
+        self.factors = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.profile_path:
+            return
+        try:
+            with open(self.profile_path, encoding="utf-8") as f:
+                self.factors = {k: float(v) for k, v in json.load(f).get("factors", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            self.factors = {}
+
+    def _save(self):
+        if not self.profile_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.profile_path) or ".", exist_ok=True)
+            tmp_path = temp_path(self.profile_path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"factors": self.factors}, f, indent=2)
+            os.replace(tmp_path, self.profile_path)
+        except OSError as e:
+            print(f"⚠️ 메모리 보정 계수 저장 실패: {e}")
+
+    def base_estimate(self, task, megapixels, count=1):
+        base, per_mp = self.costs.get(task, UNKNOWN_COST)
+        return (base + per_mp * megapixels) * count
+
+    def estimate(self, task, args):
+        """작업 → (예상 최대 MB, 메가픽셀)"""
+        args = args or {}
+        megapixels = _megapixels(task, args)
+        raw = self.base_estimate(task, megapixels, _job_count(task, args))
+        return round(raw * self.factors.get(task, 1.0), 1), megapixels
+
+    def observe(self, task, args, megapixels, peak_mb):
+        """단독 실행 실측치로 보정 계수 갱신 (과소 추정은 빠르게, 과대 추정은 천천히 반영)"""
+        raw = self.base_estimate(task, megapixels, _job_count(task, args or {}))
+        if raw <= 0 or peak_mb is None:
+            return
+        ratio = min(max(peak_mb / raw, _FACTOR_RANGE[0]), _FACTOR_RANGE[1])
+        with self._lock:
+            current = self.factors.get(task, 1.0)
+            rate = 0.5 if ratio > current else 0.1
+            self.factors[task] = round(current + rate * (ratio - current), 4)
+            self._save()
+
+class _Ticket:
+    __slots__ = ("task", "cost", "priority", "solo", "admitted")
+
+    def __init__(self, task, cost, priority):
+        self.task = task
+        self.cost = cost
+        self.priority = priority
+        self.solo = True
+        self.admitted = False
+
+class AdmissionScheduler:
+    """예상 메모리 합이 예산을 넘지 않도록 작업 입장을 제어"""
+
+    def __init__(self, budget_mb=None, max_jobs=None, model=None):
+        self.budget_mb = float(budget_mb if budget_mb is not None else default_budget_mb())
+        self.max_jobs = int(max_jobs or os.environ.get("MEART_MAX_JOBS") or os.cpu_count() or 1)
+        self.model = model or MemoryModel()
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._running = []
+        self._in_use = 0.0
+        self._stats = {"admitted": 0, "queued": 0, "max_queue": 0, "wait_seconds": 0.0}
+        self._warm = set()
+
+    def _fits(self, ticket):
+        if len(self._running) >= self.max_jobs:
+            return False
+        # 예산보다 큰 작업도 다른 작업이 없으면 단독 실행 (영구 대기 방지)
+        return not self._running or self._in_use + ticket.cost <= self.budget_mb
+
+    def _admit_ready(self):
+        while self._queue and self._fits(self._queue[0][2]):
+            ticket = heapq.heappop(self._queue)[2]
+            ticket.admitted = True
+            for other in self._running:
+                other.solo = False
+            ticket.solo = not self._running
+            self._running.append(ticket)
+            self._in_use += ticket.cost
+            self._stats["admitted"] += 1
+        self._cond.notify_all()
+
+    def acquire(self, task, cost, priority=0):
+        """입장할 때까지 대기 → 티켓 (priority가 클수록 먼저)"""
+        ticket = _Ticket(task, cost, priority)
+        started = time.perf_counter()
+        with self._cond:
+            heapq.heappush(self._queue, (-priority, next(self._seq), ticket))
+            self._admit_ready()
+            if not ticket.admitted:
+                self._stats["queued"] += 1
+                self._stats["max_queue"] = max(self._stats["max_queue"], len(self._queue))
+                print(f"⏳ 메모리 대기: {task} ~{cost:.0f}MB (사용 {self._in_use:.0f}/{self.budget_mb:.0f}MB, 대기 {len(self._queue)})")
+            while not ticket.admitted:
+                self._cond.wait()
+            self._stats["wait_seconds"] += time.perf_counter() - started
+        return ticket
+
+    def release(self, ticket):
+        with self._cond:
+            self._running.remove(ticket)
+            self._in_use = max(0.0, self._in_use - ticket.cost)
+            self._admit_ready()
+
+    @contextmanager
+    def admit(self, task, args=None, priority=0):
+        """작업 실행 구간: 입장 대기 → 실행 → (단독 실행이었으면) 실측 보정
+        프로세스에서 처음 실행되는 작업은 모델 로드 등 일회성 메모리가 섞이므로 보정에서 제외
+        """
+        cost, megapixels = self.model.estimate(task, args)
+        ticket = self.acquire(task, cost, priority)
+        with self._cond:
+            warm = task in self._warm
+            self._warm.add(task)
+        sampler = _PeakSampler() if HAS_PSUTIL else None
+        try:
+            yield ticket
+        finally:
+            peak_mb = sampler.stop() if sampler is not None else None
+            solo = ticket.solo
+            self.release(ticket)
+            if solo and warm and peak_mb is not None:
+                self.model.observe(task, args, megapixels, peak_mb)
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self._stats,
+                        budget_mb=self.budget_mb,
+                        max_jobs=self.max_jobs,
+                        in_use_mb=round(self._in_use, 1),
+                        running=[{"task": t.task, "cost_mb": t.cost} for t in self._running],
+                        waiting=len(self._queue),
+                        factors=dict(self.model.factors))
+
+class _PeakSampler:
+    """작업 실행 중 프로세스 RSS 최대 증가량 측정 (백그라운드 샘플링)"""
+
+    def __init__(self):
+        self._process = psutil.Process()
+        self._start = self._process.memory_info().rss
+        self._peak = self._start
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._done.wait(_SAMPLE_INTERVAL):
+            try:
+                self._peak = max(self._peak, self._process.memory_info().rss)
+            except Exception:
+                return
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+        try:
+            self._peak = max(self._peak, self._process.memory_info().rss)
+        except Exception:
+            pass
+        return (self._peak - self._start) / 1024 / 1024
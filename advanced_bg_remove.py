@@ -9,28 +9,21 @@ import os
 import numpy as np
 import cv2
 from PIL import Image, ImageFilter
-import json
+from face_detection import get_face_detections
+from grabcut_refine import DEFAULT_GRABCUT_MODE, grabcut, pop_grabcut_option
+from result_cache import get_cache
+from instrumentation import emit, stage
+from image_loader import load_pil, output_suffix, save_image
 
-def emit_progress(stage, data=None):
-    """진행 상황 출력"""
-    try:
-        payload = {"stage": stage}
-        if data:
-            payload.update(data)
-        print(f"PROGRESS: {json.dumps(payload, ensure_ascii=False)}")
-    except:
-        pass
-
-def detect_person_region(img_bgr):
-    """얼굴 검출 기반 인물 영역 추정"""
+def detect_person_region(img_bgr, image_path=None):
+    """얼굴 검출 기반 인물 영역 추정 (image_path가 있으면 공용 검출 기록 재사용)"""
     print("👤 인물 영역 검출 시작...")
     
     gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
     h, w = gray.shape
     
     # 1. 얼굴 검출
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+    faces = get_face_detections(image_path, gray)["faces"]
     
     if len(faces) == 0:
         print("⚠️ 얼굴 검출 실패, 중앙 영역 기반 추정")
@@ -64,8 +57,8 @@ def detect_person_region(img_bgr):
         'center': (face_center_x, face_center_y)
     }
 
-def create_precise_mask(img_bgr, person_region):
-    """정밀한 인물 마스크 생성"""
+def create_precise_mask(img_bgr, person_region, grabcut_mode=DEFAULT_GRABCUT_MODE):
+    """정밀한 인물 마스크 생성 (grabcut_mode: full | pyramid)"""
     print("🎯 정밀 마스크 생성 중...")
     
     h, w = img_bgr.shape[:2]
@@ -118,15 +111,13 @@ def create_precise_mask(img_bgr, person_region):
             grabcut_mask[body_bottom:h-border, :] = cv2.GC_BGD
         
         # GrabCut 실행
-        bgdModel = np.zeros((1, 65), np.float64)
-        fgdModel = np.zeros((1, 65), np.float64)
-        
-        cv2.grabCut(img_bgr, grabcut_mask, None, bgdModel, fgdModel, 3, cv2.GC_INIT_WITH_MASK)
+        grabcut_mask, grabcut_info = grabcut(img_bgr, grabcut_mask, None, 3, cv2.GC_INIT_WITH_MASK, strategy=grabcut_mode)
+        emit("grabcut", grabcut_info)
         
         # 결과 마스크 생성
         final_mask = np.where((grabcut_mask == cv2.GC_FGD) | (grabcut_mask == cv2.GC_PR_FGD), 255, 0).astype(np.uint8)
         
-        print("✅ GrabCut 정밀화 성공")
+        print(f"✅ GrabCut 정밀화 성공: {grabcut_info['strategy']} @ {grabcut_info['resolution']}")
         mask = final_mask
         
     except Exception as e:
@@ -144,44 +135,64 @@ def create_precise_mask(img_bgr, person_region):
     
     return mask
 
-def advanced_background_removal(input_path, output_path):
+def remove_background_array(img_bgr, image_path=None, grabcut_mode=DEFAULT_GRABCUT_MODE):
+    """BGR 배열에서 배경 제거 → RGBA 배열 (이미 디코딩된 배열 재사용)
+    - image_path가 있으면 얼굴 검출 기록(사이드카)을 공유
+    """
+    # 인물 영역 검출
+    with stage("person_detection", image=img_bgr, engine="haar_cascade"):
+        person_region = detect_person_region(img_bgr, image_path)
+    emit("person_detected", person_region)
+    
+    # 정밀 마스크 생성
+    with stage("mask", image=img_bgr, engine=grabcut_mode):
+        mask = create_precise_mask(img_bgr, person_region, grabcut_mode)
+    emit("mask_created")
+    
+    # 배경 제거 적용: 원본 이미지를 RGBA로 변환 후 마스크를 알파 채널로
+    print("🎨 배경 제거 적용 중...")
+    rgba_img = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGBA)
+    rgba_img[:, :, 3] = mask
+    return rgba_img
+
+def advanced_background_removal(input_path, output_path, grabcut_mode=DEFAULT_GRABCUT_MODE):
     """고급 인물 배경 제거"""
+    with stage("advanced_bg_remove", engine="face_grabcut", grabcut_mode=grabcut_mode) as record:
+        ok = _advanced_background_removal(input_path, output_path, grabcut_mode, record)
+        record.set(success=ok)
+        return ok
+
+def _advanced_background_removal(input_path, output_path, grabcut_mode, record):
     try:
-        emit_progress("start", {"input": input_path, "output": output_path})
+        emit("start", {"input": input_path, "output": output_path})
+        
+        # 동일 입력 결과 캐시 확인
+        cache = get_cache()
+        cache_key = cache.key(input_path, "advanced_bg_remove", {"grabcut_mode": grabcut_mode})
+        if cache.restore_file(cache_key, output_suffix(output_path), output_path):
+            emit("completed", {"output": output_path, "cached": True})
+            return True
         
         # 1. 이미지 로드
         print(f"📥 이미지 로드: {input_path}")
-        pil_img = Image.open(input_path).convert('RGB')
+        pil_img = load_pil(input_path, 'RGB')
         img_bgr = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
         h, w = img_bgr.shape[:2]
+        record.set(image=img_bgr)
         
-        emit_progress("loaded", {"size": [w, h]})
-        
-        # 2. 인물 영역 검출
-        person_region = detect_person_region(img_bgr)
-        emit_progress("person_detected", person_region)
-        
-        # 3. 정밀 마스크 생성
-        mask = create_precise_mask(img_bgr, person_region)
-        emit_progress("mask_created")
-        
-        # 4. 배경 제거 적용
-        print("🎨 배경 제거 적용 중...")
-        
-        # 원본 이미지를 RGBA로 변환
-        rgba_img = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGBA)
+        emit("loaded", {"size": [w, h]})
         
-        # 마스크를 알파 채널로 적용
-        rgba_img[:, :, 3] = mask
+        # 2~4. 인물 검출 → 정밀 마스크 → 알파 적용
+        rgba_img = remove_background_array(img_bgr, input_path, grabcut_mode)
         
         # PIL 이미지로 변환
         result_img = Image.fromarray(rgba_img, 'RGBA')
         
         # 5. 결과 저장
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        result_img.save(output_path, 'PNG')
+        save_image(result_img, output_path)
+        cache.put_file(cache_key, output_suffix(output_path), output_path)
         
-        emit_progress("completed", {"output": output_path})
+        emit("completed", {"output": output_path})
         print(f"✅ 고급 배경 제거 완료: {output_path}")
         
         return True
@@ -190,16 +201,21 @@ def advanced_background_removal(input_path, output_path):
         print(f"❌ 고급 배경 제거 실패: {e}")
         import traceback
         traceback.print_exc()
-        emit_progress("failed", {"error": str(e)})
+        emit("failed", {"error": str(e)})
         return False
 
 def main():
-    if len(sys.argv) < 3:
-        print('사용법: python advanced_bg_remove.py <input_path> <output_path>')
+    argv, grabcut_mode = pop_grabcut_option(sys.argv)
+    if "--batch" in argv:
+        from batch_runner import batch_main
+        sys.exit(batch_main(argv, "advanced_bg_remove", "advanced_background_removal", {"grabcut_mode": grabcut_mode}))
+    if len(argv) < 3:
+        print('사용법: python advanced_bg_remove.py <input_path> <output_path> [--grabcut full|pyramid]')
+        print('       python advanced_bg_remove.py --batch <디렉터리|manifest.jsonl> <출력 디렉터리> [--workers N] [--no-resume] [--grabcut full|pyramid]')
         sys.exit(1)
     
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
+    input_path = argv[1]
+    output_path = argv[2]
     
     print("=== 고급 인물 배경 제거 시작 ===")
     print(f"입력: {input_path}")
@@ -209,7 +225,7 @@ def main():
         print(f"❌ 입력 파일이 존재하지 않습니다: {input_path}")
         sys.exit(1)
     
-    if advanced_background_removal(input_path, output_path):
+    if advanced_background_removal(input_path, output_path, grabcut_mode):
         print("✅ 성공")
         sys.exit(0)
     else:
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BG_image 명화 사전 리사이즈 캐시
+배경/스타일 명화는 고정 카탈로그이므로 표준 목표 크기로 미리 리사이즈+크롭해 두고 재사용한다.
+- style: 384x384 중앙 정사각 크롭 (스타일 입력, load_style_image) → 원시 RGB 배열(.npy, 메모리 맵 로드)
+- composite: 1121x1500 합성 배경 (server.js 고정 크기 합성과 같은 fit: cover 중앙 크롭) → JPEG(.jpg)
+  server.js는 manifest.json에서 변형 JPEG를 찾아 원본 재디코딩/리사이즈 없이 바로 합성한다.
+
+무효화: 캐시 파일 이름에 원본의 mtime/크기 스탬프를 포함 → 원본이 바뀌면 자동으로 캐시 미스,
+오래된 파일은 prune_cache() (scripts/build_artwork_cache.py)에서 정리.
+
+환경 변수:
+- MEART_ARTWORK_CACHE_DIR=<경로>   캐시 디렉터리 (기본: cache/artworks)
+"""
+import os
+import json
+import numpy as np
+from PIL import Image, ImageOps
+from image_loader import load_pil, save_image, temp_path
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BG_DIR = os.path.join(BASE_DIR, "BG_image")
+CACHE_DIR = os.environ.get("MEART_ARTWORK_CACHE_DIR", os.path.join(BASE_DIR, "cache", "artworks"))
+MANIFEST_FILE = "manifest.json"
+
+# 변형 이름 → (너비, 높이)
+VARIANTS = {
+    "style": (384, 384),
+    "composite": (1121, 1500),
+}
+# 변형 이름 → 저장 형식 (소비자가 읽는 형식만 생성)
+VARIANT_FORMATS = {
+    "style": (".npy",),
+    "composite": (".jpg",),
+}
+JPEG_QUALITY = 92
+
+def is_artwork(path):
+    """BG_image 카탈로그에 속한 파일인지 (캐시는 카탈로그만 대상)"""
+    return bool(path) and os.path.dirname(os.path.abspath(path)) == BG_DIR and os.path.isfile(path)
+
+def _stamp(path):
+    st = os.stat(path)
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+def variant_path(path, variant, ext=".npy"):
+    """원본 + 변형 → 캐시 파일 경로 (원본 mtime/크기 스탬프 포함)"""
+    return os.path.join(CACHE_DIR, variant, f"{os.path.basename(path)}.{_stamp(path)}{ext}")
+
+def render_variant(path, variant):
+    """원본을 변형 크기로 리사이즈+중앙 크롭 (JPEG는 필요한 해상도까지만 디코딩)"""
+    size = VARIANTS[variant]
+    img = load_pil(path, 'RGB', cover=size)
+    return ImageOps.fit(img, size, Image.LANCZOS, centering=(0.5, 0.5))
+
+def _remove_stale(path, variant):
+    """같은 원본의 이전 스탬프 캐시 파일 삭제"""
+    directory = os.path.join(CACHE_DIR, variant)
+    prefix = os.path.basename(path) + "."
+    current = {os.path.basename(variant_path(path, variant, ext)) for ext in VARIANT_FORMATS[variant]}
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefix) and name not in current and not name.endswith(".tmp"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+def build_artwork(path, variants=None):
+    """원본 1장의 변형 캐시 생성 (이미 최신이면 건너뜀) → 생성한 변형 수"""
+    built = 0
+    for variant in variants or VARIANTS:
+        targets = [variant_path(path, variant, ext) for ext in VARIANT_FORMATS[variant]]
+        if all(os.path.exists(t) for t in targets):
+            continue
+        img = render_variant(path, variant)
+        for target in targets:
+            if target.endswith(".npy"):
+                save_image(np.asarray(img), target)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = temp_path(target)
+                img.save(tmp_path, "JPEG", quality=JPEG_QUALITY)
+                os.replace(tmp_path, target)
+        _remove_stale(path, variant)
+        built += 1
+    return built
+
+def get_artwork(path, variant):
+    """변형 배열 (H, W, 3) uint8 - 캐시 적중 시 메모리 맵, 미스 시 생성 후 반환"""
+    npy_path = variant_path(path, variant)
+    if not os.path.exists(npy_path):
+        try:
+            build_artwork(path, [variant])
+        except OSError as e:
+            # 캐시 디렉터리에 쓸 수 없으면 리사이즈 결과를 바로 사용
+            print(f"⚠️ 명화 캐시 저장 실패: {e}")
+            return np.asarray(render_variant(path, variant))
+    return np.load(npy_path, mmap_mode="r")
+
+def artwork_jpeg(path, variant):
+    """변형 JPEG 경로 (외부 합성 도구용) - 미스 시 생성"""
+    jpg_path = variant_path(path, variant, ".jpg")
+    if not os.path.exists(jpg_path):
+        build_artwork(path, [variant])
+    return jpg_path
+
+def prune_cache(artwork_paths):
+    """현재 카탈로그에 없는 원본/오래된 스탬프의 캐시 파일 삭제 → 삭제 수"""
+    current = {
+        os.path.basename(variant_path(p, variant, ext))
+        for p in artwork_paths for variant in VARIANTS for ext in VARIANT_FORMATS[variant]
+    }
+    removed = 0
+    for variant in VARIANTS:
+        directory = os.path.join(CACHE_DIR, variant)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if name not in current:
+                try:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
+
+def write_manifest(artwork_paths):
+    """원본 파일명 → 변형별 JPEG 상대 경로 매니페스트 (server.js 합성용)"""
+    jpeg_variants = [name for name in VARIANTS if ".jpg" in VARIANT_FORMATS[name]]
+    manifest = {"variants": {name: list(VARIANTS[name]) for name in jpeg_variants}, "artworks": {}}
+    for p in artwork_paths:
+        manifest["artworks"][os.path.basename(p)] = {
+            variant: os.path.relpath(variant_path(p, variant, ".jpg"), CACHE_DIR) for variant in jpeg_variants
+        }
+    path = os.path.join(CACHE_DIR, MANIFEST_FILE)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
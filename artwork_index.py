@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+명화 특징 벡터 색인 + 감정/사진 기반 추천 (벡터화 top-k)
+scripts/generate_bg_labels.py가 BG_image 전체의 특징을 하나의 밀집 행렬로 저장하고,
+요청 시에는 행렬 연산 한 번으로 모든 명화를 채점해 상위 k개를 고른다 (파일 스캔/무작위 없음).
+
+특징 (simple_emotion과 같은 통계):
+- color_histogram: RGB 결합 히스토그램 (simple_emotion.color_histogram, 64차원)
+- brightness / warmth / saturation: simple_emotion.image_statistics
+감정 친화도: 파일명 키워드 매칭 수를 감정별로 정규화한 (N, 7) 행렬 (레이블 감정 = 1.0)
+
+점수 = w_emotion * 감정 친화도 + w_color * 히스토그램 유사도(Bhattacharyya) + w_stats * 통계 유사도
+사진 특징이 없으면 감정 친화도만, 히스토그램이 없으면 통계만 사용한다.
+동점은 파일명 순서로 정렬 → 같은 입력이면 항상 같은 결과.
+
+server.js(getArtworkRecommendations)는 채점을 직접 하지 않고 워커 작업 recommend_artworks를 호출한다
+(워커를 쓸 수 없으면 --args-json으로 이 스크립트를 실행) → 채점 구현은 이 모듈 하나뿐이다.
+
+사용법:
+python artwork_index.py <emotion> [photo_path] [--top-k 6]
+python artwork_index.py --args-json args.json   # 워커 recommend_artworks와 같은 인자 (JSON 결과 출력)
+"""
+import os
+import sys
+import json
+import threading
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.environ.get("MEART_ARTWORK_INDEX", os.path.join(BASE_DIR, "BG_image_features.json"))
+
+EMOTIONS = ["happiness", "sadness", "anger", "surprise", "fear", "disgust", "neutral"]
+STAT_NAMES = ["brightness", "warmth", "saturation"]
+# server.js / emotion_analysis 등에서 쓰는 다른 감정 표기 → 색인 감정
+EMOTION_ALIASES = {
+    "happy": "happiness",
+    "sad": "sadness",
+    "angry": "anger",
+    "surprised": "surprise",
+}
+DEFAULT_WEIGHTS = {"emotion": 0.6, "color": 0.25, "stats": 0.15}
+DEFAULT_TOP_K = 6
+
+_lock = threading.Lock()
+_index = None
+_index_mtime = None
+
+def normalize_emotion(emotion):
+    emotion = (emotion or "neutral").lower()
+    return EMOTION_ALIASES.get(emotion, emotion)
+
+def artwork_features(image_path, max_side=256):
+    """명화 1장 → (히스토그램, [밝기, 색온도, 채도])
+    통계는 축소 디코딩 이미지 기준 (평균/표준편차라 원본과 차이가 무시할 수준)
+    """
+    from image_loader import load_pil
+    from simple_emotion import color_histogram, image_statistics
+    img_array = np.asarray(load_pil(image_path, 'RGB', max_side=max_side))
+    return color_histogram(img_array), list(image_statistics(img_array))
+
+def emotion_affinity(matches_by_emotion, label):
+    """감정별 키워드 매칭 목록 → 감정 친화도 벡터 (레이블 1.0, 나머지는 매칭 수 비율)"""
+    counts = np.array([len(matches_by_emotion.get(e, [])) for e in EMOTIONS], dtype=np.float64)
+    affinity = counts / counts.max() if counts.max() > 0 else counts
+    affinity[EMOTIONS.index(label)] = 1.0
+    return affinity
+
+def build_index(entries, weights=None):
+    """[{filename, label, histogram, stats, affinity}] → 색인 dict (JSON 저장용)"""
+    stats = np.array([e["stats"] for e in entries], dtype=np.float64)
+    scale = stats.std(axis=0) if len(entries) > 1 else np.ones(len(STAT_NAMES))
+    scale[scale < 1e-6] = 1.0
+    hist_dim = len(entries[0]["histogram"]) if entries else 0
+    return {
+        "version": 1,
+        "emotions": EMOTIONS,
+        "feature_names": [f"hist_{i}" for i in range(hist_dim)] + STAT_NAMES,
+        "stat_scale": [round(float(v), 4) for v in scale],
+        "weights": dict(weights or DEFAULT_WEIGHTS),
+        "filenames": [e["filename"] for e in entries],
+        "labels": [e["label"] for e in entries],
+        # (N, hist_dim + 3) 밀집 행렬: 히스토그램 다음에 밝기/색온도/채도
+        "features": [[round(float(v), 5) for v in e["histogram"]] + [round(float(v), 3) for v in e["stats"]] for e in entries],
+        # (N, 7) 감정 친화도
+        "affinity": [[round(float(v), 4) for v in e["affinity"]] for e in entries],
+    }
+
+def write_index(index, path=INDEX_PATH):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return path
+
+class ArtworkIndex:
+    """로드된 색인 - 채점에 필요한 행렬을 미리 계산해 둔다"""
+
+    def __init__(self, data):
+        self.filenames = data["filenames"]
+        self.labels = data["labels"]
+        self.emotions = data["emotions"]
+        self.weights = dict(DEFAULT_WEIGHTS, **data.get("weights", {}))
+        features = np.asarray(data["features"], dtype=np.float64).reshape(len(self.filenames), -1)
+        n_stats = len(STAT_NAMES)
+        # Bhattacharyya 계수 = sqrt(h_a) · sqrt(h_q) → 행렬곱 한 번
+        self.sqrt_hist = np.sqrt(np.clip(features[:, :-n_stats], 0, None))
+        self.stat_scale = np.asarray(data["stat_scale"], dtype=np.float64)
+        self.stats = features[:, -n_stats:] / self.stat_scale
+        self.affinity = np.asarray(data["affinity"], dtype=np.float64).reshape(len(self.filenames), -1)
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def emotion_vector(self, emotion=None, top_emotions=None):
+        """감정 1개 또는 top_emotions 확률 분포 → 감정 가중 벡터 (합 1)"""
+        vec = np.zeros(len(self.emotions))
+        for item in top_emotions or []:
+            name = normalize_emotion(item.get("emotion"))
+            if name in self.emotions:
+                vec[self.emotions.index(name)] += float(item.get("probability", 0.0))
+        if vec.sum() <= 0:
+            name = normalize_emotion(emotion)
+            vec[self.emotions.index(name) if name in self.emotions else self.emotions.index("neutral")] = 1.0
+        return vec / vec.sum()
+
+    def score(self, emotion=None, photo=None):
+        """모든 명화 점수 (N,) - photo: {"brightness", "warmth", "saturation", "color_histogram"} (모두 선택)"""
+        photo = photo or {}
+        weights = self.weights
+        scores = weights["emotion"] * (self.affinity @ self.emotion_vector(emotion, photo.get("top_emotions")))
+        hist = photo.get("color_histogram")
+        if hist is not None and len(hist) == self.sqrt_hist.shape[1]:
+            q = np.clip(np.asarray(hist, dtype=np.float64), 0, None)
+            q = np.sqrt(q / max(q.sum(), 1e-12))
+            scores += weights["color"] * (self.sqrt_hist @ q)
+        if all(photo.get(name) is not None for name in STAT_NAMES):
+            q = np.array([float(photo[name]) for name in STAT_NAMES]) / self.stat_scale
+            dist2 = ((self.stats - q) ** 2).sum(axis=1)
+            scores += weights["stats"] * np.exp(-0.5 * dist2 / len(STAT_NAMES))
+        return scores
+
+    def top_k(self, emotion=None, photo=None, k=DEFAULT_TOP_K, exclude=(), include=None):
+        """상위 k개 [{filename, label, score}] - 점수 내림차순, 동점은 색인 순서
+        include: 후보로 삼을 파일명 목록 (None이면 전체, 예: 실제 BG_image에 있는 파일만)
+        """
+        scores = self.score(emotion, photo)
+        if exclude:
+            excluded = set(exclude)
+            scores = np.where([f in excluded for f in self.filenames], -np.inf, scores)
+        if include is not None:
+            included = set(include)
+            scores = np.where([f in included for f in self.filenames], scores, -np.inf)
+        k = max(0, min(k, int(np.isfinite(scores).sum())))
+        if k == 0:
+            return []
+        candidates = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        # lexsort: 마지막 키가 1순위 (점수 내림차순), 그다음 색인 순서
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [
+            {"filename": self.filenames[i], "label": self.labels[i], "score": round(float(scores[i]), 4)}
+            for i in order
+        ]
+
+def load_index(path=INDEX_PATH):
+    """색인 로드 (프로세스 내 캐시, 파일이 갱신되면 다시 로드) - 없으면 None"""
+    global _index, _index_mtime
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    with _lock:
+        if _index is None or _index_mtime != mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                _index = ArtworkIndex(json.load(f))
+            _index_mtime = mtime
+            _warn_if_stale(_index)
+        return _index
+
+def _warn_if_stale(index, bg_dir=os.path.join(BASE_DIR, "BG_image")):
+    """BG_image에 색인에 없는 명화가 있으면 경고 (색인은 생성 산출물 - Docker 빌드에서 다시 만든다)"""
+    try:
+        names = {n for n in os.listdir(bg_dir) if os.path.splitext(n)[1].lower() in (".jpg", ".jpeg", ".png", ".webp")}
+    except OSError:
+        return
+    missing = names - set(index.filenames)
+    if missing:
+        print(f"⚠️ 명화 색인이 오래됨: BG_image의 {len(missing)}개 파일이 색인에 없음 (scripts/generate_bg_labels.py 실행 필요)")
+
+def recommend(emotion, photo=None, k=DEFAULT_TOP_K, exclude=(), include=None):
+    """감정(+사진 특징) → 추천 명화 상위 k개 (색인이 없으면 빈 리스트)"""
+    index = load_index()
+    if index is None:
+        return []
+    return index.top_k(emotion, photo, k, exclude, include)
+
+def recommend_from_args(args):
+    """워커 recommend_artworks / --args-json 공통 인자 dict → 추천 결과"""
+    return recommend(
+        args.get("emotion"),
+        args.get("photo"),
+        int(args.get("top_k", DEFAULT_TOP_K)),
+        args.get("exclude") or (),
+        args.get("include"),
+    )
+
+def main():
+    argv = list(sys.argv)
+    if len(argv) == 3 and argv[1] == "--args-json":
+        with open(argv[2], "r", encoding="utf-8") as f:
+            print(json.dumps(recommend_from_args(json.load(f)), ensure_ascii=False))
+        return
+    k = DEFAULT_TOP_K
+    if "--top-k" in argv:
+        i = argv.index("--top-k")
+        k = int(argv[i + 1])
+        del argv[i:i + 2]
+    if len(argv) < 2:
+        print('사용법: python artwork_index.py <emotion> [photo_path] [--top-k 6]')
+        sys.exit(1)
+
+    photo = None
+    if len(argv) > 2:
+        from simple_emotion import color_histogram, image_statistics
+        from image_loader import load_pil
+        img_array = np.asarray(load_pil(argv[2], 'RGB'))
+        brightness, warmth, saturation = image_statistics(img_array)
+        photo = {"brightness": brightness, "warmth": warmth, "saturation": saturation,
+                 "color_histogram": color_histogram(img_array).tolist()}
+
+    if load_index() is None:
+        print(f"❌ 색인 파일이 없습니다: {INDEX_PATH} (scripts/generate_bg_labels.py 실행 필요)")
+        sys.exit(1)
+    print(json.dumps(recommend(argv[1], photo, k), ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+추론 백엔드 선택 + 지연 로딩 + import 비용 측정
+- 백엔드: pil | tf | onnx | auto
+  설치 여부는 importlib.util.find_spec으로만 확인 (실제 import 없음) → PIL 경로는 TensorFlow/onnxruntime을 로드하지 않음
+  auto는 스크립트가 정한 우선순위에서 설치된 첫 백엔드, 명시한 백엔드가 없으면 경고 후 pil
+- --profile-imports: 이후 실행되는 모든 import의 모듈별 시간(자체/누적)과 최상위 import의 RSS 증가량을 stderr로 보고
+  스크립트 맨 앞에서 ImportProfiler.from_argv(sys.argv)로 설치해야 스크립트 자신의 import까지 측정된다
+
+사용 예:
+    profiler = ImportProfiler.from_argv(sys.argv)   # --profile-imports 없으면 아무것도 하지 않음
+    ...
+    backend = resolve_backend(pop_backend_option(sys.argv, "MEART_BRUSH_BACKEND"), BRUSH_BACKENDS)
+    profiler.report()
+"""
+import os
+import sys
+import time
+import builtins
+import importlib.util
+
+BACKEND_CHOICES = ("auto", "pil", "tf", "onnx")
+# 백엔드 → 필요한 모듈 (pil은 항상 사용 가능한 폴백)
+BACKEND_MODULES = {
+    "pil": (),
+    "tf": ("tensorflow", "tensorflow_hub"),
+    "onnx": ("onnxruntime",),
+}
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+def is_installed(*modules):
+    """모듈 설치 여부 (import하지 않고 find_spec으로만 확인)"""
+    for name in modules:
+        try:
+            if importlib.util.find_spec(name) is None:
+                return False
+        except (ImportError, ValueError):
+            return False
+    return True
+
+def backend_available(backend):
+    return backend in BACKEND_MODULES and is_installed(*BACKEND_MODULES[backend])
+
+def resolve_backend(requested, supported, ready=None):
+    """요청 백엔드 → 실제 사용할 백엔드
+    - supported: 스크립트가 지원하는 백엔드 (auto일 때 앞에서부터 시도, 마지막은 보통 pil)
+    - ready: 백엔드 → 추가 준비 확인 함수 (예: 모델 파일 존재), 모듈 설치와 함께 만족해야 사용
+    - 지원하지 않는 이름은 ValueError, 설치/준비되지 않은 백엔드는 경고 후 pil
+    """
+    ready = ready or {}
+    usable = lambda backend: backend_available(backend) and ready.get(backend, lambda: True)()
+    requested = (requested or "auto").lower()
+    if requested not in BACKEND_CHOICES:
+        raise ValueError(f"알 수 없는 백엔드: {requested} (선택: {'|'.join(BACKEND_CHOICES)})")
+    if requested == "auto":
+        for backend in supported:
+            if usable(backend):
+                return backend
+        return "pil"
+    if requested not in supported:
+        raise ValueError(f"이 스크립트는 {requested} 백엔드를 지원하지 않습니다 (선택: auto|{'|'.join(supported)})")
+    if not backend_available(requested):
+        print(f"⚠️ {requested} 백엔드 모듈이 설치되지 않음 ({', '.join(BACKEND_MODULES[requested])}) - pil로 대체")
+        return "pil"
+    if not usable(requested):
+        print(f"⚠️ {requested} 백엔드 준비 안 됨 (모델 파일 확인) - pil로 대체")
+        return "pil"
+    return requested
+
+def pop_backend_option(argv, env_var=None):
+    """argv에서 --backend <이름> (또는 --backend=<이름>)을 꺼내 반환 (없으면 환경 변수, 그다음 auto)
+    argv는 제자리에서 수정된다 (위치 인자 해석 전에 호출)
+    """
+    for i, arg in enumerate(argv):
+        if arg == "--backend":
+            if i + 1 >= len(argv):
+                raise ValueError("--backend 값이 필요합니다")
+            value = argv[i + 1]
+            del argv[i:i + 2]
+            return value
+        if arg.startswith("--backend="):
+            del argv[i]
+            return arg.split("=", 1)[1]
+    return os.environ.get(env_var, "auto") if env_var else "auto"
+
+class ImportProfiler:
+    """builtins.__import__를 감싸 새로 로드되는 모듈별 import 시간을 기록 (CLI 단일 스레드용)
+    - self_ms: 해당 모듈 본문 실행 시간 (하위 import 제외), cumulative_ms: 하위 import 포함
+    - rss_mb: 최상위 import(스크립트가 직접 한 import) 전후 RSS 증가량 (psutil 필요)
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.preloaded = len(sys.modules)
+        self._stack = []
+        self._original = None
+        self._process = psutil.Process() if HAS_PSUTIL else None
+
+    @classmethod
+    def from_argv(cls, argv, flag="--profile-imports"):
+        """argv에 flag가 있으면 제거하고 측정 시작, 없으면 비활성 프로파일러"""
+        if flag not in argv:
+            return _DisabledProfiler()
+        argv.remove(flag)
+        profiler = cls()
+        profiler.start()
+        return profiler
+
+    @property
+    def enabled(self):
+        return True
+
+    def _rss(self):
+        return self._process.memory_info().rss if self._process is not None else 0
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        loaded = name in sys.modules
+        if level or (loaded and not fromlist):
+            return self._original(name, globals, locals, fromlist, level)
+        # from 패키지 import 하위모듈 은 패키지가 이미 로드되어 있어도 새 모듈을 로드할 수 있음
+        label = f"{name} ({', '.join(fromlist)})" if loaded else name
+        modules_before = len(sys.modules)
+        top = not self._stack
+        rss_before = self._rss() if top else 0
+        self._stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            if len(sys.modules) > modules_before:
+                self._record(label, top, elapsed, children, rss_before)
+
+    def _record(self, label, top, elapsed, children, rss_before):
+        record = self.records.setdefault(label, {"module": label, "self_ms": 0.0, "cumulative_ms": 0.0, "top_level": top})
+        record["self_ms"] += (elapsed - children) * 1000
+        record["cumulative_ms"] += elapsed * 1000
+        if top and self._process is not None:
+            record["rss_mb"] = round(record.get("rss_mb", 0.0) + (self._rss() - rss_before) / 1024 / 1024, 1)
+
+    def start(self):
+        if self._original is None:
+            self._original = builtins.__import__
+            builtins.__import__ = self._import
+        return self
+
+    def stop(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def summary(self, limit=25):
+        """측정 결과 dict (누적 시간 내림차순)"""
+        records = sorted(self.records.values(), key=lambda r: r["cumulative_ms"], reverse=True)
+        top_level = [r for r in records if r["top_level"]]
+        return {
+            "total_ms": round(sum(r["cumulative_ms"] for r in top_level), 1),
+            "modules": len(records),
+            "preloaded_modules": self.preloaded,
+            "rss_mb": round(sum(r.get("rss_mb", 0.0) for r in top_level), 1) if self._process is not None else None,
+            "top": [dict(r, self_ms=round(r["self_ms"], 1), cumulative_ms=round(r["cumulative_ms"], 1)) for r in records[:limit]],
+        }
+
+    def report(self, limit=25, stream=None):
+        """import 비용 표를 stderr로 출력 (stdout 마지막 줄 JSON을 읽는 server.js와 분리)"""
+        self.stop()
+        stream = stream or sys.stderr
+        summary = self.summary(limit)
+        print(f"📦 import 비용: 모듈 {summary['modules']}개, 합계 {summary['total_ms']:.1f}ms"
+              + (f", RSS +{summary['rss_mb']:.1f}MB" if summary["rss_mb"] is not None else "")
+              + f" (측정 시작 전 로드된 모듈 {summary['preloaded_modules']}개 제외)", file=stream)
+        print(f"{'cumulative_ms':>14} {'self_ms':>10} {'rss_mb':>8}  module", file=stream)
+        for r in summary["top"]:
+            rss = f"{r['rss_mb']:.1f}" if "rss_mb" in r else "-"
+            print(f"{r['cumulative_ms']:>14.1f} {r['self_ms']:>10.1f} {rss:>8}  {'' if r['top_level'] else '  '}{r['module']}", file=stream)
+        return summary
+
+class _DisabledProfiler:
+    enabled = False
+
+    def stop(self):
+        pass
+
+    def report(self, limit=25, stream=None):
+        return None
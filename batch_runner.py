@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+배경 제거 일괄 처리 - 디렉터리 또는 JSONL 매니페스트를 프로세스 풀로 처리
+- 작업 목록: 디렉터리(하위 폴더 포함 이미지 전체) 또는 JSONL (한 줄에 {"input", "output"?, "params"?})
+- 코어 수만큼의 ProcessPoolExecutor에서 실행 (워커당 OpenCV 스레드 1개 → 과다 구독 방지)
+- 재개 가능: 출력이 이미 있고 이미지로 읽히면 건너뜀 (저장은 save_image의 원자적 교체라 중단된 파일은 남지 않음)
+- 결과는 끝나는 순서대로 stdout에 JSON 한 줄씩 출력, 마지막에 처리량 통계
+  자식 프로세스의 스크립트 로그는 stderr로 보냄 (결과 줄은 "event" 키가 있는 JSON)
+
+사용법 (각 배경 제거 스크립트의 --batch 모드):
+python u2net_remove_bg.py --batch <디렉터리|manifest.jsonl> <출력 디렉터리> [--workers N] [--no-resume] [--params '{"fg_threshold": 170}']
+python advanced_bg_remove.py --batch <디렉터리|manifest.jsonl> <출력 디렉터리> [--workers N] [--no-resume] [--grabcut full|pyramid]
+--params는 모든 작업의 기본 인자, 매니페스트 줄의 params가 우선
+"""
+import os
+import sys
+import json
+import time
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from image_loader import output_suffix, probe_image
+
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+def collect_jobs(source, output_dir, suffix=".png"):
+    """디렉터리/매니페스트 → [{"input", "output", "params"}]
+    디렉터리: 입력의 상대 경로를 유지해 <출력 디렉터리>/<상대 경로>.png 로 저장
+    매니페스트: output이 없으면 <출력 디렉터리>/<파일명>.png
+    """
+    jobs = []
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() not in IMAGE_EXTS or name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                rel = os.path.splitext(os.path.relpath(path, source))[0]
+                jobs.append({"input": path, "output": os.path.join(output_dir, rel + suffix), "params": {}})
+        return jobs
+
+    with open(source, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"매니페스트 {line_no}번째 줄 JSON 오류: {e}")
+            if "input" not in entry:
+                raise ValueError(f"매니페스트 {line_no}번째 줄에 input이 없습니다")
+            output = entry.get("output") or os.path.join(
+                output_dir, os.path.splitext(os.path.basename(entry["input"]))[0] + suffix)
+            jobs.append({"input": entry["input"], "output": output, "params": entry.get("params") or {}})
+    return jobs
+
+def is_valid_output(path):
+    """기존 출력이 완전한 이미지인지 (PNG는 전체 검증, .npy는 헤더)"""
+    try:
+        if os.path.getsize(path) == 0:
+            return False
+        if output_suffix(path) == ".npy":
+            return probe_image(path) is not None
+        from PIL import Image
+        with Image.open(path) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
+
+def _init_worker():
+    # 결과 줄과 섞이지 않도록 스크립트 로그는 stderr로, 프로세스 간 병렬이므로 OpenCV 내부 스레드는 1개
+    sys.stdout = sys.stderr
+    import cv2
+    cv2.setNumThreads(1)
+
+def _run_job(module_name, func_name, job, defaults):
+    """자식 프로세스: 작업 1건 실행 → 결과 dict"""
+    started = time.perf_counter()
+    params = dict(defaults, **job["params"])
+    try:
+        fn = getattr(importlib.import_module(module_name), func_name)
+        ok = fn(job["input"], job["output"], **params) is not False
+        error = None if ok else "processing failed"
+    except SystemExit as e:
+        ok, error = False, f"exited with code {e.code}"
+    except Exception as e:
+        ok, error = False, f"{type(e).__name__}: {e}"
+    info = None
+    try:
+        info = probe_image(job["input"])
+    except Exception:
+        pass
+    return {
+        "input": job["input"],
+        "output": job["output"],
+        "ok": ok,
+        "error": error,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "megapixels": round(info.width * info.height / 1e6, 2) if info else None,
+    }
+
+def _print_line(data):
+    sys.stdout.write(json.dumps(data, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def run_batch(jobs, module_name, func_name, defaults=None, workers=None, resume=True):
+    """작업 목록을 프로세스 풀로 실행, 결과를 완료 순서로 출력 → 통계 dict"""
+    defaults = defaults or {}
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    started = time.perf_counter()
+    pending, skipped = [], 0
+    for job in jobs:
+        if resume and is_valid_output(job["output"]):
+            skipped += 1
+            continue
+        pending.append(job)
+    print(f"📦 일괄 처리: 전체 {len(jobs)}개, 건너뜀 {skipped}개, 실행 {len(pending)}개, 워커 {workers}개", file=sys.stderr)
+
+    done, failed, latencies, megapixels = 0, 0, [], 0.0
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_worker) as pool:
+            futures = [pool.submit(_run_job, module_name, func_name, job, defaults) for job in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                done += 1
+                if result["ok"]:
+                    latencies.append(result["elapsed_ms"])
+                    megapixels += result["megapixels"] or 0.0
+                else:
+                    failed += 1
+                _print_line(dict(result, event="batch_result", done=done, total=len(pending)))
+
+    wall = time.perf_counter() - started
+    succeeded = done - failed
+    stats = {
+        "event": "batch_summary",
+        "total": len(jobs),
+        "skipped": skipped,
+        "processed": done,
+        "succeeded": succeeded,
+        "failed": failed,
+        "workers": workers,
+        "wall_s": round(wall, 2),
+        "images_per_s": round(succeeded / wall, 3) if wall > 0 else None,
+        "megapixels_per_s": round(megapixels / wall, 2) if wall > 0 else None,
+        "latency_ms_p50": _percentile(latencies, 0.5),
+        "latency_ms_p95": _percentile(latencies, 0.95),
+    }
+    _print_line(stats)
+    print(f"📊 완료 {succeeded}/{done} (실패 {failed}, 건너뜀 {skipped}) - {wall:.1f}s, "
+          f"{stats['images_per_s'] or 0:.2f}장/s, {stats['megapixels_per_s'] or 0:.1f}MP/s", file=sys.stderr)
+    return stats
+
+def batch_main(argv, module_name, func_name, defaults=None):
+    """스크립트의 --batch 모드 진입점: argv = [스크립트, --batch, 소스, 출력 디렉터리, 옵션...] → 종료 코드"""
+    args = [a for a in argv[1:] if a != "--batch"]
+    workers, resume = None, True
+    defaults = dict(defaults or {})
+    if "--params" in args:
+        i = args.index("--params")
+        if i + 1 >= len(args):
+            print("❌ --params 값이 필요합니다 (JSON 객체)", file=sys.stderr)
+            return 1
+        defaults.update(json.loads(args[i + 1]))
+        del args[i:i + 2]
+    if "--no-resume" in args:
+        args.remove("--no-resume")
+        resume = False
+    if "--workers" in args:
+        i = args.index("--workers")
+        if i + 1 >= len(args):
+            print("❌ --workers 값이 필요합니다", file=sys.stderr)
+            return 1
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+    if len(args) < 2:
+        print(f"사용법: python {os.path.basename(argv[0])} --batch <디렉터리|manifest.jsonl> <출력 디렉터리> [--workers N] [--no-resume] [--params JSON]", file=sys.stderr)
+        return 1
+    source, output_dir = args[0], args[1]
+    if not os.path.exists(source):
+        print(f"❌ 입력이 존재하지 않습니다: {source}", file=sys.stderr)
+        return 1
+    jobs = collect_jobs(source, output_dir)
+    stats = run_batch(jobs, module_name, func_name, defaults, workers, resume)
+    return 0 if stats["failed"] == 0 else 1
@@ -3,59 +3,97 @@
 """
 Neural Style Transfer 기반 브러쉬(유화) 효과 적용 스크립트
 참고: https://github.com/tensorflow/docs/blob/master/site/en/tutorials/generative/style_transfer.ipynb
-필요 패키지: tensorflow, tensorflow_hub, numpy, pillow
-설치: pip install tensorflow tensorflow_hub numpy pillow
-사용법: python brush_effect.py <input_path> <output_path> [<style_path>]
+필요 패키지: numpy, pillow + (onnxruntime 또는 tensorflow, tensorflow_hub)
+설치: pip install onnxruntime numpy pillow
+사용법: python brush_effect.py <input_path> <output_path> [<style_path>] [--backend onnx|tf|pil|auto] [--profile-imports]
+       python brush_effect.py --batch <input_path> <output_dir> <style_path> [<style_path> ...]
 - input_path: 배경 제거된 인물 PNG
 - output_path: 스타일 트랜스퍼 결과 PNG
 - style_path: (선택) 유화 스타일 이미지 경로 (없으면 기본값)
+- --backend: 스타일 트랜스퍼 백엔드 (기본 auto 또는 MEART_BRUSH_BACKEND)
+  onnx: 로컬 ONNX 모델 + onnxruntime (style_onnx, TensorFlow 불필요)
+  tf: TensorFlow Hub 모델 (BG_image 명화는 미리 계산된 스타일 임베딩 + TF Lite 변환 네트워크)
+  auto는 onnx → tf 순으로 사용 가능한 백엔드, 스타일 이미지가 없으면 pil
+  TensorFlow/onnxruntime은 실제 변환할 때만 import (pil 경로는 로드하지 않음)
+- --profile-imports: 모듈별 import 비용을 stderr로 보고
 """
 import sys
+from backends import ImportProfiler, backend_available, pop_backend_option
+
+# 스크립트 자신의 import까지 측정하도록 다른 import보다 먼저 설치 (모듈로 import될 때는 비활성)
+_import_profiler = ImportProfiler.from_argv(sys.argv if __name__ == "__main__" else [])
+
 import numpy as np
 from PIL import Image, ImageFilter, ImageEnhance
 import os
 import gc
+import json
+import threading
+import math
+from palette_quantize import DEFAULT_PALETTE_SIZE, build_palette, assign_palette
+from result_cache import get_cache
+from face_detection import file_sha256
+from style_embeddings import STYLE_INPUT_SIZE, load_style_image, lookup_style_bottleneck, stylize_with_bottleneck, stylize_batch_with_bottlenecks
+from tiled_executor import DEFAULT_MEMORY_BUDGET_MB, DEFAULT_MAX_WORKERS, tile_size_for_budget, run_tiled
+from instrumentation import stage
+from image_loader import load_pil, output_suffix, save_image
+import style_onnx
+from style_onnx import STYLE_BACKEND_ENGINES, resolve_style_backend
 
-# TensorFlow Neural Style Transfer 복원 (메모리 최적화)
-try:
-    import tensorflow as tf
-    import tensorflow_hub as hub
-    
-    # TensorFlow 메모리 최적화 설정
-    tf.config.experimental.enable_memory_growth = True
-    
-    # GPU 메모리 제한 (Render 환경 대응)
-    gpus = tf.config.list_physical_devices('GPU')
-    if gpus:
+# 설치 여부만 확인 (import 없음) - 실제 로드는 load_tensorflow()
+TENSORFLOW_AVAILABLE = backend_available("tf")
+
+_tf_modules = None
+# 상주 워커의 동시 작업이 모델을 중복 로드하지 않도록 지연 초기화를 직렬화
+_tf_lock = threading.Lock()
+_hub_model_lock = threading.Lock()
+
+def load_tensorflow():
+    """TensorFlow + Hub 지연 로드 (최초 호출 시 1회, 메모리/스레드 설정 포함) → (tf, hub)"""
+    with _tf_lock:
+        return _load_tensorflow()
+
+def _load_tensorflow():
+    global _tf_modules
+    if _tf_modules is None:
+        import tensorflow as tf
+        import tensorflow_hub as hub
+        
+        # TensorFlow 메모리 최적화 설정
+        tf.config.experimental.enable_memory_growth = True
+        
+        # GPU 메모리 제한 (Render 환경 대응)
+        gpus = tf.config.list_physical_devices('GPU')
+        if gpus:
+            try:
+                tf.config.experimental.set_memory_growth(gpus[0], True)
+                tf.config.experimental.set_virtual_device_configuration(
+                    gpus[0], [tf.config.experimental.VirtualDeviceConfiguration(memory_limit=512)]
+                )
+            except RuntimeError as e:
+                print(f"GPU 설정 실패: {e}")
+        
+        # CPU 스레드 제한 (메모리 절약)
         try:
-            tf.config.experimental.set_memory_growth(gpus[0], True)
-            tf.config.experimental.set_virtual_device_configuration(
-                gpus[0], [tf.config.experimental.VirtualDeviceConfiguration(memory_limit=512)]
-            )
+            tf.config.threading.set_intra_op_parallelism_threads(2)
+            tf.config.threading.set_inter_op_parallelism_threads(2)
         except RuntimeError as e:
-            print(f"GPU 설정 실패: {e}")
-    
-    # CPU 스레드 제한 (메모리 절약)
-    tf.config.threading.set_intra_op_parallelism_threads(2)
-    tf.config.threading.set_inter_op_parallelism_threads(2)
-    
-    TENSORFLOW_AVAILABLE = True
-    print("✅ TensorFlow Neural Style Transfer 사용 가능")
-    
-except ImportError as e:
-    print(f"TensorFlow 로드 실패: {e}")
-    print("PIL 기반 브러시 효과로 대체됩니다.")
-    TENSORFLOW_AVAILABLE = False
-except Exception as e:
-    print(f"TensorFlow 설정 실패: {e}")
-    print("PIL 기반 브러시 효과로 대체됩니다.")
-    TENSORFLOW_AVAILABLE = False
+            # 이미 다른 모듈(style_embeddings 등)이 런타임을 초기화한 경우
+            print(f"TensorFlow 스레드 설정 생략: {e}")
+        
+        _tf_modules = (tf, hub)
+        print("✅ TensorFlow Neural Style Transfer 로드 완료")
+    return _tf_modules
 
 # 전역 변수로 모델 캐시
 _hub_model = None
 
 def get_hub_model():
     """메모리 최적화된 TensorFlow Hub 모델 로드"""
+    with _hub_model_lock:
+        return _get_hub_model()
+
+def _get_hub_model():
     global _hub_model
     if _hub_model is None:
         try:
@@ -67,6 +105,7 @@ def get_hub_model():
             
             # 경량 모델 사용 (256x256)
             model_url = 'https://tfhub.dev/google/magenta/arbitrary-image-stylization-v1-256/2'
+            _, hub = load_tensorflow()
             _hub_model = hub.load(model_url)
             
             print("✅ TensorFlow Hub Neural Style Transfer 모델 로드 완료")
@@ -81,8 +120,8 @@ def get_hub_model():
     return _hub_model
 
 def load_img(path, max_dim=384):  # Render 메모리 최적화를 위해 384로 제한
-    """메모리 최적화된 이미지 로드"""
-    img = Image.open(path).convert('RGB')
+    """메모리 최적화된 이미지 로드 (JPEG는 max_dim 이상 최소 해상도로만 디코딩)"""
+    img = load_pil(path, 'RGB', max_side=max_dim)
     img = np.array(img)
     h, w = img.shape[:2]
     
@@ -97,6 +136,79 @@ def load_img(path, max_dim=384):  # Render 메모리 최적화를 위해 384로
     img = np.expand_dims(img, axis=0)
     return img
 
+def stylize_image(content_image, style_path, backend="tf"):
+    """콘텐츠 이미지에 스타일 적용 → (1, H, W, 3) [0, 1]
+    - onnx: 로컬 ONNX 모델로 스타일 예측 + 변환 (TensorFlow 미사용)
+    - tf: BG_image 명화는 미리 계산된 스타일 임베딩으로 변환 네트워크만 실행하고,
+      인덱스에 없는 스타일은 TensorFlow Hub 모델로 스타일 예측부터 실시간 수행한다.
+    """
+    if backend == "onnx":
+        print("🎭 스타일 이미지 로드 중...")
+        return style_onnx.stylize(content_image, load_style_image(style_path))
+    
+    try:
+        bottleneck = lookup_style_bottleneck(style_path)
+    except Exception as e:
+        print(f"⚠️ 스타일 임베딩 인덱스 조회 실패: {e}")
+        bottleneck = None
+    if bottleneck is not None:
+        try:
+            print("⚡ 미리 계산된 스타일 임베딩 사용 (스타일 예측 생략)")
+            return stylize_with_bottleneck(content_image, bottleneck)
+        except Exception as e:
+            print(f"⚠️ 임베딩 기반 변환 실패, 실시간 스타일 예측으로 대체: {e}")
+    
+    print("🎭 스타일 이미지 로드 중...")
+    # 배치 모드(stylize_batch)·스타일 임베딩과 같은 전처리 (중앙 정사각형 256) → 같은 캐시 키에 같은 결과
+    style_image = load_style_image(style_path)
+    
+    # TensorFlow Hub 모델 사용
+    hub_model = get_hub_model()
+    tf, _ = load_tensorflow()
+    content_tensor = tf.convert_to_tensor(content_image)
+    style_tensor = tf.convert_to_tensor(style_image)
+    return hub_model(content_tensor, style_tensor)[0]
+
+def stylize_batch(content_image, style_paths, backend="tf"):
+    """한 콘텐츠 이미지에 여러 스타일을 배치로 적용 → 스타일 순서대로 (H, W, 3) 배열 목록
+    - 임베딩이 있는 스타일 (tf): 변환 네트워크 1회 배치 실행
+    - 나머지: 256x256 스타일 이미지를 쌓아 hub/ONNX 모델 1회 배치 실행
+    """
+    results = [None] * len(style_paths)
+    indexed, live = [], []
+    for i, style_path in enumerate(style_paths):
+        bottleneck = None
+        if backend == "tf":
+            try:
+                bottleneck = lookup_style_bottleneck(style_path)
+            except Exception as e:
+                print(f"⚠️ 스타일 임베딩 인덱스 조회 실패: {e}")
+        (indexed if bottleneck is not None else live).append((i, style_path, bottleneck))
+    
+    if indexed:
+        try:
+            print(f"⚡ 미리 계산된 스타일 임베딩 {len(indexed)}개 배치 변환")
+            stylized = stylize_batch_with_bottlenecks(content_image, [b for _, _, b in indexed])
+            for (i, _, _), img in zip(indexed, stylized):
+                results[i] = img
+        except Exception as e:
+            print(f"⚠️ 임베딩 기반 배치 변환 실패, 실시간 스타일 예측으로 대체: {e}")
+            live.extend(indexed)
+    
+    if live:
+        print(f"🎭 스타일 이미지 {len(live)}개 배치 예측/변환")
+        style_batch = np.concatenate([load_style_image(path) for _, path, _ in live])
+        content_batch = np.repeat(content_image, len(live), axis=0)
+        if backend == "onnx":
+            stylized = style_onnx.stylize(content_batch, style_batch)
+        else:
+            hub_model = get_hub_model()
+            tf, _ = load_tensorflow()
+            stylized = hub_model(tf.convert_to_tensor(content_batch), tf.convert_to_tensor(style_batch))[0]
+        for (i, _, _), img in zip(live, np.asarray(stylized)):
+            results[i] = img
+    return results
+
 def tensor_to_image(tensor):
     tensor = tensor * 255
     tensor = np.array(tensor, dtype=np.uint8)
@@ -104,8 +216,56 @@ def tensor_to_image(tensor):
         tensor = tensor[0]
     return Image.fromarray(tensor)
 
-def apply_advanced_brush_effect_pil(image):
-    """Neural Style Transfer 스타일 고품질 브러시 효과 - 알파 채널 보존"""
+# 유화 필터 체인 파라미터 (타일 halo = 양방향 필터 반경 + Sobel 반경 + 블렌딩 폭)
+BILATERAL_SIGMA_SPATIAL = 15
+CHAIN_FEATHER = 8
+CHAIN_HALO = int(math.ceil(BILATERAL_SIGMA_SPATIAL * 3)) + 1 + CHAIN_FEATHER
+# 필터 체인의 픽셀당 작업 메모리 추정치 (float64 중간 배열 약 10장)
+CHAIN_BYTES_PER_PIXEL = 256
+
+def _oil_paint_chain(img_float, palette):
+    """유화 필터 체인 (타일 단위 실행 가능) - float [0, 1] RGB 입력/출력"""
+    from skimage import filters
+    from skimage.color import rgb2lab, lab2rgb
+    from skimage.restoration import denoise_bilateral
+    
+    # 2단계: 엣지 보존 디노이징 (유화의 부드러운 면 표현)
+    denoised = denoise_bilateral(img_float, sigma_color=0.2, sigma_spatial=BILATERAL_SIGMA_SPATIAL, channel_axis=2)
+    
+    # 3단계: 다방향 Sobel 필터 (브러시 스트로크 방향성)
+    gray = np.mean(img_float, axis=2)
+    edges_combined = np.hypot(filters.sobel_h(gray), filters.sobel_v(gray))
+    del gray
+    
+    # 4단계: 브러시 스트로크 강도 맵 생성
+    stroke_intensity = np.clip(edges_combined * 0.8, 0, 1)
+    del edges_combined
+    
+    # 5단계: 색상 클러스터링 (유화의 색상 단순화) - 전체 이미지 공통 팔레트로 매핑
+    simplified_img = assign_palette(img_float, palette)
+    
+    # 6단계: 브러시 스트로크 텍스처 적용
+    # 원본 40% + 부드러운 면 40% + 단순화된 색상 20% + 브러시 스트로크 강도에 따른 텍스처
+    stroke_texture = img_float * 0.4
+    stroke_texture += denoised * 0.4
+    del denoised
+    stroke_texture += simplified_img * 0.2
+    del simplified_img
+    stroke_texture += stroke_intensity[:, :, np.newaxis] * 0.15
+    
+    # 7단계: 유화 특유의 광택 효과
+    np.clip(stroke_texture, 0, 1, out=stroke_texture)
+    
+    # LAB 색상 공간에서 명도 조정 (유화의 깊이감)
+    lab_result = rgb2lab(stroke_texture)
+    lab_result[:, :, 0] *= 1.1  # 명도 증가
+    return lab2rgb(lab_result)
+
+def apply_advanced_brush_effect_pil(image, palette_size=DEFAULT_PALETTE_SIZE, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, max_workers=DEFAULT_MAX_WORKERS):
+    """Neural Style Transfer 스타일 고품질 브러시 효과 - 알파 채널 보존
+    - palette_size: 유화 색상 단순화 팔레트 크기
+    - memory_budget_mb / max_workers: 유화 필터 체인 타일 실행의 메모리 예산과 스레드 수
+    """
     print("Neural Style Transfer 스타일 브러시 효과 적용 중...")
     
     # 0. 알파 채널 보존을 위해 RGBA로 변환
@@ -169,70 +329,27 @@ def apply_advanced_brush_effect_pil(image):
     img_array = np.array(image)
     
     try:
-        from skimage import filters, segmentation, morphology, feature
         from skimage.util import img_as_float, img_as_ubyte
-        from skimage.color import rgb2lab, lab2rgb
-        from skimage.restoration import denoise_bilateral
+        import skimage.restoration  # noqa: F401 (미설치 시 기본 유화 효과로 대체)
         
         print("고급 Neural Style Transfer 유화 효과 시작...")
         
         # 이미지를 float로 변환
         img_float = img_as_float(img_array)
         
-        # 1단계: 색상 공간 변환 (LAB) - 더 자연스러운 색상 처리
-        lab_img = rgb2lab(img_float)
-        
-        # 2단계: 엣지 보존 디노이징 (유화의 부드러운 면 표현)
-        denoised = denoise_bilateral(img_float, sigma_color=0.2, sigma_spatial=15, channel_axis=2)
-        
-        # 3단계: 다방향 Sobel 필터 (브러시 스트로크 방향성)
-        gray = np.mean(img_float, axis=2)
-        edges_h = filters.sobel_h(gray)  # 수평 엣지
-        edges_v = filters.sobel_v(gray)  # 수직 엣지
-        edges_combined = np.sqrt(edges_h**2 + edges_v**2)
-        
-        # 4단계: 브러시 스트로크 강도 맵 생성
-        stroke_intensity = np.clip(edges_combined * 0.8, 0, 1)
-        
-        # 5단계: 색상 클러스터링 (유화의 색상 단순화)
-        h, w, c = img_float.shape
-        img_reshaped = img_float.reshape(-1, 3)
-        
-        # K-means 스타일 색상 단순화 (간단한 버전)
-        simplified_colors = np.zeros_like(img_reshaped)
-        for i in range(0, len(img_reshaped), max(1, len(img_reshaped)//1000)):
-            color = img_reshaped[i]
-            # 색상 양자화 (유화 스타일)
-            quantized = np.round(color * 8) / 8  # 8단계 양자화
-            simplified_colors[i] = quantized
-        
-        # 색상 보간으로 부드럽게 연결
-        for i in range(1, len(simplified_colors)):
-            if np.all(simplified_colors[i] == 0):
-                simplified_colors[i] = simplified_colors[i-1]
+        # 색상 팔레트는 전체 이미지 기준으로 한 번만 생성 (타일 간 색상 일관성)
+        palette = build_palette(img_float.reshape(-1, 3), palette_size)
         
-        simplified_img = simplified_colors.reshape(h, w, c)
-        
-        # 6단계: 브러시 스트로크 텍스처 적용
-        stroke_texture = np.zeros_like(img_float)
-        for i in range(3):
-            # 원본 + 디노이즈 + 엣지 기반 텍스처 혼합
-            stroke_texture[:, :, i] = (
-                img_float[:, :, i] * 0.4 +           # 원본 40%
-                denoised[:, :, i] * 0.4 +            # 부드러운 면 40%
-                simplified_img[:, :, i] * 0.2        # 단순화된 색상 20%
-            )
-            
-            # 브러시 스트로크 강도에 따른 텍스처 추가
-            stroke_texture[:, :, i] += stroke_intensity * 0.15
-        
-        # 7단계: 유화 특유의 광택 효과
-        stroke_texture = np.clip(stroke_texture, 0, 1)
-        
-        # LAB 색상 공간에서 명도 조정 (유화의 깊이감)
-        lab_result = rgb2lab(stroke_texture)
-        lab_result[:, :, 0] *= 1.1  # 명도 증가
-        stroke_texture = lab2rgb(lab_result)
+        # 메모리 예산 내 타일 크기로 분할하여 스레드 풀에서 실행, 겹침 영역 블렌딩
+        h, w = img_float.shape[:2]
+        tile_size = tile_size_for_budget(memory_budget_mb * 1024 * 1024, CHAIN_BYTES_PER_PIXEL, CHAIN_HALO, max_workers)
+        tiled = max(h, w) > tile_size
+        with stage("oil_paint_chain", image=img_float, engine="tiled" if tiled else "single", tile_size=tile_size):
+            if not tiled:
+                stroke_texture = _oil_paint_chain(img_float, palette)
+            else:
+                print(f"타일 실행: 타일 {tile_size}px (halo {CHAIN_HALO}px), 워커 {max_workers}개")
+                stroke_texture = run_tiled(img_float, lambda tile: _oil_paint_chain(tile, palette), CHAIN_HALO, tile_size, max_workers, CHAIN_FEATHER)
         
         img_array = img_as_ubyte(np.clip(stroke_texture, 0, 1))
         print("고급 Neural Style Transfer 유화 효과 완료!")
@@ -248,7 +365,6 @@ def apply_advanced_brush_effect_pil(image):
         quantized = np.round(img_float * 12) / 12
         
         # 부드러운 블러 효과
-        from PIL import ImageFilter
         temp_img = Image.fromarray((quantized * 255).astype(np.uint8))
         blurred = temp_img.filter(ImageFilter.GaussianBlur(radius=2.0))
         
@@ -293,19 +409,120 @@ def apply_advanced_brush_effect_pil(image):
     print("고급 PIL 브러시 효과 완료!")
     return image
 
+def finalize_brush_output(out_img, orig):
+    """원본 크기 복원 + 인물 보정 + 원본 알파 채널 적용"""
+    # 원본 크기로 리사이즈 (해상도 보존)
+    if out_img.size != orig.size:
+        out_img = out_img.resize(orig.size, Image.LANCZOS)
+        print(f"이미지 크기 조정: {out_img.size} → {orig.size}")
+    
+    # 브러시 효과 이미지를 RGBA로 변환
+    out_img = out_img.convert('RGBA')
+    
+    # 명도, 채도, 대비 조정 (인물 부분에만 적용)
+    enhanced_img = ImageEnhance.Brightness(out_img).enhance(1.08)  # 밝기 8% 증가
+    enhanced_img = ImageEnhance.Color(enhanced_img).enhance(1.10)   # 채도 10% 증가
+    enhanced_img = ImageEnhance.Contrast(enhanced_img).enhance(1.40) # 대비 40% 증가
+    
+    # 알파 마스크를 사용하여 투명한 부분은 완전히 투명하게, 불투명한 부분만 브러시 효과 적용
+    alpha_mask = orig.split()[-1]  # 원본 알파 채널 추출
+    
+    # 브러시 효과가 적용된 이미지에 원본 알파 채널 적용
+    enhanced_img.putalpha(alpha_mask)
+    return enhanced_img
+
+def brush_cache_key(cache, input_path, style_path, backend):
+    """브러시 결과 캐시 키 (단일/배치 모드 공용 → 배치로 미리 만든 결과를 단일 요청이 재사용)
+    backend: 실제 결과를 만든 백엔드 (pil이면 스타일 무관)
+    style_input: 스타일 이미지 전처리 (load_style_image, 단일/배치 공통) - 전처리가 바뀌면 이전 결과를 쓰지 않도록 키에 포함
+    """
+    use_style = backend != "pil"
+    return cache.key(input_path, "brush_effect", {
+        "style": file_sha256(style_path) if use_style else None,
+        "style_input": f"center{STYLE_INPUT_SIZE}" if use_style else None,
+        "backend": backend,
+    })
+
+def render_style_batch(input_path, output_dir, style_paths, backend=None):
+    """추천 명화 여러 개를 한 번에 렌더링 (콘텐츠 1회 디코딩, 모델 1회 배치 실행)
+    - backend: onnx | tf | auto (None이면 MEART_BRUSH_BACKEND)
+    반환: [{"style": 스타일 경로, "output": 출력 경로, "cached": bool}]
+    """
+    backend = resolve_style_backend(backend)
+    if backend == "pil":
+        raise RuntimeError("배치 스타일 트랜스퍼에는 onnx 또는 tf 백엔드가 필요합니다")
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    cache = get_cache()
+    results, pending = [], []
+    for style_path in style_paths:
+        style_stem = os.path.splitext(os.path.basename(style_path))[0]
+        output_path = os.path.join(output_dir, f"{stem}__{style_stem}.png")
+        key = brush_cache_key(cache, input_path, style_path, backend)
+        entry = {"style": style_path, "output": output_path, "cached": cache.restore_file(key, ".png", output_path)}
+        results.append(entry)
+        if not entry["cached"]:
+            pending.append((entry, key))
+    
+    if pending:
+        print(f"🎨 배치 스타일 트랜스퍼: {len(pending)}개 (캐시 적중 {len(results) - len(pending)}개)")
+        content_image = load_img(input_path, max_dim=384)
+        orig = load_pil(input_path, 'RGBA')
+        with stage("style_transfer", image=content_image, engine=STYLE_BACKEND_ENGINES[backend], styles=len(pending)):
+            stylized = stylize_batch(content_image, [entry["style"] for entry, _ in pending], backend)
+        for (entry, key), img in zip(pending, stylized):
+            out_img = finalize_brush_output(tensor_to_image(img), orig)
+            save_image(out_img, entry["output"])
+            cache.put_file(key, ".png", entry["output"])
+        del content_image, stylized, orig
+        gc.collect()
+    return results
+
+def main_batch(argv, backend="auto"):
+    """배치 모드: python brush_effect.py --batch <input_path> <output_dir> <style_path> [<style_path> ...]"""
+    if len(argv) < 3:
+        print('사용법: python brush_effect.py --batch <input_path> <output_dir> <style_path> [<style_path> ...]')
+        sys.exit(1)
+    input_path, output_dir, style_paths = argv[0], argv[1], argv[2:]
+    missing = [p for p in style_paths if not os.path.exists(p)]
+    if missing:
+        print(f"❌ 스타일 이미지가 존재하지 않습니다: {missing}")
+        sys.exit(1)
+    if backend == "pil":
+        print("❌ 배치 스타일 트랜스퍼에는 onnx 또는 tf 백엔드가 필요합니다")
+        sys.exit(1)
+    try:
+        results = render_style_batch(input_path, output_dir, style_paths, backend)
+    except Exception as e:
+        print(f'오류 발생: {e}')
+        sys.exit(1)
+    # JSON 출력 (서버에서 마지막 줄 파싱)
+    print(json.dumps({"success": True, "outputs": results}, ensure_ascii=False))
+
 def main():
-    if len(sys.argv) < 3:
-        print('사용법: python brush_effect.py <input_path> <output_path> [<style_path>]')
+    argv = list(sys.argv)
+    try:
+        backend = resolve_style_backend(pop_backend_option(argv, "MEART_BRUSH_BACKEND"))
+    except ValueError as e:
+        print(f"❌ {e}")
         sys.exit(1)
     
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
+    if len(argv) >= 2 and argv[1] == '--batch':
+        main_batch(argv[2:], backend)
+        return
+    
+    if len(argv) < 3:
+        print('사용법: python brush_effect.py <input_path> <output_path> [<style_path>] [--backend onnx|tf|pil|auto] [--profile-imports]')
+        sys.exit(1)
+    
+    input_path = argv[1]
+    output_path = argv[2]
     
     # 스타일 이미지 설정 (Neural Style Transfer용)
     style_path = None
-    if TENSORFLOW_AVAILABLE:
-        if len(sys.argv) >= 4:
-            style_path = sys.argv[3]
+    if backend != "pil":
+        if len(argv) >= 4:
+            style_path = argv[3]
         else:
             # 기본 스타일 이미지 (유화 스타일)
             style_candidates = [
@@ -323,16 +540,27 @@ def main():
             if not style_path:
                 print("⚠️ 기본 스타일 이미지를 찾을 수 없습니다. PIL 효과로 대체됩니다.")
     
-    print(f"🚀 브러시 효과 시작 - TensorFlow: {TENSORFLOW_AVAILABLE}, 스타일: {bool(style_path)}")
+    # 스타일 이미지가 없으면 모델을 로드하지 않고 PIL 효과 사용
+    if backend != "pil" and not (style_path and os.path.exists(style_path)):
+        backend = "pil"
+    print(f"🚀 브러시 효과 시작 - 백엔드: {backend}, 스타일: {bool(style_path)}")
     
     try:
+        # 동일 입력 + 스타일 결과 캐시 확인
+        use_style = backend != "pil"
+        cache = get_cache()
+        cache_key = brush_cache_key(cache, input_path, style_path, backend)
+        if cache.restore_file(cache_key, output_suffix(output_path), output_path):
+            print('브러시 효과 완료:', output_path)
+            return
+        
         # 이미지 로드 (알파 채널 보존)
-        orig_img = Image.open(input_path).convert('RGBA')
+        orig_img = load_pil(input_path, 'RGBA')
         
-        # TensorFlow Neural Style Transfer 시도
-        if TENSORFLOW_AVAILABLE and style_path and os.path.exists(style_path):
+        # Neural Style Transfer 시도 (onnx / tf)
+        if use_style:
             try:
-                print("🎨 TensorFlow Neural Style Transfer 시작...")
+                print(f"🎨 Neural Style Transfer 시작 ({STYLE_BACKEND_ENGINES[backend]})...")
                 
                 # 메모리 정리
                 gc.collect()
@@ -341,71 +569,44 @@ def main():
                 print("📥 콘텐츠 이미지 로드 중...")
                 content_image = load_img(input_path, max_dim=384)
                 
-                print("🎭 스타일 이미지 로드 중...")
-                style_image = load_img(style_path, max_dim=256)  # 스타일은 더 작게
-                
-                # TensorFlow Hub 모델 사용
+                # 스타일 트랜스퍼 실행 (미리 계산된 스타일 임베딩 우선)
                 print("🧠 Neural Style Transfer 모델 적용 중...")
-                hub_model = get_hub_model()
-                
-                # TensorFlow 텐서로 변환
-                content_tensor = tf.convert_to_tensor(content_image)
-                style_tensor = tf.convert_to_tensor(style_image)
-                
-                # 스타일 트랜스퍼 실행
-                stylized_image = hub_model(content_tensor, style_tensor)[0]
+                with stage("style_transfer", image=content_image, engine=STYLE_BACKEND_ENGINES[backend]):
+                    stylized_image = stylize_image(content_image, style_path, backend)
                 
                 # 결과 이미지 변환
                 out_img = tensor_to_image(stylized_image)
-                print("✅ TensorFlow Neural Style Transfer 완료!")
+                print("✅ Neural Style Transfer 완료!")
                 
                 # 메모리 정리
-                del content_image, style_image, content_tensor, style_tensor, stylized_image
+                del content_image, stylized_image
                 gc.collect()
                 
             except Exception as e:
-                print(f"❌ TensorFlow Neural Style Transfer 실패: {e}")
+                print(f"❌ Neural Style Transfer 실패: {e}")
                 print("🔄 PIL 기반 고급 브러시 효과로 대체됩니다...")
                 out_img = apply_advanced_brush_effect_pil(orig_img)
+                cache_key = brush_cache_key(cache, input_path, style_path, "pil")
         else:
             # PIL 기반 브러시 효과 사용
-            if not TENSORFLOW_AVAILABLE:
-                print("🎨 TensorFlow 없음 - PIL 기반 Neural Style Transfer 스타일 브러시 효과 사용")
-            else:
+            if not (TENSORFLOW_AVAILABLE or style_onnx.model_available()):
+                print("🎨 TensorFlow/ONNX 스타일 모델 없음 - PIL 기반 Neural Style Transfer 스타일 브러시 효과 사용")
+            elif not style_path:
                 print("🎨 스타일 이미지 없음 - PIL 기반 Neural Style Transfer 스타일 브러시 효과 사용")
+            else:
+                print("🎨 pil 백엔드 선택 - PIL 기반 Neural Style Transfer 스타일 브러시 효과 사용")
             out_img = apply_advanced_brush_effect_pil(orig_img)
         
         # 알파 채널(투명도) 보존 및 투명 영역 보호
-        orig = Image.open(input_path).convert('RGBA')
-        
-        # 원본 크기로 리사이즈 (해상도 보존)
-        if out_img.size != orig.size:
-            out_img = out_img.resize(orig.size, Image.LANCZOS)
-            print(f"이미지 크기 조정: {out_img.size} → {orig.size}")
-        
-        # 브러시 효과 이미지를 RGBA로 변환
-        out_img = out_img.convert('RGBA')
-        
-        # 명도, 채도, 대비 조정 (인물 부분에만 적용)
-        enhanced_img = ImageEnhance.Brightness(out_img).enhance(1.08)  # 밝기 8% 증가
-        enhanced_img = ImageEnhance.Color(enhanced_img).enhance(1.10)   # 채도 10% 증가
-        enhanced_img = ImageEnhance.Contrast(enhanced_img).enhance(1.40) # 대비 40% 증가
+        orig = load_pil(input_path, 'RGBA')
+        out_img = finalize_brush_output(out_img, orig)
         
-        # 알파 마스크를 사용하여 투명한 부분은 완전히 투명하게, 불투명한 부분만 브러시 효과 적용
-        alpha_mask = orig.split()[-1]  # 원본 알파 채널 추출
-        
-        # 브러시 효과가 적용된 이미지에 원본 알파 채널 적용
-        enhanced_img.putalpha(alpha_mask)
-        
-        out_img = enhanced_img
-        
-        out_img.save(output_path)
+        save_image(out_img, output_path)
+        cache.put_file(cache_key, output_suffix(output_path), output_path)
         print('브러시 효과 완료:', output_path)
         
         # 메모리 정리
         del orig_img, out_img, orig
-        if 'content_image' in locals():
-            del content_image, style_image, stylized_image
         gc.collect()
         
     except Exception as e:
@@ -413,4 +614,7 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    try:
+        main()
+    finally:
+        _import_profiler.report() 
\ No newline at end of file
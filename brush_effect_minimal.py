@@ -2,26 +2,60 @@
 # -*- coding: utf-8 -*-
 """
 최소 브러시 효과 스크립트 - 즉시 작동 보장
+사용법: python brush_effect_minimal.py <input_path> <output_path> [--backend onnx|tf|pil|auto]
+- 스타일 트랜스퍼 백엔드: onnx(style_onnx, TensorFlow 불필요) → tf → pil 순으로 자동 선택 (MEART_BRUSH_BACKEND)
 """
 import sys
 import os
+import threading
 from PIL import Image, ImageFilter, ImageEnhance
 import numpy as np
+import importlib.util
+from result_cache import get_cache
+from instrumentation import stage
+from image_loader import load_pil, output_suffix, save_image
+from backends import pop_backend_option
+import style_onnx
+from style_onnx import STYLE_BACKEND_ENGINES, resolve_style_backend
 
-def apply_minimal_brush_effect(image):
-    """고급 브러시 효과 - Neural Style Transfer 시도 후 PIL 폴백"""
+HAS_TENSORFLOW = importlib.util.find_spec("tensorflow") is not None and importlib.util.find_spec("tensorflow_hub") is not None
+
+# 전역 변수로 모델 캐시 (상주 워커에서 재사용)
+_hub_model = None
+_hub_model_lock = threading.Lock()
+
+def get_hub_model():
+    """TensorFlow Hub 스타일 트랜스퍼 모델 로드 (프로세스당 1회, 동시 요청은 락으로 1회만 로드)"""
+    global _hub_model
+    with _hub_model_lock:
+        if _hub_model is None:
+            import tensorflow_hub as hub
+            model_url = 'https://tfhub.dev/google/magenta/arbitrary-image-stylization-v1-256/2'
+            _hub_model = hub.load(model_url)
+    return _hub_model
+
+def warm_style_model(backend=None):
+    """상주 워커 예열: 선택된 백엔드의 스타일 모델을 미리 로드 (pil이면 없음)"""
+    backend = resolve_style_backend(backend)
+    if backend == "onnx":
+        style_onnx.get_style_session()
+    elif backend == "tf":
+        get_hub_model()
+    return backend
+
+def apply_minimal_brush_effect(image, backend=None):
+    """고급 브러시 효과 - Neural Style Transfer(onnx/tf) 시도 후 PIL 폴백
+    backend: onnx | tf | pil | auto (None이면 MEART_BRUSH_BACKEND)
+    반환: (이미지, 실제 사용한 백엔드) - 스타일 트랜스퍼 실패로 폴백하면 "pil"
+    """
     print("🎨 고급 브러시 효과 적용 중...")
+    backend = resolve_style_backend(backend)
+    if backend == "pil":
+        return apply_pil_brush_effect(image), "pil"
     
-    # TensorFlow Neural Style Transfer 시도
+    # Neural Style Transfer 시도
     try:
-        import tensorflow as tf
-        import tensorflow_hub as hub
-        import numpy as np
-        
-        print("🧠 TensorFlow Neural Style Transfer 시도...")
-        
-        # 메모리 최적화 설정
-        tf.config.experimental.enable_memory_growth = True
+        print(f"🧠 Neural Style Transfer 시도 ({STYLE_BACKEND_ENGINES[backend]})...")
         
         # 이미지를 RGB로 변환하여 처리
         rgb_img = image.convert('RGB')
@@ -36,25 +70,28 @@ def apply_minimal_brush_effect(image):
             rgb_img = rgb_img.resize((new_w, new_h), Image.LANCZOS)
             img_array = np.array(rgb_img).astype(np.float32) / 255.0
         
-        # TensorFlow 텐서로 변환
-        content_tensor = tf.convert_to_tensor(img_array[np.newaxis, ...])
-        
         # 기본 유화 스타일 생성 (간단한 스타일)
         style_array = np.copy(img_array)
         
         # 유화 스타일 특성 적용
         style_array = apply_oil_painting_transform(style_array)
-        style_tensor = tf.convert_to_tensor(style_array[np.newaxis, ...])
-        
-        # TensorFlow Hub 모델 로드
-        model_url = 'https://tfhub.dev/google/magenta/arbitrary-image-stylization-v1-256/2'
-        hub_model = hub.load(model_url)
         
-        # 스타일 트랜스퍼 실행
-        stylized = hub_model(content_tensor, style_tensor)[0]
+        # 스타일 트랜스퍼 실행 (모델은 프로세스당 1회 로드 후 재사용)
+        if backend == "onnx":
+            stylized = style_onnx.stylize(img_array[np.newaxis, ...], style_array[np.newaxis, ...])[0]
+        else:
+            import tensorflow as tf
+            
+            # 메모리 최적화 설정
+            tf.config.experimental.enable_memory_growth = True
+            content_tensor = tf.convert_to_tensor(img_array[np.newaxis, ...])
+            style_tensor = tf.convert_to_tensor(style_array[np.newaxis, ...])
+            stylized = get_hub_model()(content_tensor, style_tensor)[0].numpy()
         
         # 결과 변환
-        result_array = (stylized.numpy() * 255).astype(np.uint8)
+        result_array = (np.clip(stylized, 0, 1) * 255).astype(np.uint8)
+        if result_array.ndim > 3:
+            result_array = result_array[0]
         result_img = Image.fromarray(result_array)
         
         # 원본 크기로 복원
@@ -67,15 +104,18 @@ def apply_minimal_brush_effect(image):
             alpha_channel = image.split()[-1]
             result_img.putalpha(alpha_channel)
         
-        print("✅ TensorFlow Neural Style Transfer 성공!")
-        return result_img
+        print("✅ Neural Style Transfer 성공!")
+        return result_img, backend
         
     except Exception as e:
-        print(f"❌ TensorFlow Neural Style Transfer 실패: {e}")
+        print(f"❌ Neural Style Transfer 실패: {e}")
         print("🔄 PIL 기반 브러시 효과로 대체...")
     
     # PIL 기반 폴백 효과
-    
+    return apply_pil_brush_effect(image), "pil"
+
+def apply_pil_brush_effect(image):
+    """PIL 기반 브러시 효과 (TensorFlow 미사용 폴백)"""
     # 알파 채널 보존
     has_alpha = image.mode == 'RGBA'
     if has_alpha:
@@ -117,14 +157,8 @@ def apply_oil_painting_transform(img_array):
     
     return stylized
 
-def main():
-    if len(sys.argv) < 3:
-        print('사용법: python brush_effect_minimal.py <input_path> <output_path>')
-        sys.exit(1)
-    
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    
+def process_brush_effect(input_path, output_path, backend=None):
+    """입력 이미지에 브러시 효과를 적용하여 PNG로 저장 (backend: onnx | tf | pil | auto)"""
     try:
         print(f"📥 입력 이미지: {input_path}")
         print(f"📤 출력 이미지: {output_path}")
@@ -132,29 +166,55 @@ def main():
         # 입력 파일 확인
         if not os.path.exists(input_path):
             print(f"❌ 입력 파일이 존재하지 않습니다: {input_path}")
-            sys.exit(1)
+            return False
+        
+        # 동일 입력 결과 캐시 확인 (백엔드에 따라 결과가 다르므로 키에 포함)
+        backend = resolve_style_backend(backend)
+        cache = get_cache()
+        cache_key = cache.key(input_path, "brush_effect_minimal", {"backend": backend})
+        if cache.restore_file(cache_key, output_suffix(output_path), output_path):
+            return True
         
         # 이미지 로드
-        image = Image.open(input_path).convert('RGBA')
+        image = load_pil(input_path, 'RGBA')
         print(f"✅ 이미지 로드 완료: {image.size}")
         
         # 브러시 효과 적용
-        result = apply_minimal_brush_effect(image)
-        
-        # 출력 디렉토리 생성
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        # 결과 저장
-        result.save(output_path, 'PNG')
+        with stage("brush_effect_minimal", image=image, engine=STYLE_BACKEND_ENGINES[backend]) as record:
+            result, used_backend = apply_minimal_brush_effect(image, backend)
+            record.set(engine=STYLE_BACKEND_ENGINES[used_backend])
+        if used_backend != backend:
+            # 폴백 결과가 요청 백엔드의 캐시로 고정되지 않도록 실제 사용한 백엔드로 기록
+            cache_key = cache.key(input_path, "brush_effect_minimal", {"backend": used_backend})
+        
+        # 결과 저장 (출력 디렉토리 생성 포함, .npy 경로는 원시 배열)
+        save_image(result, output_path)
+        cache.put_file(cache_key, output_suffix(output_path), output_path)
         print(f"✅ 결과 저장 완료: {output_path}")
         
-        sys.exit(0)
+        return True
         
     except Exception as e:
         print(f"❌ 브러시 효과 처리 실패: {e}")
         import traceback
         traceback.print_exc()
+        return False
+
+def main():
+    argv = list(sys.argv)
+    try:
+        backend = resolve_style_backend(pop_backend_option(argv, "MEART_BRUSH_BACKEND"))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if len(argv) < 3:
+        print('사용법: python brush_effect_minimal.py <input_path> <output_path> [--backend onnx|tf|pil|auto]')
         sys.exit(1)
+    
+    input_path = argv[1]
+    output_path = argv[2]
+    
+    sys.exit(0 if process_brush_effect(input_path, output_path, backend) else 1)
 
 if __name__ == "__main__":
     main()
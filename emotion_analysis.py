@@ -1,17 +1,25 @@
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 sys.stderr.reconfigure(encoding='utf-8')
+from backends import ImportProfiler, backend_available, pop_backend_option, resolve_backend
+
+# --profile-imports: 스크립트 자신의 import까지 측정 (모듈로 import될 때는 비활성)
+_import_profiler = ImportProfiler.from_argv(sys.argv if __name__ == "__main__" else [])
+
 import os
 import json
 import numpy as np
 import cv2
+from face_detection import get_face_detections
+from result_cache import get_cache
+from instrumentation import stage
+from image_loader import load_cv2
 
-try:
-    import onnxruntime as ort
-    HAS_ORT = True
-except Exception:
-    ort = None
-    HAS_ORT = False
+# 감정 분석 백엔드 (auto일 때 앞에서부터): onnx = FER+ 모델, pil = 밝기 기반 기본 분석
+EMOTION_BACKENDS = ("onnx", "pil")
+DEFAULT_EMOTION_BACKEND = os.environ.get("MEART_EMOTION_BACKEND", "auto")
+# 설치 여부만 확인 - onnxruntime은 세션을 처음 만들 때 import
+HAS_ORT = backend_available("onnx")
 
 FERPLUS_EMOTIONS = [
     "neutral", "happiness", "surprise", "sadness",
@@ -19,6 +27,26 @@ FERPLUS_EMOTIONS = [
 ]
 
 ONNX_MODEL = os.path.join("models", "emotion-ferplus-8.onnx")
+# 양자화 변형 (scripts/quantize_emotion_model.py로 로컬 생성, 비교는 scripts/benchmark_emotion_models.py)
+# MEART_EMOTION_MODEL=fp32|int8-dynamic|int8-static|<모델 경로> (기본 fp32)
+EMOTION_MODEL_VARIANTS = {
+    "fp32": ONNX_MODEL,
+    "int8-dynamic": os.path.join("models", "emotion-ferplus-8.int8-dynamic.onnx"),
+    "int8-static": os.path.join("models", "emotion-ferplus-8.int8-static.onnx"),
+}
+DEFAULT_EMOTION_MODEL = os.environ.get("MEART_EMOTION_MODEL", "fp32")
+_missing_variants = set()
+
+def emotion_model_path(variant=None):
+    """설정된 변형 → 모델 경로 (양자화 모델 파일이 없으면 fp32 원본으로 대체)"""
+    variant = variant or DEFAULT_EMOTION_MODEL
+    path = EMOTION_MODEL_VARIANTS.get(variant, variant)
+    if path != ONNX_MODEL and not os.path.exists(path):
+        if variant not in _missing_variants:
+            _missing_variants.add(variant)
+            print(f"⚠️ 감정 모델 변형 {variant} 없음 ({path}) - fp32 모델 사용")
+        return ONNX_MODEL
+    return path
 
 def download_emotion_model():
     """감정 분석 ONNX 모델 자동 다운로드"""
@@ -59,21 +87,29 @@ def softmax(x):
     e_x = np.exp(x - np.max(x))
     return e_x / e_x.sum()
 
-def preprocess_face(image_path):
-    img = cv2.imread(image_path)
-    if img is None:
-        raise ValueError("이미지 파일을 열 수 없습니다.")
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-    if len(faces) == 0:
+def _load_gray(source):
+    """경로 또는 배열(BGR/그레이)을 그레이스케일 배열로 변환"""
+    if isinstance(source, np.ndarray):
+        img = source
+    else:
+        # 경로는 그레이스케일로 직접 디코딩 (BGR 디코딩/변환 생략, 헤더 크기 검사 포함)
+        img = load_cv2(source, cv2.IMREAD_GRAYSCALE)
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def _crop_face(gray, rect=None):
+    """얼굴 영역(없으면 중앙 64x64)을 정사각형으로 잘라 1x64x64 입력으로 변환"""
+    if rect is None:
         h, w = gray.shape
         ch, cw = 64, 64
         y1 = max(0, (h - ch) // 2)
         x1 = max(0, (w - cw) // 2)
         crop = gray[y1:y1+ch, x1:x1+cw]
     else:
-        (x, y, w, h) = max(faces, key=lambda rect: rect[2]*rect[3])
+        (x, y, w, h) = rect
         size = max(w, h)
         cx, cy = x + w // 2, y + h // 2
         x1 = max(0, cx - size // 2)
@@ -83,23 +119,129 @@ def preprocess_face(image_path):
         crop = gray[y1:y2, x1:x2]
     crop = cv2.equalizeHist(crop)
     crop = cv2.resize(crop, (64, 64))
-    arr = crop.astype(np.float32)
-    arr = arr[np.newaxis, np.newaxis, :, :]
-    return arr
+    return crop.astype(np.float32)[np.newaxis, :, :]
+
+def _detect_faces(gray, source=None):
+    # 업로드 경로가 있으면 공용 검출 기록(사이드카)을 재사용
+    image_path = source if isinstance(source, str) else None
+    return get_face_detections(image_path, gray)["faces"]
+
+def preprocess_face(image_path):
+    gray = _load_gray(image_path)
+    faces = _detect_faces(gray, image_path)
+    if len(faces) == 0:
+        arr = _crop_face(gray)
+    else:
+        arr = _crop_face(gray, max(faces, key=lambda rect: rect[2]*rect[3]))
+    return arr[np.newaxis, :, :, :]
+
+def preprocess_faces(source):
+    """이미지의 모든 얼굴을 (N, 1, 64, 64) 배열과 박스 목록으로 반환 (단체 사진 지원)"""
+    gray = _load_gray(source)
+    faces = _detect_faces(gray, source)
+    if len(faces) == 0:
+        return _crop_face(gray)[np.newaxis, ...], [None]
+    # 큰 얼굴부터 정렬 (첫 번째 결과 = 기존 단일 얼굴 결과)
+    faces = sorted(faces, key=lambda rect: rect[2]*rect[3], reverse=True)
+    crops = np.stack([_crop_face(gray, rect) for rect in faces])
+    return crops, faces
+
+def collect_face_crops(sources, limit=None):
+    """여러 이미지의 얼굴 크롭을 (N, 1, 64, 64) float32 하나로 모음 (양자화 보정/모델 비교용)
+    읽을 수 없는 이미지는 건너뜀, limit개를 넘으면 앞에서부터 자름
+    """
+    crops = []
+    for source in sources:
+        try:
+            crops.append(preprocess_faces(source)[0])
+        except Exception as e:
+            print(f"⚠️ 얼굴 크롭 실패 ({source}): {e}")
+            continue
+        if limit and sum(len(c) for c in crops) >= limit:
+            break
+    if not crops:
+        return np.zeros((0, 1, 64, 64), np.float32)
+    return np.concatenate(crops).astype(np.float32)[:limit]
+
+# 모델 경로별 ONNX 세션 캐시 (프로세스당 1회 생성)
+_sessions = {}
+
+def _use_onnx(backend=None):
+    return resolve_backend(backend or DEFAULT_EMOTION_BACKEND, EMOTION_BACKENDS) == "onnx"
+
+def get_emotion_session(model_path=None):
+    """캐시된 ONNX 추론 세션 반환 (기본: MEART_EMOTION_MODEL 변형)"""
+    model_path = model_path or emotion_model_path()
+    session = _sessions.get(model_path)
+    if session is None:
+        import onnxruntime as ort
+        session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        _sessions[model_path] = session
+    return session
+
+def run_emotion_batch(session, batch):
+    """(N, 1, 64, 64) 배치를 한 번의 session.run으로 추론, 고정 배치 모델은 개별 실행"""
+    input_meta = session.get_inputs()[0]
+    batch_dim = input_meta.shape[0] if input_meta.shape else None
+    if len(batch) == 1 or batch_dim == len(batch):
+        return session.run(None, {input_meta.name: batch})[0]
+    if not isinstance(batch_dim, int):
+        try:
+            return session.run(None, {input_meta.name: batch})[0]
+        except Exception as e:
+            # 동적 입력이지만 내부 Reshape 등이 배치 1로 고정된 모델
+            print(f"배치 추론 실패, 개별 추론으로 대체: {e}", file=sys.stderr)
+    return np.concatenate([session.run(None, {input_meta.name: batch[i:i+1]})[0] for i in range(len(batch))])
+
+def scores_to_result(scores):
+    """원시 점수를 top_emotions/all_probabilities 형태의 결과로 변환"""
+    probs = softmax(scores)
+    
+    # 상위 3개 감정 추출
+    top_idx = probs.argsort()[-3:][::-1]
+    top_emotions = [{"emotion": FERPLUS_EMOTIONS[i], "probability": float(probs[i]), "percentage": float(probs[i]*100)} for i in top_idx]
+    
+    # 가장 높은 확률의 감정 선택
+    main_idx = int(np.argmax(probs))
+    main_emotion = FERPLUS_EMOTIONS[main_idx]
+    main_confidence = float(probs[main_idx])
+    
+    # 감정 분석 결과 개선: 더 민감한 감정 감지
+    # neutral이 너무 자주 나오는 것을 방지
+    if main_emotion == "neutral" and main_confidence < 0.6:
+        # 두 번째로 높은 감정이 충분히 높으면 그것을 선택
+        second_idx = top_idx[1] if len(top_idx) > 1 else main_idx
+        second_emotion = FERPLUS_EMOTIONS[second_idx]
+        second_confidence = float(probs[second_idx])
+        
+        if second_confidence > 0.25 and second_emotion != "neutral":
+            print(f"중성 감정 보정: {second_emotion} 선택 (신뢰도: {second_confidence:.3f})")
+            main_idx = second_idx
+            main_emotion = second_emotion
+            main_confidence = second_confidence
+    
+    return {
+        "top_emotions": top_emotions, 
+        "emotion": main_emotion, 
+        "confidence": main_confidence,
+        "raw_scores": scores.tolist(),
+        "all_probabilities": dict(zip(FERPLUS_EMOTIONS, [float(p) for p in probs]))
+    }
 
-def analyze_emotion(image_path):
+def analyze_emotion(image_path, backend=None):
     try:
         print(f"감정 분석 시작: {image_path}")
-        print(f"모델 경로: {ONNX_MODEL}")
-        print(f"모델 파일 존재: {os.path.exists(ONNX_MODEL)}")
+        model_path = emotion_model_path()
+        print(f"모델 경로: {model_path}")
+        print(f"모델 파일 존재: {os.path.exists(model_path)}")
 
-        # onnxruntime 확인
-        if not HAS_ORT:
-            print("onnxruntime 미사용: 폴백 결과 반환")
-            return {"top_emotions": [], "emotion": "neutral", "confidence": 0.0, "error": "onnxruntime unavailable"}
+        # 백엔드 확인 (pil이면 onnxruntime을 로드하지 않음)
+        if not _use_onnx(backend):
+            print("onnxruntime 미사용: 기본 감정 분석 사용")
+            return generate_basic_emotion_analysis(image_path)
         
         # ONNX 모델 확인 및 자동 다운로드
-        if not os.path.exists(ONNX_MODEL):
+        if not os.path.exists(model_path):
             print("ONNX 모델 없음, 자동 다운로드 시도...")
             try:
                 if not download_emotion_model():
@@ -110,67 +252,58 @@ def analyze_emotion(image_path):
                 print(f"모델 다운로드 중 예외 발생: {e}")
                 return generate_basic_emotion_analysis(image_path)
 
-        arr = preprocess_face(image_path)
+        # 동일 이미지 + 모델 결과 캐시 확인
+        cache = get_cache()
+        cache_key = cache.key(image_path, "emotion_analysis", {"model": os.path.basename(model_path)})
+        cached = cache.get_json(cache_key)
+        if cached is not None:
+            return cached
+
+        with stage("face_preprocess", engine="haar_cascade"):
+            arr = preprocess_face(image_path)
         print(f"전처리 완료, 배열 형태: {arr.shape}")
 
-        # ONNX 세션 생성 및 추론
-        session = ort.InferenceSession(ONNX_MODEL, providers=["CPUExecutionProvider"])
-        input_name = session.get_inputs()[0].name
-        print(f"ONNX 모델 입력: {input_name}, 형태: {session.get_inputs()[0].shape}")
-        
-        outputs = session.run(None, {input_name: arr})
-        scores = outputs[0][0]
-        print(f"원시 점수: {scores}")
-        
-        probs = softmax(scores)
-        print(f"확률 분포: {dict(zip(FERPLUS_EMOTIONS, probs))}")
-        
-        # 상위 3개 감정 추출
-        top_idx = probs.argsort()[-3:][::-1]
-        top_emotions = [{"emotion": FERPLUS_EMOTIONS[i], "probability": float(probs[i]), "percentage": float(probs[i]*100)} for i in top_idx]
-        
-        # 가장 높은 확률의 감정 선택
-        main_idx = int(np.argmax(probs))
-        main_emotion = FERPLUS_EMOTIONS[main_idx]
-        main_confidence = float(probs[main_idx])
-        
-        print(f"예측된 감정: {main_emotion} (신뢰도: {main_confidence:.3f})")
-        
-        # 감정 분석 결과 개선: 더 민감한 감정 감지
-        # neutral이 너무 자주 나오는 것을 방지
-        if main_emotion == "neutral" and main_confidence < 0.6:
-            # 두 번째로 높은 감정이 충분히 높으면 그것을 선택
-            second_idx = top_idx[1] if len(top_idx) > 1 else main_idx
-            second_emotion = FERPLUS_EMOTIONS[second_idx]
-            second_confidence = float(probs[second_idx])
+        # ONNX 세션 (캐시) 및 추론
+        with stage("emotion_inference", image=arr[0, 0], engine="onnxruntime"):
+            session = get_emotion_session(model_path)
+            input_name = session.get_inputs()[0].name
+            print(f"ONNX 모델 입력: {input_name}, 형태: {session.get_inputs()[0].shape}")
             
-            if second_confidence > 0.25 and second_emotion != "neutral":
-                print(f"중성 감정 보정: {second_emotion} 선택 (신뢰도: {second_confidence:.3f})")
-                main_idx = second_idx
-                main_emotion = second_emotion
-                main_confidence = second_confidence
+            outputs = session.run(None, {input_name: arr})
+            scores = outputs[0][0]
+        print(f"원시 점수: {scores}")
         
-        return {
-            "top_emotions": top_emotions, 
-            "emotion": main_emotion, 
-            "confidence": main_confidence,
-            "raw_scores": scores.tolist(),
-            "all_probabilities": dict(zip(FERPLUS_EMOTIONS, [float(p) for p in probs]))
-        }
+        result = scores_to_result(scores)
+        print(f"예측된 감정: {result['emotion']} (신뢰도: {result['confidence']:.3f})")
+        cache.put_json(cache_key, result)
+        return result
     except Exception as e:
         print(f"감정 분석 중 오류 발생: {e}", file=sys.stderr)
         return generate_basic_emotion_analysis(image_path)
 
+def analyze_emotion_array(img, image_path=None, backend=None):
+    """디코딩된 배열(BGR/그레이)의 가장 큰 얼굴 감정 분석 (analyze_emotion과 같은 결과 형식)
+    - image_path가 있으면 얼굴 검출 기록(사이드카)을 공유
+    """
+    if not _use_onnx(backend) or (not os.path.exists(emotion_model_path()) and not download_emotion_model()):
+        return generate_basic_emotion_analysis(img)
+    gray = _load_gray(img)
+    faces = _detect_faces(gray, image_path)
+    rect = max(faces, key=lambda r: r[2]*r[3]) if faces else None
+    with stage("emotion_inference", image=gray, engine="onnxruntime"):
+        scores = run_emotion_batch(get_emotion_session(), _crop_face(gray, rect)[np.newaxis, ...])[0]
+    return scores_to_result(scores)
+
 def generate_basic_emotion_analysis(image_path):
     """ONNX 모델 없이 기본적인 감정 분석 (이미지 밝기 기반)"""
     try:
         import cv2
-        img = cv2.imread(image_path)
-        if img is None:
+        try:
+            gray = _load_gray(image_path)
+        except ValueError:
             return {"emotion": "neutral", "confidence": 0.5, "error": "image load failed"}
         
         # 이미지 밝기 기반 간단한 감정 추정
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         brightness = np.mean(gray)
         
         # 밝기 기반 감정 분류
@@ -184,9 +317,8 @@ def generate_basic_emotion_analysis(image_path):
             emotion = "neutral"
             confidence = 0.6
             
-        # 얼굴 검출로 감정 보정
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        # 얼굴 검출로 감정 보정 (공용 검출 기록 재사용)
+        faces = _detect_faces(gray, image_path)
         
         if len(faces) > 0:
             # 얼굴이 검출되면 더 다양한 감정 가능
@@ -205,4 +337,92 @@ def generate_basic_emotion_analysis(image_path):
         }
     except Exception as e:
         print(f"기본 감정 분석 실패: {e}")
-        return {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
\ No newline at end of file
+        return {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
+
+def analyze_emotions(sources, batch_size=64, backend=None):
+    """여러 이미지(경로 또는 배열)의 모든 얼굴을 배치 추론
+    반환: 입력 순서대로 {"source", "faces": [{"box", top_emotions, all_probabilities, ...}]}
+    """
+    results = [{"source": s if isinstance(s, str) else i, "faces": []} for i, s in enumerate(sources)]
+    use_onnx = _use_onnx(backend)
+    if not use_onnx or not os.path.exists(emotion_model_path()):
+        if use_onnx and download_emotion_model():
+            return analyze_emotions(sources, batch_size, backend)
+        for entry, source in zip(results, sources):
+            entry["faces"].append(generate_basic_emotion_analysis(source))
+        return results
+
+    # 모든 얼굴 크롭을 하나의 NCHW 배열로 모음
+    crops, owners = [], []
+    with stage("face_preprocess", engine="haar_cascade", images=len(sources)):
+        for i, source in enumerate(sources):
+            try:
+                face_crops, boxes = preprocess_faces(source)
+            except Exception as e:
+                results[i]["error"] = str(e)
+                continue
+            crops.append(face_crops)
+            owners.extend((i, box) for box in boxes)
+    if not crops:
+        return results
+    batch = np.concatenate(crops).astype(np.float32)
+    print(f"배치 감정 분석: 이미지 {len(sources)}개, 얼굴 {len(batch)}개")
+
+    with stage("emotion_inference", engine="onnxruntime", faces=len(batch)):
+        session = get_emotion_session()
+        scores = np.concatenate([run_emotion_batch(session, batch[i:i+batch_size]) for i in range(0, len(batch), batch_size)])
+    for (i, box), row in zip(owners, scores):
+        face = scores_to_result(row)
+        face["box"] = box
+        results[i]["faces"].append(face)
+    return results
+
+def read_manifest(manifest_path):
+    """매니페스트 읽기: 한 줄에 경로 하나 또는 {"path": ...} JSON"""
+    paths = []
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            paths.append(json.loads(line)["path"] if line.startswith("{") else line)
+    return paths
+
+def main():
+    argv = list(sys.argv)
+    try:
+        backend = resolve_backend(pop_backend_option(argv, "MEART_EMOTION_BACKEND"), EMOTION_BACKENDS)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if len(argv) < 2:
+        print('사용법: python emotion_analysis.py <image_path> | --manifest <manifest_path> [--backend onnx|pil|auto] [--profile-imports]')
+        sys.exit(1)
+
+    if argv[1] == "--manifest":
+        if len(argv) < 3:
+            print('사용법: python emotion_analysis.py --manifest <manifest_path>')
+            sys.exit(1)
+        results = analyze_emotions(read_manifest(argv[2]), backend=backend)
+        # JSON Lines 출력 (이미지당 한 줄)
+        print("=== EMOTION_BATCH_RESULT ===")
+        for entry in results:
+            print(json.dumps(entry, ensure_ascii=False))
+        sys.exit(0)
+
+    image_path = argv[1]
+    if not os.path.exists(image_path):
+        print(f"❌ 이미지 파일이 존재하지 않습니다: {image_path}")
+        sys.exit(1)
+
+    result = analyze_emotion(image_path, backend)
+    # JSON 출력 (서버에서 마지막 줄 파싱)
+    print("=== EMOTION_RESULT ===")
+    print(json.dumps(result, ensure_ascii=False))
+    sys.exit(0)
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        _import_profiler.report()
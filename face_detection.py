@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+공용 얼굴 검출 모듈 - 업로드당 1회 검출 후 모든 단계에서 공유
+- Haar Cascade 분류기는 프로세스 단위로 캐시 (분류기는 스레드 안전하지 않으므로 검출은 분류기별 락 안에서 실행)
+- 검출 결과는 업로드 파일 옆 사이드카 JSON(<파일>.faces.json)에 내용 해시와 함께 저장
+- 이후 단계(감정 분석, 배경 제거 등)는 해시가 일치하면 재검출 없이 기록을 재사용
+- full 모드(기본): 원본 해상도에서 검출 (원본 기준 최소 얼굴 30px)
+- pyramid 모드(선택, MEART_FACE_DETECT_MODE=pyramid): 긴 변 FACE_DETECT_MAX_SIDE 이하로 축소한 사본에서 검출 후 원본 좌표로 환산,
+  선택적으로 원본 해상도의 얼굴 주변 ROI에서 재검출해 박스를 보정 (refine)
+  웃음 검출도 얼굴 ROI를 SMILE_FACE_WIDTH 폭으로 축소해 수행
+  기록의 좌표는 항상 호출 측이 넘긴 (원본) 그레이스케일 기준
+  minSize도 축소 배율에 맞춰 줄여 원본 기준 최소 얼굴 크기를 유지한다. 단 cascade 창(24px)보다 작게는
+  검출할 수 없으므로 원본 기준 최소 크기는 max(30, 24 / 배율) px (MEART_FACE_DETECT_MAX_SIDE로 조정)
+- 사이드카 기록은 검출 방식(detector_id)이 현재 설정과 같을 때만 재사용
+
+환경 변수:
+- MEART_FACE_DETECT_MODE=full|pyramid      검출 방식 (기본 full: 원본 해상도 그대로, pyramid는 작은 얼굴을 놓칠 수 있음)
+- MEART_FACE_DETECT_MAX_SIDE=<px>          pyramid 검출 이미지의 긴 변 (기본 800)
+- MEART_FACE_DETECT_REFINE=0|1             원본 해상도 ROI 재검출 (기본 0)
+"""
+import os
+import json
+import hashlib
+import threading
+import cv2
+from image_loader import load_cv2, temp_path
+
+FACE_CASCADE = 'haarcascade_frontalface_default.xml'
+SMILE_CASCADE = 'haarcascade_smile.xml'
+
+# 모든 단계가 공유하는 기준 검출 파라미터
+FACE_PARAMS = {"scaleFactor": 1.1, "minNeighbors": 4, "minSize": (30, 30)}
+SMILE_PARAMS = {"scaleFactor": 1.8, "minNeighbors": 20}
+
+FACE_DETECT_MODES = ("full", "pyramid")
+DEFAULT_FACE_DETECT_MODE = os.environ.get("MEART_FACE_DETECT_MODE", "full")
+FACE_DETECT_MAX_SIDE = int(os.environ.get("MEART_FACE_DETECT_MAX_SIDE", "800"))
+FACE_DETECT_REFINE = os.environ.get("MEART_FACE_DETECT_REFINE", "0") == "1"
+# 보정 ROI 여백 (얼굴 크기 대비) / 웃음 검출용 얼굴 폭
+REFINE_MARGIN = 0.25
+SMILE_FACE_WIDTH = 200
+
+SIDECAR_SUFFIX = '.faces.json'
+RECORD_VERSION = 1
+
+_cascades = {}
+_cascades_lock = threading.Lock()
+
+def _get_cascade_entry(name):
+    with _cascades_lock:
+        entry = _cascades.get(name)
+        if entry is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + name)
+            if cascade.empty():
+                raise RuntimeError(f"Cascade 로드 실패: {name}")
+            entry = _cascades[name] = (cascade, threading.Lock())
+    return entry
+
+def get_cascade(name):
+    """Haar Cascade 분류기 캐시 로드 (프로세스당 1회) - 직접 검출할 때는 detect_multiscale() 사용"""
+    return _get_cascade_entry(name)[0]
+
+def detect_multiscale(name, image, **params):
+    """공유 분류기로 detectMultiScale 실행 (상주 워커의 동시 작업 간 분류기별 직렬화)"""
+    cascade, lock = _get_cascade_entry(name)
+    with lock:
+        return cascade.detectMultiScale(image, **params)
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """파일 내용 SHA-256 해시"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def sidecar_path(image_path):
+    return image_path + SIDECAR_SUFFIX
+
+def load_record(image_path, digest):
+    """사이드카 기록 로드 (해시 불일치·손상 시 None)"""
+    try:
+        with open(sidecar_path(image_path), encoding='utf-8') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if record.get("version") != RECORD_VERSION or record.get("sha256") != digest:
+        return None
+    return record
+
+def save_record(image_path, record):
+    """사이드카 기록 원자적 저장 (쓰기 불가 디렉터리는 무시)"""
+    path = sidecar_path(image_path)
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ 얼굴 검출 기록 저장 실패: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def detection_scale(width, height, max_side=FACE_DETECT_MAX_SIDE):
+    """검출용 축소 배율 (1.0 = 원본) - 긴 변을 max_side 이하로"""
+    return min(1.0, max_side / float(max(width, height)))
+
+def detector_id(mode=None, refine=None):
+    """사이드카 기록용 검출 방식 식별자 (방식/축소 크기/보정 여부가 같을 때만 기록 재사용)"""
+    mode = mode or DEFAULT_FACE_DETECT_MODE
+    if mode == "full":
+        return "full"
+    refine = FACE_DETECT_REFINE if refine is None else refine
+    return f"pyramid@{FACE_DETECT_MAX_SIDE}" + ("+refine" if refine else "")
+
+def _detect_full(gray, min_size=FACE_PARAMS["minSize"]):
+    params = dict(FACE_PARAMS, minSize=tuple(int(v) for v in min_size))
+    faces = detect_multiscale(FACE_CASCADE, gray, **params)
+    return [[int(v) for v in rect] for rect in faces]
+
+def _refine_face(gray, rect):
+    """원본 해상도에서 얼굴 주변 ROI만 재검출해 박스 보정 (실패 시 기존 박스)"""
+    x, y, w, h = rect
+    mx, my = int(w * REFINE_MARGIN), int(h * REFINE_MARGIN)
+    x1, y1 = max(0, x - mx), max(0, y - my)
+    x2, y2 = min(gray.shape[1], x + w + mx), min(gray.shape[0], y + h + my)
+    # ROI 안의 얼굴은 축소 검출 박스와 크기가 비슷하므로 작은 창은 건너뜀
+    candidates = _detect_full(gray[y1:y2, x1:x2], (int(w * 0.7), int(h * 0.7)))
+    if not candidates:
+        return rect
+    cx, cy, cw, ch = max(candidates, key=lambda r: r[2] * r[3])
+    return [cx + x1, cy + y1, cw, ch]
+
+def detect_faces(gray, mode=None, refine=None):
+    """기준 파라미터로 얼굴 검출 → [[x, y, w, h], ...] (항상 gray 좌표계)
+    pyramid: 축소 사본에서 검출 후 원본 좌표로 환산 (+ refine 시 원본 ROI 재검출)
+    """
+    mode = mode or DEFAULT_FACE_DETECT_MODE
+    if mode not in FACE_DETECT_MODES:
+        raise ValueError(f"지원하지 않는 얼굴 검출 방식: {mode} (허용: {', '.join(FACE_DETECT_MODES)})")
+    h, w = gray.shape[:2]
+    scale = detection_scale(w, h)
+    if mode == "full" or scale >= 1.0:
+        return _detect_full(gray)
+
+    small = cv2.resize(gray, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    # 원본 기준 minSize 유지 (cascade 창 크기 미만은 검출 불가하므로 하한)
+    window = get_cascade(FACE_CASCADE).getOriginalWindowSize()
+    min_size = [max(win, int(round(v * scale))) for v, win in zip(FACE_PARAMS["minSize"], window)]
+    faces = []
+    for (x, y, fw, fh) in _detect_full(small, min_size):
+        x1, y1 = int(round(x / scale)), int(round(y / scale))
+        x2, y2 = min(w, int(round((x + fw) / scale))), min(h, int(round((y + fh) / scale)))
+        faces.append([x1, y1, x2 - x1, y2 - y1])
+    if FACE_DETECT_REFINE if refine is None else refine:
+        faces = [_refine_face(gray, rect) for rect in faces]
+    return faces
+
+def detect_smiles(gray, faces, mode=None):
+    """얼굴별 웃음 검출 여부 → [bool, ...]
+    pyramid: 얼굴 ROI를 SMILE_FACE_WIDTH 폭으로 축소해 검출 (고해상도 얼굴에서 비용 고정)
+    """
+    mode = mode or DEFAULT_FACE_DETECT_MODE
+    smiles = []
+    for (x, y, w, h) in faces:
+        face_roi = gray[y:y+h, x:x+w]
+        if mode == "pyramid" and w > SMILE_FACE_WIDTH:
+            scale = SMILE_FACE_WIDTH / float(w)
+            face_roi = cv2.resize(face_roi, (SMILE_FACE_WIDTH, max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        smiles.append(len(detect_multiscale(SMILE_CASCADE, face_roi, **SMILE_PARAMS)) > 0)
+    return smiles
+
+def _load_gray(image_path):
+    return load_cv2(image_path, cv2.IMREAD_GRAYSCALE)
+
+def get_face_detections(image_path=None, gray=None, with_smiles=False):
+    """업로드 이미지의 얼굴(및 웃음) 검출 결과를 기록에서 재사용하거나 새로 검출
+    - image_path: 사이드카 기록 키 (없으면 캐시 없이 검출만 수행)
+    - gray: 호출 단계가 이미 디코딩한 그레이스케일 이미지 (좌표계 기준)
+    반환: {"faces": [[x, y, w, h], ...], "smiles": [bool, ...] | None, "image_size": [w, h]}
+    """
+    if image_path is None:
+        if gray is None:
+            raise ValueError("image_path 또는 gray 중 하나는 필요합니다")
+        faces = detect_faces(gray)
+        smiles = detect_smiles(gray, faces) if with_smiles else None
+        return {"faces": faces, "smiles": smiles, "image_size": [gray.shape[1], gray.shape[0]]}
+
+    digest = file_sha256(image_path)
+    record = load_record(image_path, digest)
+    expected_size = [gray.shape[1], gray.shape[0]] if gray is not None else None
+
+    # 기록 재사용: 검출 방식과 좌표계(이미지 크기)가 같고 필요한 항목이 있으면 그대로 반환
+    if record is not None and record.get("detector") == detector_id() \
+            and (expected_size is None or record.get("image_size") == expected_size):
+        if not with_smiles or record.get("smiles") is not None:
+            print(f"♻️ 얼굴 검출 기록 재사용: {len(record['faces'])}개")
+            return record
+        if gray is None:
+            gray = _load_gray(image_path)
+        record["smiles"] = detect_smiles(gray, record["faces"])
+        save_record(image_path, record)
+        return record
+
+    if gray is None:
+        gray = _load_gray(image_path)
+    faces = detect_faces(gray)
+    record = {
+        "version": RECORD_VERSION,
+        "sha256": digest,
+        "image_size": [gray.shape[1], gray.shape[0]],
+        "faces": faces,
+        "smiles": detect_smiles(gray, faces) if with_smiles else None,
+        "detector": detector_id(),
+    }
+    save_record(image_path, record)
+    return record
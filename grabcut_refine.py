@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coarse-to-fine GrabCut
+- full: 원본 해상도에서 cv2.grabCut 실행 (기존 동작)
+- pyramid: 축소 해상도에서 GrabCut → 마스크 업샘플 → 경계 주변 불확실 띠(band)만
+  원본 해상도에서 1회 재실행. GrabCut 비용은 픽셀 수에 대해 초선형이므로 대형 입력에서 효과가 큼
+- TemporalGrabCut: 프레임 시퀀스(영상)용. 첫 프레임/장면 전환에서만 위 전략으로 콜드 스타트하고,
+  이후 프레임은 이전 프레임의 라벨과 GMM 모델을 이어받아 경계 띠만 1회 갱신
+"""
+import os
+import numpy as np
+import cv2
+
+GRABCUT_MODES = ("full", "pyramid")
+DEFAULT_GRABCUT_MODE = os.environ.get("MEART_GRABCUT_MODE", "full")
+DEFAULT_COARSE_MAX_SIDE = int(os.environ.get("MEART_GRABCUT_MAX_SIDE", "640"))
+# 프레임 시퀀스: 축소 흑백 프레임의 평균 절대 차이(0-255)가 이 값을 넘으면 장면 전환으로 보고 재초기화
+DEFAULT_SCENE_THRESHOLD = float(os.environ.get("MEART_SCENE_THRESHOLD", "30"))
+# 프레임 간 경계가 움직일 수 있는 폭 (짧은 변 대비 비율) - 이 띠 안에서만 라벨 재추정
+DEFAULT_TEMPORAL_BAND = float(os.environ.get("MEART_TEMPORAL_BAND", "0.03"))
+SCENE_THUMB_WIDTH = 64
+
+def _is_fg(labels):
+    return (labels == cv2.GC_FGD) | (labels == cv2.GC_PR_FGD)
+
+def new_models():
+    """cv2.grabCut 배경/전경 GMM 버퍼 (bgdModel, fgdModel)"""
+    return np.zeros((1, 65), np.float64), np.zeros((1, 65), np.float64)
+
+def grabcut(img_bgr, mask, rect, iterations, init_mode, strategy=DEFAULT_GRABCUT_MODE,
+            coarse_max_side=DEFAULT_COARSE_MAX_SIDE, refine_iterations=1, models=None):
+    """cv2.grabCut과 같은 라벨 마스크(GC_BGD/FGD/PR_BGD/PR_FGD)를 반환
+    - mask는 cv2.grabCut과 동일하게 제자리 갱신
+    - models: (bgdModel, fgdModel) - 주 GrabCut 실행(pyramid는 축소 단계)의 GMM을 제자리 기록.
+      색 분포는 해상도와 무관하므로 축소 단계 모델도 원본 해상도 프레임에 이어 쓸 수 있음
+    반환: (mask, info) - info에 실제 사용한 전략과 해상도 기록
+    """
+    h, w = img_bgr.shape[:2]
+    scale = coarse_max_side / float(max(h, w))
+    bgd_model, fgd_model = models if models is not None else new_models()
+    if strategy != "pyramid" or scale >= 1.0:
+        cv2.grabCut(img_bgr, mask, rect, bgd_model, fgd_model, iterations, init_mode)
+        return mask, {"strategy": "full", "resolution": [w, h]}
+
+    # 1. 축소 해상도에서 GrabCut
+    cw, ch = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+    small_img = cv2.resize(img_bgr, (cw, ch), interpolation=cv2.INTER_AREA)
+    small_mask = cv2.resize(mask, (cw, ch), interpolation=cv2.INTER_NEAREST)
+    small_rect = None
+    if rect is not None:
+        x, y, rw, rh = rect
+        small_rect = (int(x * scale), int(y * scale), max(1, int(rw * scale)), max(1, int(rh * scale)))
+    cv2.grabCut(small_img, small_mask, small_rect, bgd_model, fgd_model, iterations, init_mode)
+
+    # 2. 라벨 업샘플 (최근접) - 사용자가 지정한 확정 라벨은 유지
+    labels = cv2.resize(small_mask, (w, h), interpolation=cv2.INTER_NEAREST)
+    if init_mode == cv2.GC_INIT_WITH_MASK:
+        fixed = (mask == cv2.GC_FGD) | (mask == cv2.GC_BGD)
+        labels[fixed] = mask[fixed]
+
+    # 3. 경계 주변 불확실 띠: 축소 1픽셀이 원본에서 차지하는 폭의 2배
+    radius = max(2, int(np.ceil(2.0 / scale)))
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * radius + 1, 2 * radius + 1))
+    fg = _is_fg(labels).astype(np.uint8)
+    band = (cv2.dilate(fg, kernel) != cv2.erode(fg, kernel))
+    if init_mode == cv2.GC_INIT_WITH_MASK:
+        band &= ~fixed
+    band_pixels = int(band.sum())
+
+    info = {
+        "strategy": "pyramid",
+        "resolution": [cw, ch],
+        "full_resolution": [w, h],
+        "band_pixels": band_pixels,
+    }
+    if band_pixels == 0:
+        mask[:] = labels
+        return mask, info
+
+    # 4. 띠 바깥은 확정 라벨로 고정, 띠 안쪽만 원본 해상도에서 재추정 (띠 bbox로 잘라서 실행)
+    refine = np.where(fg > 0, cv2.GC_FGD, cv2.GC_BGD).astype(np.uint8)
+    refine[band] = np.where(fg[band] > 0, cv2.GC_PR_FGD, cv2.GC_PR_BGD)
+    ys, xs = np.nonzero(band)
+    y0, y1 = max(0, ys.min() - radius), min(h, ys.max() + radius + 1)
+    x0, x1 = max(0, xs.min() - radius), min(w, xs.max() + radius + 1)
+    roi_mask = np.ascontiguousarray(refine[y0:y1, x0:x1])
+    info["roi"] = [int(x0), int(y0), int(x1 - x0), int(y1 - y0)]
+    try:
+        refine_bgd, refine_fgd = new_models()
+        cv2.grabCut(np.ascontiguousarray(img_bgr[y0:y1, x0:x1]), roi_mask, None,
+                    refine_bgd, refine_fgd, refine_iterations, cv2.GC_INIT_WITH_MASK)
+    except cv2.error as e:
+        # ROI 안에 전경/배경 샘플이 한쪽뿐이면 GrabCut 불가 → 업샘플 라벨 사용
+        print(f"⚠️ 경계 재추정 생략: {e}")
+        mask[:] = labels
+        info["refined"] = False
+        return mask, info
+
+    roi_band = band[y0:y1, x0:x1]
+    labels_roi = labels[y0:y1, x0:x1]
+    labels_roi[roi_band] = roi_mask[roi_band]
+    mask[:] = labels
+    info["refined"] = True
+    return mask, info
+
+def frame_thumbnail(img_bgr, width=SCENE_THUMB_WIDTH):
+    """장면 전환 비교용 축소 흑백 프레임 (float32)"""
+    h, w = img_bgr.shape[:2]
+    size = (width, max(1, int(round(h * width / float(w)))))
+    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY) if img_bgr.ndim == 3 else img_bgr
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+class TemporalGrabCut:
+    """프레임 시퀀스용 GrabCut - 프레임 간 라벨과 GMM 모델을 이어받는다
+    - 콜드 스타트(첫 프레임, 장면 전환, 해상도 변경, 이어받을 경계 없음):
+      grabcut()과 동일 (같은 초기화/반복 횟수/전략) + GMM 모델 보관
+    - 이후 프레임: 이전 라벨의 경계를 band만큼 팽창/침식한 띠만 불확실 라벨로 두고,
+      띠 bbox 안에서 이전 GMM으로 cv2.GC_EVAL 1회 (k-means 초기화 없음).
+      띠 바깥과 확정 라벨(GC_BGD/GC_FGD)은 이전 프레임 값을 그대로 유지
+    """
+
+    def __init__(self, iterations=2, strategy=DEFAULT_GRABCUT_MODE, scene_threshold=DEFAULT_SCENE_THRESHOLD,
+                 band=DEFAULT_TEMPORAL_BAND, refine_iterations=1):
+        self.iterations = iterations
+        self.strategy = strategy
+        self.scene_threshold = scene_threshold
+        self.band = band
+        self.refine_iterations = refine_iterations
+        self.reset()
+
+    def reset(self):
+        self.labels = None
+        self.models = None
+        self.thumbnail = None
+
+    def segment(self, img_bgr, mask, rect, init_mode=cv2.GC_INIT_WITH_RECT):
+        """grabcut()과 같은 인자/반환 - mask와 rect는 콜드 스타트에서만 사용
+        반환: (mask, info) - info["temporal"]: cold | warm, info["scene_diff"]: 이전 프레임과의 차이
+        """
+        thumbnail = frame_thumbnail(img_bgr)
+        reason = None
+        scene_diff = None
+        if self.labels is None:
+            reason = "first_frame"
+        elif self.labels.shape != img_bgr.shape[:2] or self.thumbnail.shape != thumbnail.shape:
+            reason = "resolution"
+        else:
+            scene_diff = float(np.mean(np.abs(thumbnail - self.thumbnail)))
+            if scene_diff > self.scene_threshold:
+                reason = "scene_change"
+        self.thumbnail = thumbnail
+
+        info = None
+        if reason is None:
+            info = self._warm(img_bgr, mask)
+            if info is None:
+                reason = "no_boundary"
+        if info is None:
+            self.models = new_models()
+            mask, info = grabcut(img_bgr, mask, rect, self.iterations, init_mode,
+                                 strategy=self.strategy, models=self.models)
+            info["temporal"] = "cold"
+            info["reason"] = reason
+            self.labels = mask.copy()
+        if scene_diff is not None:
+            info["scene_diff"] = round(scene_diff, 2)
+        return mask, info
+
+    def _warm(self, img_bgr, mask):
+        """이전 라벨/GMM으로 경계 띠만 재추정 - 이어받을 경계가 없거나 실패하면 None"""
+        h, w = img_bgr.shape[:2]
+        prev = self.labels
+        radius = max(2, int(round(min(h, w) * self.band)))
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * radius + 1, 2 * radius + 1))
+        fg = _is_fg(prev).astype(np.uint8)
+        fixed = (prev == cv2.GC_FGD) | (prev == cv2.GC_BGD)
+        band = (cv2.dilate(fg, kernel) != cv2.erode(fg, kernel)) & ~fixed
+        if not band.any():
+            return None
+
+        seed = np.where(fg > 0, cv2.GC_FGD, cv2.GC_BGD).astype(np.uint8)
+        seed[band] = np.where(fg[band] > 0, cv2.GC_PR_FGD, cv2.GC_PR_BGD)
+        ys, xs = np.nonzero(band)
+        y0, y1 = max(0, ys.min() - radius), min(h, ys.max() + radius + 1)
+        x0, x1 = max(0, xs.min() - radius), min(w, xs.max() + radius + 1)
+        roi_mask = np.ascontiguousarray(seed[y0:y1, x0:x1])
+        roi_fg = _is_fg(roi_mask)
+        if roi_fg.all() or not roi_fg.any():
+            return None
+        try:
+            # GC_INIT_WITH_MASK는 마스크에서 GMM을 k-means로 새로 학습(넘긴 모델 무시)하므로,
+            # 이전 모델을 실제로 이어 쓰려면 GC_EVAL (성분 배정은 이전 모델 기준, 이후 띠 안 색으로 갱신)
+            cv2.grabCut(np.ascontiguousarray(img_bgr[y0:y1, x0:x1]), roi_mask, None,
+                        self.models[0], self.models[1], self.refine_iterations, cv2.GC_EVAL)
+        except cv2.error as e:
+            print(f"⚠️ 프레임 경계 갱신 실패, 재초기화: {e}")
+            return None
+
+        labels = prev.copy()
+        roi_band = band[y0:y1, x0:x1]
+        labels[y0:y1, x0:x1][roi_band] = roi_mask[roi_band]
+        self.labels = labels
+        mask[:] = labels
+        return {
+            "strategy": "temporal",
+            "temporal": "warm",
+            "resolution": [w, h],
+            "band_pixels": int(band.sum()),
+            "roi": [int(x0), int(y0), int(x1 - x0), int(y1 - y0)],
+        }
+
+def pop_grabcut_option(argv):
+    """argv에서 --grabcut <full|pyramid> (또는 --grabcut=...) 옵션을 분리
+    반환: (나머지 argv, 전략)
+    """
+    rest, strategy = [], DEFAULT_GRABCUT_MODE
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg.startswith("--grabcut="):
+            strategy = arg.split("=", 1)[1]
+        elif arg == "--grabcut" and i + 1 < len(argv):
+            strategy = argv[i + 1]
+            i += 1
+        else:
+            rest.append(arg)
+        i += 1
+    if strategy not in GRABCUT_MODES:
+        raise ValueError(f"지원하지 않는 GrabCut 전략: {strategy} (허용: {', '.join(GRABCUT_MODES)})")
+    return rest, strategy
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+공용 이미지 로더 - 헤더 선검사 + 필요한 해상도로만 디코딩
+- probe_image(): 픽셀을 디코딩하지 않고 헤더에서 포맷/크기/모드 확인
+- 디코딩 전에 픽셀 수 상한 검사 (decompression bomb 차단)
+- 단계가 필요로 하는 최소 해상도로 디코딩: JPEG draft 모드(PIL) / IMREAD_REDUCED_*(OpenCV)
+  축소 디코딩은 1/2, 1/4, 1/8 배율이며 요청한 크기보다 작아지지 않는다 (최종 리사이즈는 호출 측)
+- 단계 간 중간 산출물(nobg/brush) 저장: save_image() - 형식은 출력 경로 확장자로 선택
+  - .npy 경로: 원시 배열 (H, W, 4) RGBA uint8, 읽을 때 메모리 맵 (인코딩/디코딩 없음)
+    Python 단계끼리만 주고받는 산출물용 (load_pil/load_cv2가 매직 바이트로 인식)
+  - .png 경로: 빠른 압축 PNG (sharp 등 외부 소비자도 읽을 수 있음)
+
+환경 변수:
+- MEART_MAX_IMAGE_PIXELS=<정수>         허용 최대 픽셀 수 (기본 64MP)
+- MEART_INTERMEDIATE_FORMAT=png-fast|png   .png 산출물 압축 (기본 png-fast)
+  png-fast: 압축 수준 MEART_PNG_COMPRESS_LEVEL (기본 1), png: PIL 기본 압축 수준(6)
+"""
+import os
+import math
+import threading
+from collections import namedtuple
+import numpy as np
+import cv2
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    Image = None
+    HAS_PIL = False
+
+MAX_IMAGE_PIXELS = int(os.environ.get("MEART_MAX_IMAGE_PIXELS", str(64 * 1000 * 1000)))
+INTERMEDIATE_FORMATS = ("png-fast", "png")
+INTERMEDIATE_FORMAT = os.environ.get("MEART_INTERMEDIATE_FORMAT", "png-fast")
+FAST_PNG_COMPRESS_LEVEL = int(os.environ.get("MEART_PNG_COMPRESS_LEVEL", "1"))
+
+NPY_MAGIC = b"\x93NUMPY"
+_NPY_MODES = {2: "L", 3: "RGB", 4: "RGBA"}
+
+ImageInfo = namedtuple("ImageInfo", ["format", "width", "height", "mode"])
+
+# IMREAD 플래그 → 축소 배율별 플래그
+_REDUCED_FLAGS = {
+    cv2.IMREAD_COLOR: {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8},
+    cv2.IMREAD_GRAYSCALE: {2: cv2.IMREAD_REDUCED_GRAYSCALE_2, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8},
+}
+
+class ImageTooLargeError(ValueError):
+    """헤더상 픽셀 수가 상한을 넘는 이미지 (디코딩하지 않음)"""
+
+def is_npy(path):
+    """원시 배열 중간 산출물 여부 (매직 바이트 기준)"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(NPY_MAGIC)) == NPY_MAGIC
+    except OSError:
+        return False
+
+def _open_npy(path):
+    """중간 산출물 배열을 메모리 맵으로 열기 → (배열, 모드)"""
+    arr = np.load(path, mmap_mode="r", allow_pickle=False)
+    channels = 2 if arr.ndim == 2 else arr.shape[2]
+    if arr.dtype != np.uint8 or channels not in _NPY_MODES:
+        raise ValueError(f"지원하지 않는 중간 산출물 배열: {arr.dtype} {arr.shape}")
+    return arr, _NPY_MODES[channels]
+
+def probe_image(path):
+    """헤더만 읽어 ImageInfo 반환 (PIL 미설치 또는 미지원 포맷이면 None)"""
+    if is_npy(path):
+        arr, mode = _open_npy(path)
+        return ImageInfo("NPY", arr.shape[1], arr.shape[0], mode)
+    if not HAS_PIL:
+        return None
+    try:
+        with Image.open(path) as img:
+            return ImageInfo(img.format, img.width, img.height, img.mode)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e))
+    except OSError:
+        return None
+
+def check_image_size(info, max_pixels=MAX_IMAGE_PIXELS):
+    """픽셀 수 상한 검사 (초과 시 ImageTooLargeError)"""
+    if info is not None and info.width * info.height > max_pixels:
+        raise ImageTooLargeError(
+            f"이미지가 너무 큽니다: {info.width}x{info.height} ({info.width * info.height / 1e6:.1f}MP > {max_pixels / 1e6:.1f}MP)"
+        )
+
+def decode_scale(width, height, max_side=None, min_side=None, cover=None):
+    """최종 크기에 필요한 최소 디코딩 배율 (1.0 = 원본)
+    - max_side: 호출 측이 긴 변을 max_side로 줄일 예정
+    - min_side: 호출 측이 짧은 변 기준 min_side 이상이 필요 (중앙 크롭 등)
+    - cover: (w, h) 캔버스를 빈틈없이 덮도록 리사이즈 후 크롭할 예정 (fit: cover)
+    """
+    scales = []
+    if cover:
+        scales.append(max(cover[0] / float(width), cover[1] / float(height)))
+    if max_side:
+        scales.append(max_side / float(max(width, height)))
+    if min_side:
+        scales.append(min_side / float(min(width, height)))
+    return min(1.0, max(scales)) if scales else 1.0
+
+def _reduction_factor(scale):
+    """배율 이하로 내려가지 않는 가장 큰 축소 인수 (1, 2, 4, 8)"""
+    for factor in (8, 4, 2):
+        if scale * factor <= 1.0:
+            return factor
+    return 1
+
+def load_pil(path, mode="RGB", max_side=None, min_side=None, max_pixels=MAX_IMAGE_PIXELS, cover=None):
+    """PIL 이미지 로드 - 헤더 검사 후 JPEG는 draft 모드로 필요한 해상도까지만 디코딩"""
+    if is_npy(path):
+        arr, src_mode = _open_npy(path)
+        check_image_size(ImageInfo("NPY", arr.shape[1], arr.shape[0], src_mode), max_pixels)
+        return Image.fromarray(np.ascontiguousarray(arr), src_mode).convert(mode)
+    img = Image.open(path)
+    try:
+        check_image_size(ImageInfo(img.format, img.width, img.height, img.mode), max_pixels)
+        scale = decode_scale(img.width, img.height, max_side, min_side, cover)
+        if scale < 1.0:
+            # JPEG 외 포맷에서는 draft가 아무 동작도 하지 않음
+            img.draft(mode if mode in ("RGB", "L") else None,
+                      (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+        return img.convert(mode)
+    finally:
+        img.close()
+
+def load_cv2(path, flags=cv2.IMREAD_COLOR, max_side=None, min_side=None, max_pixels=MAX_IMAGE_PIXELS):
+    """OpenCV 배열 로드 - 헤더 검사 후 IMREAD_REDUCED_*로 필요한 해상도까지만 디코딩
+    (np.fromfile + imdecode: 비 ASCII 경로 지원)
+    """
+    info = probe_image(path)
+    check_image_size(info, max_pixels)
+    if info is not None and info.format == "NPY":
+        return _npy_to_cv2(_open_npy(path)[0], flags)
+    if info is not None and flags in _REDUCED_FLAGS:
+        factor = _reduction_factor(decode_scale(info.width, info.height, max_side, min_side))
+        if factor > 1:
+            flags = _REDUCED_FLAGS[flags][factor]
+    img = cv2.imdecode(np.fromfile(path, dtype=np.uint8), flags)
+    if img is None:
+        raise ValueError(f"이미지 파일을 열 수 없습니다: {path}")
+    return img
+
+def _npy_to_cv2(arr, flags):
+    """RGB(A)/L 배열 → OpenCV 규약(BGR/BGRA/그레이) 배열"""
+    arr = np.asarray(arr)
+    if arr.ndim == 2:
+        if flags == cv2.IMREAD_GRAYSCALE or flags == cv2.IMREAD_UNCHANGED:
+            return arr.copy()
+        return cv2.cvtColor(arr, cv2.COLOR_GRAY2BGR)
+    rgba = arr.shape[2] == 4
+    if flags == cv2.IMREAD_GRAYSCALE:
+        return cv2.cvtColor(arr, cv2.COLOR_RGBA2GRAY if rgba else cv2.COLOR_RGB2GRAY)
+    if flags == cv2.IMREAD_UNCHANGED and rgba:
+        return cv2.cvtColor(arr, cv2.COLOR_RGBA2BGRA)
+    return cv2.cvtColor(arr, cv2.COLOR_RGBA2BGR if rgba else cv2.COLOR_RGB2BGR)
+
+def output_suffix(path):
+    """결과 캐시에 저장할 때 사용할 확장자 (형식이 다른 결과끼리 섞이지 않도록)"""
+    return ".npy" if path.lower().endswith(".npy") else ".png"
+
+def temp_path(path, suffix=".tmp"):
+    """원자적 교체용 임시 파일 경로 - 프로세스와 스레드마다 다름 (상주 워커의 동시 작업이 같은 대상을 써도 충돌 없음)"""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}{suffix}"
+
+def save_image(image, path, fmt=None):
+    """단계 산출물 저장 (원자적) - 경로가 .npy면 원시 배열, 그 외는 PNG
+    image: PIL 이미지 또는 RGB(A)/L numpy 배열
+    """
+    fmt = fmt or INTERMEDIATE_FORMAT
+    if fmt not in INTERMEDIATE_FORMATS:
+        raise ValueError(f"지원하지 않는 중간 산출물 형식: {fmt} (허용: {', '.join(INTERMEDIATE_FORMATS)})")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = temp_path(path)
+    try:
+        if path.lower().endswith(".npy"):
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(np.asarray(image, dtype=np.uint8)), allow_pickle=False)
+        else:
+            if isinstance(image, np.ndarray):
+                image = Image.fromarray(image)
+            level = 6 if fmt == "png" else FAST_PNG_COMPRESS_LEVEL
+            image.save(tmp_path, "PNG", compress_level=level)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
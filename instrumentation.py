@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+공용 단계 계측 (구조화 이벤트 + 단계별 시간/메모리 지표)
+- emit(): 모든 스크립트가 같은 형식의 JSON-lines 이벤트를 한 스트림으로 출력
+- stage(): 단계 컨텍스트 매니저 - 실행 시간, CPU 시간, RSS 변화량(psutil 선택),
+  이미지 크기, 사용 엔진을 기록하고 stage_end 이벤트로 출력
+- 단계별 누적 지표를 Prometheus 텍스트 형식으로 덤프 (선택)
+
+환경 변수:
+- MEART_EVENTS=stderr|stdout|off|<파일 경로>   이벤트 출력 대상 (기본 stderr, 파일은 append)
+  stdout의 마지막 줄을 결과 JSON으로 읽는 server.js와 섞이지 않도록 기본값은 stderr
+- MEART_METRICS_FILE=<경로>                     프로세스 종료 시 Prometheus 텍스트 덤프
+  경로의 {script}는 스크립트 이름으로 치환 (스크립트별 파일로 분리하여 덮어쓰기 방지)
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+EVENT_SINK = os.environ.get("MEART_EVENTS", "stderr")
+METRICS_FILE = os.environ.get("MEART_METRICS_FILE")
+SCRIPT_NAME = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+
+_lock = threading.Lock()
+_metrics = {}
+_process = None
+
+def _sink_stream():
+    """현재 이벤트 출력 스트림 (호출 시점의 sys.stdout/stderr를 따름)"""
+    if EVENT_SINK == "stdout":
+        return sys.stdout, False
+    if EVENT_SINK == "stderr":
+        return sys.stderr, False
+    return open(EVENT_SINK, "a", encoding="utf-8"), True
+
+def emit(event, data=None):
+    """JSON-lines 이벤트 1건 출력 (계측 실패는 본 작업에 영향 주지 않음)"""
+    if EVENT_SINK == "off":
+        return
+    try:
+        payload = {"event": event, "ts": round(time.time(), 3), "script": SCRIPT_NAME, "pid": os.getpid()}
+        if data:
+            payload.update(data)
+        line = json.dumps(payload, ensure_ascii=False, default=str)
+        with _lock:
+            stream, owned = _sink_stream()
+            try:
+                stream.write(line + "\n")
+                stream.flush()
+            finally:
+                if owned:
+                    stream.close()
+    except Exception:
+        pass
+
+def rss_bytes():
+    """현재 프로세스 RSS (psutil 없으면 None)"""
+    global _process
+    if not HAS_PSUTIL:
+        return None
+    try:
+        if _process is None:
+            _process = psutil.Process()
+        return _process.memory_info().rss
+    except Exception:
+        return None
+
+def image_dims(image):
+    """PIL 이미지 / numpy 배열 / (w, h) → [w, h] (알 수 없으면 None)"""
+    if image is None:
+        return None
+    size = getattr(image, "size", None)
+    if isinstance(size, tuple) and len(size) == 2:
+        return [int(size[0]), int(size[1])]
+    shape = getattr(image, "shape", None)
+    if shape is not None and len(shape) >= 2:
+        # (H, W, C) 또는 (N, H, W, C) 텐서
+        if len(shape) == 4:
+            return [int(shape[2]), int(shape[1])]
+        return [int(shape[1]), int(shape[0])]
+    if isinstance(image, (list, tuple)) and len(image) == 2:
+        return [int(image[0]), int(image[1])]
+    return None
+
+class StageRecord:
+    """stage() 블록 안에서 크기/엔진 등 추가 필드를 기록"""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def set(self, image=None, engine=None, **fields):
+        if image is not None:
+            dims = image_dims(image)
+            if dims:
+                self.fields["width"], self.fields["height"] = dims
+        if engine is not None:
+            self.fields["engine"] = engine
+        self.fields.update(fields)
+
+@contextmanager
+def stage(name, image=None, engine=None, **fields):
+    """단계 계측 컨텍스트 - 종료 시 stage_end 이벤트 출력 및 지표 누적
+    with stage("grabcut", image=img, engine="opencv") as s:
+        ...
+        s.set(engine="pyramid")
+    CPU 시간은 프로세스 전체 기준 (워커에서 동시 작업이 있으면 합산됨)
+    """
+    record = StageRecord(name, {})
+    record.set(image=image, engine=engine, **fields)
+    emit("stage_start", dict(record.fields, stage=name))
+    rss_start = rss_bytes()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    status = "ok"
+    try:
+        yield record
+    except BaseException as e:
+        status = "error"
+        record.fields["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        rss_end = rss_bytes()
+        data = dict(record.fields, stage=name, status=status,
+                    duration_ms=round(duration * 1000, 2), cpu_ms=round(cpu * 1000, 2))
+        if rss_end is not None:
+            data["rss_mb"] = round(rss_end / 1024 / 1024, 1)
+            if rss_start is not None:
+                data["rss_delta_mb"] = round((rss_end - rss_start) / 1024 / 1024, 1)
+        emit("stage_end", data)
+        _record_metrics(name, record.fields.get("engine"), status, duration, cpu,
+                        None if rss_start is None or rss_end is None else rss_end - rss_start)
+
+def _record_metrics(name, engine, status, duration, cpu, rss_delta):
+    key = (name, engine or "", status)
+    with _lock:
+        m = _metrics.setdefault(key, {"count": 0, "seconds": 0.0, "cpu_seconds": 0.0, "rss_delta_max": 0})
+        m["count"] += 1
+        m["seconds"] += duration
+        m["cpu_seconds"] += cpu
+        if rss_delta is not None:
+            m["rss_delta_max"] = max(m["rss_delta_max"], rss_delta)
+
+def snapshot():
+    """누적 단계 지표 [{stage, engine, status, count, seconds, cpu_seconds, rss_delta_max}]"""
+    with _lock:
+        return [dict(m, stage=k[0], engine=k[1], status=k[2]) for k, m in sorted(_metrics.items())]
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def prometheus_text():
+    """누적 지표를 Prometheus 텍스트 노출 형식으로 변환"""
+    series = [
+        ("meart_stage_runs_total", "counter", "Completed stage runs", "count"),
+        ("meart_stage_seconds_total", "counter", "Wall-clock seconds spent in stage", "seconds"),
+        ("meart_stage_cpu_seconds_total", "counter", "Process CPU seconds spent in stage", "cpu_seconds"),
+        ("meart_stage_rss_delta_bytes_max", "gauge", "Largest RSS growth observed across one stage run", "rss_delta_max"),
+    ]
+    rows = snapshot()
+    lines = []
+    for metric, kind, help_text, field in series:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for row in rows:
+            labels = f'script="{_label(SCRIPT_NAME)}",stage="{_label(row["stage"])}",engine="{_label(row["engine"])}",status="{row["status"]}"'
+            lines.append(f"{metric}{{{labels}}} {row[field]}")
+    return "\n".join(lines) + "\n"
+
+def dump_prometheus(path=None):
+    """Prometheus 텍스트 파일 원자적 저장 (node_exporter textfile collector 호환)"""
+    path = path or METRICS_FILE
+    if not path or not _metrics:
+        return None
+    path = path.replace("{script}", SCRIPT_NAME)
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ 지표 저장 실패: {e}", file=sys.stderr)
+        return None
+    return path
+
+if METRICS_FILE:
+    atexit.register(dump_prometheus)
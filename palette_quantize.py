@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+팔레트 색상 양자화 엔진 (유화 스타일 색상 단순화용)
+1. 서브샘플 픽셀에 벡터화 k-means 적용 → 팔레트 생성
+2. 전체 이미지를 가장 가까운 팔레트 색상으로 일괄 매핑
+"""
+import numpy as np
+
+DEFAULT_PALETTE_SIZE = 16
+
+def build_palette(pixels, n_colors=DEFAULT_PALETTE_SIZE, sample_size=20000, iterations=8, seed=0):
+    """(N, 3) 픽셀에서 k-means 팔레트 (n_colors, 3) 생성 - 서브샘플 기반"""
+    pixels = np.asarray(pixels, dtype=np.float32).reshape(-1, 3)
+    rng = np.random.RandomState(seed)
+    if len(pixels) > sample_size:
+        sample = pixels[rng.choice(len(pixels), sample_size, replace=False)]
+    else:
+        sample = pixels
+    n_colors = max(1, min(int(n_colors), len(sample)))
+
+    # 초기 중심: 밝기 순 정렬 후 균등 분위수 (결정적, 색 분포 전체를 덮음)
+    order = np.argsort(sample.sum(axis=1))
+    centers = sample[order[np.linspace(0, len(sample) - 1, n_colors).astype(int)]].copy()
+
+    for _ in range(iterations):
+        labels = _nearest(sample, centers)
+        counts = np.bincount(labels, minlength=n_colors).astype(np.float32)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, sample)
+        filled = counts > 0
+        new_centers = centers.copy()
+        new_centers[filled] = sums[filled] / counts[filled, np.newaxis]
+        if np.allclose(new_centers, centers, atol=1e-4):
+            centers = new_centers
+            break
+        centers = new_centers
+    return centers
+
+def _nearest(pixels, palette):
+    """각 픽셀에 가장 가까운 팔레트 인덱스 (|x|² - 2x·p + |p|² 전개)"""
+    dist = (palette ** 2).sum(axis=1)[np.newaxis, :] - 2.0 * pixels @ palette.T
+    return np.argmin(dist, axis=1)
+
+def assign_palette(img, palette, chunk_pixels=262144):
+    """(H, W, 3) 이미지를 팔레트 색상으로 매핑 (메모리 제한을 위해 청크 단위)"""
+    h, w, c = img.shape
+    flat = np.asarray(img, dtype=np.float32).reshape(-1, c)
+    palette = np.asarray(palette, dtype=np.float32)
+    labels = np.empty(len(flat), dtype=np.intp)
+    for start in range(0, len(flat), chunk_pixels):
+        labels[start:start + chunk_pixels] = _nearest(flat[start:start + chunk_pixels], palette)
+    return palette[labels].reshape(h, w, c)
+
+def quantize_image(img, n_colors=DEFAULT_PALETTE_SIZE, palette=None):
+    """이미지 색상 단순화 - palette 미지정 시 이미지에서 생성"""
+    if palette is None:
+        palette = build_palette(img.reshape(-1, img.shape[2]), n_colors)
+    return assign_palette(img, palette).astype(img.dtype, copy=False)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+인메모리 연결 파이프라인 - 업로드를 1회만 디코딩하고 모든 단계가 같은 배열을 공유
+업로드 → [감정 분석 ∥ 배경 제거] → 브러시 효과 → 최종 산출물만 저장
+- 감정 분석과 배경 제거는 스레드에서 동시 실행 (cv2 GrabCut/numpy 연산은 GIL 해제)
+- 배경 제거 결과 배열을 디스크 왕복 없이 브러시 단계에 바로 전달
+- 디스크에는 nobg, brush 산출물만 기록 (nobg 저장은 브러시 단계와 겹쳐서 실행)
+  경로가 .npy면 원시 RGBA 배열로 기록 (image_loader.save_image)
+
+사용법:
+python pipeline.py <input_path> <nobg_output> <brush_output> [--emotion simple|onnx] [--grabcut full|pyramid]
+출력: 마지막 줄이 결과 JSON {"success", "emotion", "nobg", "brush", "timings_ms"}
+"""
+import sys
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+from PIL import Image
+from image_loader import load_pil, output_suffix, save_image
+from face_detection import get_face_detections
+from grabcut_refine import DEFAULT_GRABCUT_MODE, pop_grabcut_option
+from result_cache import get_cache
+from instrumentation import emit, stage
+
+EMOTION_ENGINES = ("simple", "onnx")
+DEFAULT_EMOTION_ENGINE = os.environ.get("MEART_PIPELINE_EMOTION", "simple")
+
+def _analyze_emotion(img_rgb, img_bgr, image_path, engine):
+    if engine == "onnx":
+        from emotion_analysis import analyze_emotion_array
+        return analyze_emotion_array(img_bgr, image_path)
+    from simple_emotion import analyze_image_array
+    return analyze_image_array(img_rgb, image_path)
+
+def _emotion_model_name(engine):
+    if engine != "onnx":
+        return None
+    from emotion_analysis import emotion_model_path
+    return os.path.basename(emotion_model_path())
+
+def _remove_background(img_bgr, image_path, grabcut_mode):
+    from advanced_bg_remove import remove_background_array
+    return remove_background_array(img_bgr, image_path, grabcut_mode)
+
+def _apply_brush(rgba, backend=None):
+    """반환: (브러시 이미지, 실제 사용한 백엔드)"""
+    from brush_effect_minimal import apply_minimal_brush_effect
+    return apply_minimal_brush_effect(Image.fromarray(rgba, 'RGBA'), backend)
+
+def _timed(timings, name, fn, *args):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+def run_pipeline(input_path, nobg_path, brush_path, emotion_engine=DEFAULT_EMOTION_ENGINE, grabcut_mode=DEFAULT_GRABCUT_MODE):
+    """업로드 1장 → 감정 결과 + nobg/brush 산출물
+    반환: {"success", "emotion", "nobg", "brush", "timings_ms", "cached"}
+    """
+    if emotion_engine not in EMOTION_ENGINES:
+        raise ValueError(f"지원하지 않는 감정 분석 엔진: {emotion_engine} (허용: {', '.join(EMOTION_ENGINES)})")
+    from style_onnx import STYLE_BACKEND_ENGINES, resolve_style_backend
+    brush_backend = resolve_style_backend()
+
+    # 동일 입력 + 설정의 최종 산출물 캐시 확인 (세 항목이 모두 있을 때만 적중)
+    cache = get_cache()
+    cache_key = cache.key(input_path, "pipeline", {
+        "emotion": emotion_engine,
+        "emotion_model": _emotion_model_name(emotion_engine),
+        "grabcut_mode": grabcut_mode,
+        "brush_backend": brush_backend,
+    })
+    cached = cache.get_json(cache_key)
+    if cached is not None and cache.restore_file(cache_key, "_nobg" + output_suffix(nobg_path), nobg_path) \
+            and cache.restore_file(cache_key, "_brush" + output_suffix(brush_path), brush_path):
+        return dict(cached, nobg=nobg_path, brush=brush_path, cached=True)
+
+    timings = {}
+    with stage("pipeline", engine=emotion_engine, grabcut_mode=grabcut_mode) as record:
+        # 1. 1회 디코딩 (cv2 단계용 BGR 사본도 한 번만 만든다)
+        with stage("decode"):
+            img_rgb = _timed(timings, "decode", lambda: np.asarray(load_pil(input_path, 'RGB')))
+            img_bgr = np.ascontiguousarray(img_rgb[:, :, ::-1])
+        record.set(image=img_rgb)
+
+        # 2. 얼굴 검출은 두 분기가 모두 사용하므로 분기 전에 1회 실행 (사이드카 기록 공유)
+        gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+        _timed(timings, "face_detection", get_face_detections, input_path, gray, emotion_engine == "simple")
+        del gray
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # 3. 감정 분석 ∥ 배경 제거
+            emotion_future = pool.submit(_timed, timings, "emotion", _analyze_emotion, img_rgb, img_bgr, input_path, emotion_engine)
+            rgba = _timed(timings, "segmentation", _remove_background, img_bgr, input_path, grabcut_mode)
+            del img_bgr
+
+            # 4. nobg 저장을 브러시 단계와 겹쳐서 실행
+            nobg_future = pool.submit(_timed, timings, "save_nobg", save_image, rgba, nobg_path)
+            with stage("brush_effect_minimal", image=rgba, engine=STYLE_BACKEND_ENGINES[brush_backend]) as brush_stage:
+                brushed, used_backend = _timed(timings, "brush", _apply_brush, rgba, brush_backend)
+                brush_stage.set(engine=STYLE_BACKEND_ENGINES[used_backend])
+            _timed(timings, "save_brush", save_image, brushed, brush_path)
+
+            nobg_future.result()
+            emotion = emotion_future.result()
+        record.set(emotion=emotion.get("emotion"))
+
+    result = {"success": True, "emotion": emotion, "nobg": nobg_path, "brush": brush_path, "timings_ms": timings}
+    if used_backend != brush_backend:
+        # 브러시가 PIL로 폴백한 결과는 캐시하지 않음 (조회 키는 요청 백엔드라 폴백 결과가 고정됨)
+        emit("pipeline_done", {"timings_ms": timings, "cache_skipped": "brush_fallback"})
+        return dict(result, cached=False)
+    cache.put_file(cache_key, "_nobg" + output_suffix(nobg_path), nobg_path)
+    cache.put_file(cache_key, "_brush" + output_suffix(brush_path), brush_path)
+    cache.put_json(cache_key, {"success": True, "emotion": emotion, "timings_ms": timings})
+    emit("pipeline_done", {"timings_ms": timings})
+    return dict(result, cached=False)
+
+def main():
+    argv, grabcut_mode = pop_grabcut_option(sys.argv)
+    emotion_engine = DEFAULT_EMOTION_ENGINE
+    if "--emotion" in argv:
+        i = argv.index("--emotion")
+        if i + 1 >= len(argv):
+            print('❌ --emotion 값이 필요합니다 (simple|onnx)')
+            sys.exit(1)
+        emotion_engine = argv[i + 1]
+        del argv[i:i + 2]
+    if len(argv) < 4:
+        print('사용법: python pipeline.py <input_path> <nobg_output> <brush_output> [--emotion simple|onnx] [--grabcut full|pyramid]')
+        sys.exit(1)
+
+    input_path, nobg_path, brush_path = argv[1:4]
+    if not os.path.exists(input_path):
+        print(f"❌ 입력 파일이 존재하지 않습니다: {input_path}")
+        sys.exit(1)
+
+    try:
+        result = run_pipeline(input_path, nobg_path, brush_path, emotion_engine, grabcut_mode)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        print("=== PIPELINE_RESULT ===")
+        print(json.dumps({"success": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+
+    # JSON 출력 (서버에서 마지막 줄 파싱)
+    print("=== PIPELINE_RESULT ===")
+    print(json.dumps(result, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+상주 Python 워커 - 요청마다 인터프리터를 새로 띄우지 않고 작업 처리
+cv2/numpy/PIL, TensorFlow Hub 모델 등은 최초 1회만 로드하고 이후 요청에서 재사용한다.
+
+프로토콜: JSON Lines (한 줄에 하나의 JSON)
+- 요청: {"id": "job-1", "task": "u2net_remove_bg", "args": {"input_path": "...", "output_path": "..."}}
+- 응답: {"id": "job-1", "ok": true, "result": ..., "elapsed_ms": 123.4}
+- 입장 알림: {"id": "job-1", "event": "admitted"} - 대기열을 지나 실행을 시작할 때 응답보다 먼저 전송
+  (클라이언트는 이 시점부터 실행 타임아웃을 재고, 이후에는 같은 작업을 다른 경로로 다시 실행하지 않는다)
+- {"task": "metrics"}: 누적 단계 지표 (instrumentation.prometheus_text) + 입장 스케줄러 상태
+- 요청의 "priority"(정수, 클수록 먼저)는 메모리 대기열 순서에 사용
+
+메모리 인지 입장 제어 (admission.AdmissionScheduler):
+작업별 예상 메모리 합이 예산(MEART_MEMORY_BUDGET_MB) 안에 들 때만 실행하고 나머지는 대기열에 둔다.
+stdio 모드도 요청마다 스레드에서 실행하므로 응답 순서는 완료 순서 (id로 대응)
+
+사용법:
+- python python_worker.py                      # stdin/stdout JSON Lines
+- python python_worker.py --socket /tmp/meart.sock
+- python python_worker.py --preload emotion_analysis,brush_effect_minimal
+- python python_worker.py --memory-budget-mb 1500 --max-jobs 2
+
+주의: 각 스크립트의 print 로그는 stderr로 전달되며, stdout에는 응답 JSON만 기록된다.
+"""
+import sys
+import os
+import json
+import time
+import importlib
+import threading
+import traceback
+import instrumentation
+from admission import AdmissionScheduler
+
+sys.stdout.reconfigure(encoding='utf-8')
+sys.stderr.reconfigure(encoding='utf-8')
+
+# 프로토콜 출력 채널 (stdout) 을 분리하고, 스크립트 로그는 stderr로 보낸다
+_protocol_out = sys.stdout
+sys.stdout = sys.stderr
+_write_lock = threading.Lock()
+
+# 스크립트 기준 경로 (models/, BG_image/ 상대 경로 보장)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _run_u2net_remove_bg(mod, args):
+    # CLI와 같은 파싱/범위 제한 ("false" 문자열 → False, fg 80-200 / bg 20-100 / erode 1-5)
+    params = mod.parse_params(
+        args.get("alpha_matting", True),
+        args.get("fg_threshold", 180),
+        args.get("bg_threshold", 50),
+        args.get("erode_size", 1),
+    )
+    return mod.process_image(
+        args["input_path"],
+        args["output_path"],
+        *params,
+        args.get("grabcut_mode", mod.DEFAULT_GRABCUT_MODE),
+    )
+
+def _run_advanced_bg_remove(mod, args):
+    return mod.advanced_background_removal(
+        args["input_path"], args["output_path"], args.get("grabcut_mode", mod.DEFAULT_GRABCUT_MODE)
+    )
+
+def _run_emotion_analysis(mod, args):
+    return mod.analyze_emotion(args["image_path"], args.get("backend"))
+
+def _run_emotion_analysis_batch(mod, args):
+    return mod.analyze_emotions(args["image_paths"], backend=args.get("backend"))
+
+def _run_simple_emotion(mod, args):
+    return mod.analyze_image_emotion(args["image_path"])
+
+def _run_brush_effect_minimal(mod, args):
+    return mod.process_brush_effect(args["input_path"], args["output_path"], args.get("backend"))
+
+def _run_brush_effect_batch(mod, args):
+    return mod.render_style_batch(args["input_path"], args["output_dir"], args["style_paths"], args.get("backend"))
+
+def _run_pipeline(mod, args):
+    return mod.run_pipeline(
+        args["input_path"],
+        args["nobg_path"],
+        args["brush_path"],
+        args.get("emotion_engine", mod.DEFAULT_EMOTION_ENGINE),
+        args.get("grabcut_mode", mod.DEFAULT_GRABCUT_MODE),
+    )
+
+def _run_recommend_artworks(mod, args):
+    return mod.recommend_from_args(args)
+
+def _warm_brush_effect_minimal(mod):
+    # 선택된 백엔드(onnx/tf)의 스타일 모델 로드, 모델이 없으면 PIL 폴백을 사용하므로 실패해도 무시
+    mod.warm_style_model()
+
+# 작업 이름 → (모듈 이름, 실행 함수, 예열 함수)
+TASKS = {
+    "u2net_remove_bg": ("u2net_remove_bg", _run_u2net_remove_bg, None),
+    "advanced_bg_remove": ("advanced_bg_remove", _run_advanced_bg_remove, None),
+    "emotion_analysis": ("emotion_analysis", _run_emotion_analysis, None),
+    "emotion_analysis_batch": ("emotion_analysis", _run_emotion_analysis_batch, None),
+    "simple_emotion": ("simple_emotion", _run_simple_emotion, None),
+    "brush_effect_minimal": ("brush_effect_minimal", _run_brush_effect_minimal, _warm_brush_effect_minimal),
+    "brush_effect_batch": ("brush_effect", _run_brush_effect_batch, None),
+    "pipeline": ("pipeline", _run_pipeline, None),
+    "recommend_artworks": ("artwork_index", _run_recommend_artworks, None),
+}
+
+_modules = {}
+_modules_lock = threading.Lock()
+_scheduler = None
+
+def get_scheduler():
+    """입장 스케줄러 (main()에서 옵션으로 생성, 모듈로 쓰일 때는 환경 변수 기본값)"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AdmissionScheduler()
+    return _scheduler
+
+def get_task_module(task):
+    """작업 모듈 지연 로드 (프로세스당 1회 임포트)"""
+    module_name = TASKS[task][0]
+    with _modules_lock:
+        mod = _modules.get(module_name)
+        if mod is None:
+            started = time.perf_counter()
+            mod = importlib.import_module(module_name)
+            _modules[module_name] = mod
+            print(f"📦 모듈 로드: {module_name} ({(time.perf_counter() - started) * 1000:.0f}ms)")
+    return mod
+
+def preload(task_names):
+    """지정한 작업의 모듈과 모델을 미리 로드"""
+    for task in task_names:
+        if task not in TASKS:
+            print(f"⚠️ 알 수 없는 작업은 예열 생략: {task}")
+            continue
+        try:
+            mod = get_task_module(task)
+            warm = TASKS[task][2]
+            if warm is not None:
+                warm(mod)
+            print(f"🔥 예열 완료: {task}")
+        except Exception as e:
+            print(f"⚠️ 예열 실패 ({task}): {e}")
+
+def handle_job(job, notify=None):
+    """단일 작업 실행 후 응답 dict 반환 (notify: 입장 알림 {"event": "admitted"}을 보낼 콜백)"""
+    job_id = job.get("id")
+    task = job.get("task")
+    started = time.perf_counter()
+
+    if task == "ping":
+        return {"id": job_id, "ok": True, "result": {"pid": os.getpid(), "loaded": sorted(_modules)}}
+    if task == "metrics":
+        # 워커 수명 동안 누적된 단계별 지표 (Prometheus 텍스트 + 원시 값)
+        return {"id": job_id, "ok": True, "result": {
+            "prometheus": instrumentation.prometheus_text(),
+            "stages": instrumentation.snapshot(),
+            "scheduler": get_scheduler().snapshot(),
+        }}
+    if task not in TASKS:
+        return {"id": job_id, "ok": False, "error": f"unknown task: {task}"}
+
+    try:
+        mod = get_task_module(task)
+        args = job.get("args") or {}
+        with get_scheduler().admit(task, args, int(job.get("priority", 0))):
+            if notify is not None:
+                notify({"id": job_id, "event": "admitted"})
+            result = TASKS[task][1](mod, args)
+        # 배경 제거/브러시 스크립트는 성공 여부(bool)를 반환
+        ok = result is not False
+        response = {"id": job_id, "ok": ok, "result": result}
+    except SystemExit as e:
+        # 일부 스크립트는 실패 시 sys.exit() 호출 → 워커는 유지
+        response = {"id": job_id, "ok": False, "error": f"script exited with code {e.code}"}
+    except Exception as e:
+        traceback.print_exc()
+        response = {"id": job_id, "ok": False, "error": str(e)}
+
+    response["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return response
+
+def _parse_line(line):
+    try:
+        return json.loads(line), None
+    except json.JSONDecodeError as e:
+        return None, {"id": None, "ok": False, "error": f"invalid json: {e}"}
+
+def _write_response(stream, response):
+    with _write_lock:
+        stream.write(json.dumps(response, ensure_ascii=False, default=str) + "\n")
+        stream.flush()
+
+def serve_stdio():
+    """stdin에서 요청을 읽고 stdout으로 응답 (EOF/shutdown 시 진행 중 작업 완료 후 종료)
+    요청마다 스레드에서 실행 - 동시 실행 여부는 입장 스케줄러가 메모리 예산으로 결정
+    """
+    _write_response(_protocol_out, {"event": "ready", "pid": os.getpid()})
+    threads = []
+    shutdown_id = None
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        job, error = _parse_line(line)
+        if error is not None:
+            _write_response(_protocol_out, error)
+            continue
+        if job.get("task") == "shutdown":
+            shutdown_id = job.get("id")
+            break
+        notify = lambda message: _write_response(_protocol_out, message)
+        thread = threading.Thread(target=lambda j=job: _write_response(_protocol_out, handle_job(j, notify)), daemon=True)
+        thread.start()
+        threads = [t for t in threads if t.is_alive()] + [thread]
+    for thread in threads:
+        thread.join()
+    if shutdown_id is not None:
+        _write_response(_protocol_out, {"id": shutdown_id, "ok": True, "result": "bye"})
+
+def serve_socket(socket_path):
+    """Unix 소켓으로 요청 수신 (연결별 스레드, 연결 내부는 순차 처리)"""
+    import socketserver
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode("utf-8").strip()
+                if not line:
+                    continue
+                job, error = _parse_line(line)
+                response = error if error is not None else handle_job(job, self._send)
+                self._send(response)
+
+        def _send(self, message):
+            self.wfile.write((json.dumps(message, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+    class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with _Server(socket_path, _Handler) as server:
+        _write_response(_protocol_out, {"event": "ready", "pid": os.getpid(), "socket": socket_path})
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="MeArt 상주 Python 워커")
+    parser.add_argument("--socket", help="Unix 소켓 경로 (미지정 시 stdin/stdout 사용)")
+    parser.add_argument("--preload", default="", help="미리 로드할 작업 목록 (쉼표 구분, all 가능)")
+    parser.add_argument("--memory-budget-mb", type=float, help="동시 작업 메모리 예산 (기본: MEART_MEMORY_BUDGET_MB 또는 사용 가능 메모리의 70%%)")
+    parser.add_argument("--max-jobs", type=int, help="동시 실행 작업 상한 (기본: MEART_MAX_JOBS 또는 CPU 수)")
+    opts = parser.parse_args()
+
+    global _scheduler
+    _scheduler = AdmissionScheduler(opts.memory_budget_mb, opts.max_jobs)
+    print(f"🧮 메모리 예산 {_scheduler.budget_mb:.0f}MB, 동시 작업 최대 {_scheduler.max_jobs}개")
+
+    os.chdir(BASE_DIR)
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+
+    if opts.preload:
+        names = list(TASKS) if opts.preload == "all" else [n.strip() for n in opts.preload.split(",") if n.strip()]
+        preload(names)
+
+    if opts.socket:
+        serve_socket(opts.socket)
+    else:
+        serve_stdio()
+
+if __name__ == "__main__":
+    main()
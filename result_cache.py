@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+파이프라인 단계 결과 캐시 (내용 주소 기반, 디스크 저장)
+- 키: 입력 파일 내용 해시 + 단계 이름 + 단계 파라미터
+- 원자적 쓰기 (임시 파일 → os.replace), 용량 상한 LRU 제거 (접근 시각 기준)
+  쓰기마다 디렉터리를 훑지 않는다: 쓴 크기를 누적한 추정 용량이 상한을 넘거나
+  N번 쓸 때마다(다른 프로세스의 쓰기 반영) 한 번 전체를 훑어 정리한다
+- 단계별 hit/miss 카운터를 stats.json에 누적 (프로세스 간 공유)
+  조회마다 파일 잠금을 잡지 않도록 메모리에 모았다가 주기적으로/종료 시 반영한다
+
+환경 변수:
+- MEART_RESULT_CACHE=0          캐시 비활성화
+- MEART_CACHE_DIR=<경로>         캐시 디렉터리 (기본: cache/results)
+- MEART_CACHE_MAX_MB=<정수>      최대 용량 (기본 512MB)
+- MEART_CACHE_EVICT_EVERY=<정수> 전체 용량 점검 주기 (쓰기 횟수, 기본 64)
+- MEART_CACHE_STATS_FLUSH_S=<초> 통계 반영 주기 (기본 30초, 0이면 매번 반영)
+"""
+import os
+import json
+import shutil
+import atexit
+import hashlib
+import threading
+import time
+from face_detection import file_sha256
+from image_loader import temp_path
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_ENABLED = os.environ.get("MEART_RESULT_CACHE", "1") != "0"
+CACHE_DIR = os.environ.get("MEART_CACHE_DIR", os.path.join(BASE_DIR, "cache", "results"))
+CACHE_MAX_BYTES = int(os.environ.get("MEART_CACHE_MAX_MB", "512")) * 1024 * 1024
+EVICT_EVERY = max(1, int(os.environ.get("MEART_CACHE_EVICT_EVERY", "64")))
+STATS_FLUSH_SECONDS = float(os.environ.get("MEART_CACHE_STATS_FLUSH_S", "30"))
+STATS_FLUSH_COUNT = 100  # 시간과 무관하게 이만큼 쌓이면 반영
+EVICT_LOW_WATER = 0.9  # 상한을 넘으면 상한의 90%까지 비워 다음 몇 번의 쓰기는 점검 없이 통과
+
+STATS_FILE = "stats.json"
+
+class ResultCache:
+    """단계 결과 파일/JSON 캐시"""
+
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, enabled=CACHE_ENABLED):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._digests = {}
+        self._lock = threading.Lock()
+        # 용량 추정 (None이면 아직 전체 점검 전) + 마지막 점검 이후 쓰기 횟수
+        self._approx_bytes = None
+        self._writes_since_scan = 0
+        # stats.json에 아직 반영하지 않은 카운터 {stage: {field: n}}
+        self._pending = {}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush_stats)
+
+    # ---- 키 ----
+    def key(self, input_path, stage, params=None):
+        """입력 내용 + 단계 + 파라미터로 캐시 키 생성"""
+        stat = os.stat(input_path)
+        memo_key = (os.path.abspath(input_path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            digest = file_sha256(input_path)
+            self._digests[memo_key] = digest
+        payload = json.dumps({"input": digest, "stage": stage, "params": params or {}}, sort_keys=True)
+        return f"{stage}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def _entry_path(self, key, suffix):
+        digest = key.rsplit("-", 1)[-1]
+        return os.path.join(self.root, digest[:2], key + suffix)
+
+    # ---- 조회/저장 ----
+    def restore_file(self, key, suffix, dest_path):
+        """캐시 파일을 dest_path로 복사 (hit 시 True)"""
+        if not self.enabled:
+            return False
+        stage = key.rsplit("-", 1)[0]
+        path = self._entry_path(key, suffix)
+        try:
+            dest_dir = os.path.dirname(dest_path) or "."
+            os.makedirs(dest_dir, exist_ok=True)
+            tmp_path = temp_path(dest_path)
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            os.utime(path)
+        except FileNotFoundError:
+            self._count(stage, "misses")
+            return False
+        except OSError as e:
+            print(f"⚠️ 캐시 복원 실패: {e}")
+            self._count(stage, "misses")
+            return False
+        self._count(stage, "hits")
+        print(f"♻️ 캐시 적중: {stage} → {dest_path}")
+        return True
+
+    def put_file(self, key, suffix, src_path):
+        """결과 파일을 캐시에 원자적으로 저장"""
+        if not self.enabled:
+            return
+        path = self._entry_path(key, suffix)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = temp_path(path)
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"⚠️ 캐시 저장 실패: {e}")
+            return
+        self._count(key.rsplit("-", 1)[0], "writes")
+        self._maybe_evict(size)
+
+    def get_json(self, key):
+        """캐시된 JSON 결과 (miss 시 None)"""
+        if not self.enabled:
+            return None
+        stage = key.rsplit("-", 1)[0]
+        path = self._entry_path(key, ".json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._count(stage, "misses")
+            return None
+        self._count(stage, "hits")
+        print(f"♻️ 캐시 적중: {stage}")
+        return value
+
+    def put_json(self, key, value):
+        """JSON 결과를 캐시에 원자적으로 저장"""
+        if not self.enabled:
+            return
+        path = self._entry_path(key, ".json")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = temp_path(path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ 캐시 저장 실패: {e}")
+            return
+        self._count(key.rsplit("-", 1)[0], "writes")
+        self._maybe_evict(size)
+
+    # ---- 용량 관리 ----
+    def _entries(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name == STATS_FILE or name.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _maybe_evict(self, written_bytes):
+        """쓰기 후 호출: 추정 용량이 상한을 넘었거나 점검 주기가 되면 evict()
+        덮어쓴 항목도 더하므로 추정치는 실제보다 크거나 같다 (점검이 늦어지지 않음)
+        """
+        with self._lock:
+            self._writes_since_scan += 1
+            if self._approx_bytes is not None:
+                self._approx_bytes += written_bytes
+                if self._approx_bytes <= self.max_bytes and self._writes_since_scan < EVICT_EVERY:
+                    return 0
+        return self.evict()
+
+    def evict(self):
+        """총 용량이 상한을 넘으면 가장 오래 접근하지 않은 항목부터 삭제 (상한의 EVICT_LOW_WATER까지)"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        with self._lock:
+            self._writes_since_scan = 0
+            self._approx_bytes = total
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        target = self.max_bytes * EVICT_LOW_WATER
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._approx_bytes = total
+        if removed:
+            self._count("_cache", "evictions", removed)
+        return removed
+
+    # ---- 통계 ----
+    def _count(self, stage, field, amount=1):
+        """단계별 카운터를 메모리에 누적 (STATS_FLUSH_SECONDS 또는 STATS_FLUSH_COUNT마다 stats.json에 반영)"""
+        with self._lock:
+            entry = self._pending.setdefault(stage, {})
+            entry[field] = entry.get(field, 0) + amount
+            self._pending_count += 1
+            due = (self._pending_count >= STATS_FLUSH_COUNT
+                   or time.monotonic() - self._last_flush >= STATS_FLUSH_SECONDS)
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """모아 둔 카운터를 stats.json에 반영 (파일 잠금으로 프로세스 간 안전하게 갱신)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_count = 0
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, STATS_FILE), "a+", encoding="utf-8") as f:
+                if HAS_FCNTL:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                try:
+                    stats = json.loads(f.read() or "{}")
+                except ValueError:
+                    stats = {}
+                for stage, fields in pending.items():
+                    entry = stats.setdefault(stage, {})
+                    for field, amount in fields.items():
+                        entry[field] = entry.get(field, 0) + amount
+                stats["updated_at"] = time.time()
+                f.seek(0)
+                f.truncate()
+                json.dump(stats, f, ensure_ascii=False)
+        except OSError:
+            pass
+
+    def stats(self):
+        """누적 hit/miss 통계 (이 프로세스에서 모아 둔 카운터도 먼저 반영)"""
+        self.flush_stats()
+        try:
+            with open(os.path.join(self.root, STATS_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+_default_cache = None
+
+def get_cache():
+    """프로세스 공용 캐시 인스턴스"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
+
+if __name__ == "__main__":
+    # 사용법: python result_cache.py [stats|evict]
+    import sys
+    cache = get_cache()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "evict":
+        print(json.dumps({"removed": cache.evict()}, ensure_ascii=False))
+    else:
+        print(json.dumps(cache.stats(), ensure_ascii=False, indent=2))
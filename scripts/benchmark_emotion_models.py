@@ -0,0 +1,183 @@
+"""Compare the fp32 emotion model against its quantized variants on real face crops.
+
+Face crops come from a directory of photos or a manifest (one path or
+{"path": ...} per line), preprocessed exactly like emotion_analysis. For each
+model the report has its file size, per-call latency (batch 1), batch
+throughput and top-1 agreement with the fp32 model. Pass --min-agreement to
+exit non-zero when a variant disagrees with fp32 too often.
+
+    python scripts/quantize_emotion_model.py --mode static --calibration uploads/
+    python scripts/benchmark_emotion_models.py uploads/ --output emotion_bench.json
+    python scripts/benchmark_emotion_models.py uploads/ --models fp32,int8-static --min-agreement 0.97
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BASE_DIR)
+
+from emotion_analysis import (  # noqa: E402
+    EMOTION_MODEL_VARIANTS,
+    FERPLUS_EMOTIONS,
+    collect_face_crops,
+    read_manifest,
+    run_emotion_batch,
+    softmax,
+)
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def image_sources(path):
+    """Directory (recursive) or manifest -> list of absolute image paths."""
+    if not os.path.isdir(path):
+        return [os.path.abspath(p) for p in read_manifest(path)]
+    paths = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        paths.extend(
+            os.path.abspath(os.path.join(root, name)) for name in sorted(files)
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTS
+        )
+    return paths
+
+
+def model_path(name):
+    """Variant name -> path under the app directory; anything else is a file path."""
+    if name in EMOTION_MODEL_VARIANTS:
+        return os.path.join(BASE_DIR, EMOTION_MODEL_VARIANTS[name])
+    return os.path.abspath(name)
+
+
+def make_session(path):
+    import onnxruntime as ort
+    return ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def per_call_latency(session, crops, repeat, warmup):
+    """Batch-1 session.run latency in ms, cycling through the crops."""
+    input_name = session.get_inputs()[0].name
+    for i in range(warmup):
+        session.run(None, {input_name: crops[i % len(crops)][np.newaxis]})
+    samples = []
+    for i in range(repeat):
+        x = crops[i % len(crops)][np.newaxis]
+        started = time.perf_counter()
+        session.run(None, {input_name: x})
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "mean": round(float(np.mean(samples)), 3),
+        "p50": round(_percentile(samples, 0.5), 3),
+        "p95": round(_percentile(samples, 0.95), 3),
+    }
+
+
+def batch_scores(session, crops, batch_size):
+    return np.concatenate([
+        run_emotion_batch(session, crops[i:i + batch_size])
+        for i in range(0, len(crops), batch_size)
+    ])
+
+
+def throughput(session, crops, batch_size, min_seconds):
+    """Faces per second through run_emotion_batch (same path as analyze_emotions)."""
+    batch_scores(session, crops[:batch_size], batch_size)
+    faces, started = 0, time.perf_counter()
+    while True:
+        batch_scores(session, crops, batch_size)
+        faces += len(crops)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return round(faces / elapsed, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", help="directory of photos or manifest file")
+    parser.add_argument("--models", default=",".join(EMOTION_MODEL_VARIANTS),
+                        help="comma-separated variant names or model paths (fp32 is always the reference)")
+    parser.add_argument("--max-faces", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=300, help="batch-1 calls timed per model")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-seconds", type=float, default=2.0, help="minimum wall time per throughput run")
+    parser.add_argument("--min-agreement", type=float, default=None)
+    parser.add_argument("--output", help="write the results JSON here")
+    args = parser.parse_args()
+
+    crops = collect_face_crops(image_sources(args.images), args.max_faces)
+    if len(crops) == 0:
+        print("Error: no face crops found in", args.images)
+        sys.exit(1)
+    print(f"Face crops: {len(crops)}")
+
+    # fp32 is the reference and always runs first
+    names = ["fp32"] + [n for n in args.models.split(",") if n and n != "fp32" and model_path(n) != model_path("fp32")]
+    if not os.path.exists(model_path("fp32")):
+        print(f"Error: fp32 reference model not found: {model_path('fp32')}")
+        sys.exit(1)
+    reference = None
+    results = []
+    for name in names:
+        path = model_path(name)
+        if not os.path.exists(path):
+            print(f"  skip {name}: {path} not found")
+            continue
+        session = make_session(path)
+        scores = batch_scores(session, crops, args.batch_size)
+        probs = np.stack([softmax(row) for row in scores])
+        entry = {
+            "model": name,
+            "path": path,
+            "size_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+            "latency_ms": per_call_latency(session, crops, args.repeat, args.warmup),
+            "faces_per_s": throughput(session, crops, args.batch_size, args.min_seconds),
+        }
+        if reference is None:
+            reference = probs
+        else:
+            top1 = probs.argmax(axis=1) == reference.argmax(axis=1)
+            entry["top1_agreement"] = round(float(top1.mean()), 4)
+            entry["max_prob_diff"] = round(float(np.abs(probs - reference).max()), 4)
+            # Per-class view of where the variant disagrees with fp32
+            entry["disagreements"] = {
+                FERPLUS_EMOTIONS[i]: int(n)
+                for i, n in enumerate(np.bincount(reference.argmax(axis=1)[~top1], minlength=len(FERPLUS_EMOTIONS)))
+                if n
+            }
+        results.append(entry)
+
+    base = results[0]
+    print(f"\n{'model':<14} {'size MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'faces/s':>9} {'speedup':>8} {'top-1':>7}")
+    for r in results:
+        speedup = base["latency_ms"]["p50"] / r["latency_ms"]["p50"] if r["latency_ms"]["p50"] else 0.0
+        agreement = f"{r['top1_agreement']:.2%}" if "top1_agreement" in r else "ref"
+        print(f"{r['model']:<14} {r['size_mb']:>8.2f} {r['latency_ms']['p50']:>8.3f} {r['latency_ms']['p95']:>8.3f}"
+              f" {r['faces_per_s']:>9.1f} {speedup:>7.2f}x {agreement:>7}")
+
+    report = {"faces": int(len(crops)), "batch_size": args.batch_size, "models": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print("Wrote:", args.output)
+
+    if args.min_agreement is not None:
+        failed = [r["model"] for r in results[1:] if r["top1_agreement"] < args.min_agreement]
+        if failed:
+            print(f"Error: top-1 agreement below {args.min_agreement:.2%}: {', '.join(failed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
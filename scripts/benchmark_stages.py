@@ -0,0 +1,294 @@
+"""Per-stage latency and memory benchmark over synthetic portraits.
+
+Each (stage, size) pair runs in a fresh spawned interpreter so peak RSS is
+attributable to that stage alone. Results are written as JSON; pass
+--baseline to compare against a previous run and fail on regressions.
+
+    python scripts/benchmark_stages.py --sizes 512,1024 --output bench.json
+    python scripts/benchmark_stages.py --baseline bench.json --tolerance 0.15
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BASE_DIR)
+
+DEFAULT_SIZES = (512, 1024, 2048, 4096)
+
+
+def make_portrait(long_side, path, seed=0):
+    """Deterministic 3:4 portrait: gradient backdrop, torso, head and features."""
+    import cv2
+    import numpy as np
+
+    h = long_side
+    w = long_side * 3 // 4
+    rng = np.random.RandomState(seed)
+    ys = np.linspace(0.0, 1.0, h, dtype=np.float32)[:, None]
+    xs = np.linspace(0.0, 1.0, w, dtype=np.float32)[None, :]
+    img = np.empty((h, w, 3), np.float32)
+    img[..., 0] = 90 + 120 * ys + 20 * xs
+    img[..., 1] = 140 - 40 * ys + 30 * xs
+    img[..., 2] = 170 - 60 * xs
+    img += rng.normal(0, 6, img.shape).astype(np.float32)
+    img = np.clip(img, 0, 255).astype(np.uint8)
+
+    s = long_side / 1024.0
+    cx = w // 2
+    cv2.ellipse(img, (cx, int(h * 0.95)), (int(300 * s), int(330 * s)), 0, 180, 360, (60, 50, 140), -1)
+    cv2.rectangle(img, (cx - int(55 * s), int(h * 0.40)), (cx + int(55 * s), int(h * 0.66)), (120, 150, 200), -1)
+    head = (cx, int(h * 0.32))
+    cv2.ellipse(img, head, (int(130 * s), int(170 * s)), 0, 0, 360, (135, 170, 225), -1)
+    cv2.ellipse(img, (cx, int(h * 0.20)), (int(140 * s), int(90 * s)), 0, 180, 360, (30, 35, 45), -1)
+    for dx in (-50, 50):
+        eye = (cx + int(dx * s), head[1] - int(25 * s))
+        cv2.ellipse(img, eye, (int(22 * s), int(11 * s)), 0, 0, 360, (245, 245, 245), -1)
+        cv2.circle(img, eye, max(2, int(8 * s)), (40, 30, 20), -1)
+    cv2.ellipse(img, (cx, head[1] + int(70 * s)), (int(45 * s), int(18 * s)), 0, 0, 180, (70, 60, 170), max(2, int(5 * s)))
+    cv2.imwrite(path, img)
+    return w, h
+
+
+def _open_rgb(path):
+    from PIL import Image
+    return Image.open(path).convert("RGB")
+
+
+def _run_u2net(path, out_dir):
+    from u2net_remove_bg import process_image
+    return process_image(path, os.path.join(out_dir, "u2net.png"))
+
+
+def _run_advanced_bg(path, out_dir):
+    from advanced_bg_remove import advanced_background_removal
+    return advanced_background_removal(path, os.path.join(out_dir, "advanced.png"))
+
+
+def _run_simple_bg(path, out_dir):
+    from simple_bg_remove import simple_background_removal
+    return simple_background_removal(path, os.path.join(out_dir, "simple.png"))
+
+
+def _run_emotion_preprocess(path, out_dir):
+    from emotion_analysis import preprocess_face
+    return preprocess_face(path)
+
+
+def _run_emotion(path, out_dir):
+    from emotion_analysis import analyze_emotion
+    return analyze_emotion(path)
+
+
+def _run_simple_emotion(path, out_dir):
+    from simple_emotion import analyze_image_emotion
+    return analyze_image_emotion(path)
+
+
+def _run_brush_pil(path, out_dir):
+    from brush_effect import apply_advanced_brush_effect_pil
+    apply_advanced_brush_effect_pil(_open_rgb(path)).save(os.path.join(out_dir, "brush.png"))
+
+
+def _run_brush_minimal_pil(path, out_dir):
+    from brush_effect_minimal import apply_pil_brush_effect
+    apply_pil_brush_effect(_open_rgb(path)).save(os.path.join(out_dir, "brush_minimal.png"))
+
+
+STAGES = {
+    "u2net_remove_bg": _run_u2net,
+    "advanced_bg_remove": _run_advanced_bg,
+    "simple_bg_remove": _run_simple_bg,
+    "emotion_preprocess": _run_emotion_preprocess,
+    "emotion_analysis": _run_emotion,
+    "simple_emotion": _run_simple_emotion,
+    "brush_effect_pil": _run_brush_pil,
+    "brush_effect_minimal_pil": _run_brush_minimal_pil,
+}
+
+
+def _rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        return None
+
+
+def _check_result(result):
+    """Raise if a stage reported failure instead of raising itself.
+
+    Background removal returns False, emotion stages return a dict with
+    "error", and analyze_emotion silently falls back to brightness-only
+    analysis when the model or onnxruntime is missing -- timing that path
+    would be reported as the real stage.
+    """
+    if result is False:
+        raise RuntimeError("stage returned False")
+    if isinstance(result, dict):
+        if result.get("error"):
+            raise RuntimeError(f"stage reported error: {result['error']}")
+        if result.get("method") == "basic_brightness_analysis":
+            raise RuntimeError("fell back to basic brightness analysis (no emotion model/onnxruntime)")
+
+
+def _clear_sidecars(path):
+    # Face detections are cached next to the input; drop them so every
+    # repetition pays for detection like a fresh upload would. Only ever
+    # called on the private copy inside the temp dir.
+    try:
+        os.remove(path + ".faces.json")
+    except OSError:
+        pass
+
+
+def _measure(stage, path, repeat, warmup, queue):
+    """Child process body: warm up, time `repeat` runs, report medians."""
+    os.environ["MEART_RESULT_CACHE"] = "0"
+    sys.path.insert(0, BASE_DIR)
+    # Stage modules print progress to stdout; keep the benchmark output readable.
+    devnull = open(os.devnull, "w")
+    sys.stdout = devnull
+    fn = STAGES[stage]
+    record = {"stage": stage}
+    try:
+        with tempfile.TemporaryDirectory() as out_dir:
+            # Work on a copy so sidecars next to the caller's input are left alone.
+            local_path = os.path.join(out_dir, os.path.basename(path))
+            shutil.copyfile(path, local_path)
+            for _ in range(warmup):
+                _clear_sidecars(local_path)
+                _check_result(fn(local_path, out_dir))
+            rss_before = _rss_mb()
+            walls, cpus = [], []
+            for _ in range(repeat):
+                _clear_sidecars(local_path)
+                wall0, cpu0 = time.perf_counter(), time.process_time()
+                result = fn(local_path, out_dir)
+                walls.append(time.perf_counter() - wall0)
+                cpus.append(time.process_time() - cpu0)
+                _check_result(result)
+        walls.sort()
+        cpus.sort()
+        # ru_maxrss is reported in KiB on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+        record.update({
+            "ok": True,
+            "wall_s": round(walls[len(walls) // 2], 4),
+            "wall_min_s": round(walls[0], 4),
+            "cpu_s": round(cpus[len(cpus) // 2], 4),
+            "peak_rss_mb": round(peak_mb, 1),
+            "rss_before_mb": None if rss_before is None else round(rss_before, 1),
+        })
+    except BaseException as e:
+        record.update({"ok": False, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        devnull.close()
+    queue.put(record)
+
+
+def run_stage(ctx, stage, path, repeat, warmup, timeout):
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(stage, path, repeat, warmup, queue))
+    proc.start()
+    try:
+        record = queue.get(timeout=timeout)
+    except Exception:
+        proc.terminate()
+        record = {"stage": stage, "ok": False, "error": f"timed out after {timeout}s"}
+    proc.join()
+    return record
+
+
+def compare(results, baseline, tolerance):
+    """Return rows of (stage, size, metric, old, new, ratio, regressed)."""
+    old = {(r["stage"], r["size"]): r for r in baseline.get("results", []) if r.get("ok")}
+    rows = []
+    for r in results:
+        prev = old.get((r["stage"], r["size"]))
+        if not r.get("ok") or prev is None:
+            continue
+        for metric in ("wall_s", "cpu_s", "peak_rss_mb"):
+            if not prev.get(metric):
+                continue
+            ratio = r[metric] / prev[metric]
+            rows.append((r["stage"], r["size"], metric, prev[metric], r[metric], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated long-side pixel sizes")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stage names")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=900.0, help="seconds per stage/size")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed relative slowdown/growth before flagging a regression")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)} (available: {', '.join(STAGES)})")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in sizes:
+            path = os.path.join(work_dir, f"portrait_{size}.jpg")
+            width, height = make_portrait(size, path)
+            for stage in stages:
+                record = run_stage(ctx, stage, path, args.repeat, args.warmup, args.timeout)
+                record.update({"size": size, "width": width, "height": height})
+                results.append(record)
+                if record["ok"]:
+                    print(f"  {stage:26s} {size:5d}px  wall {record['wall_s']:8.3f}s  "
+                          f"cpu {record['cpu_s']:8.3f}s  peak {record['peak_rss_mb']:8.1f}MB")
+                else:
+                    print(f"  {stage:26s} {size:5d}px  FAILED: {record['error']}")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": sizes,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Wrote:", args.output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.tolerance)
+        regressions = [row for row in rows if row[6]]
+        for stage, size, metric, old, new, ratio, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"  {stage:26s} {size:5d}px  {metric:12s} {old:10.3f} -> {new:10.3f}  x{ratio:5.2f}{flag}")
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
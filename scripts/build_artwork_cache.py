@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BASE_DIR)
+
+from generate_bg_labels import SUPPORTED_EXTS, find_bg_dir  # noqa: E402
+from artwork_cache import CACHE_DIR, build_artwork, prune_cache, write_manifest  # noqa: E402
+
+
+def main():
+    bg_dir = find_bg_dir(BASE_DIR)
+    paths = [
+        os.path.join(bg_dir, name)
+        for name in sorted(os.listdir(bg_dir))
+        if os.path.isfile(os.path.join(bg_dir, name))
+        and os.path.splitext(name)[1].lower() in SUPPORTED_EXTS
+    ]
+
+    started = time.perf_counter()
+    built = 0
+    ok_paths = []
+    for path in paths:
+        try:
+            count = build_artwork(path)
+        except Exception as e:
+            print(f"  skip {os.path.basename(path)}: {e}")
+            continue
+        ok_paths.append(path)
+        built += count
+        if count:
+            print(f"  {os.path.basename(path)}: {count} variant(s)")
+
+    removed = prune_cache(ok_paths)
+    manifest = write_manifest(ok_paths)
+    elapsed = time.perf_counter() - started
+    print(f"Artworks: {len(ok_paths)}, built: {built}, pruned: {removed}, {elapsed:.1f}s")
+    print("Cache:", CACHE_DIR)
+    print("Wrote:", manifest)
+
+
+if __name__ == "__main__":
+    main()
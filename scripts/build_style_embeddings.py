@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BASE_DIR)
+
+from generate_bg_labels import SUPPORTED_EXTS, find_bg_dir  # noqa: E402
+from face_detection import file_sha256  # noqa: E402
+from style_embeddings import (  # noqa: E402
+    STYLE_INDEX,
+    load_style_image,
+    predict_style_bottleneck,
+    save_style_index,
+)
+
+
+def main():
+    bg_dir = find_bg_dir(BASE_DIR)
+    out_path = sys.argv[1] if len(sys.argv) > 1 else STYLE_INDEX
+
+    entries = []
+    started = time.perf_counter()
+    for name in sorted(os.listdir(bg_dir)):
+        path = os.path.join(bg_dir, name)
+        if not os.path.isfile(path):
+            continue
+        if os.path.splitext(name)[1].lower() not in SUPPORTED_EXTS:
+            continue
+        try:
+            bottleneck = predict_style_bottleneck(load_style_image(path))
+        except Exception as e:
+            print(f"  skip {name}: {e}")
+            continue
+        entries.append((f"BG_image/{name}", file_sha256(path), bottleneck))
+        print(f"  {name}: ok")
+
+    save_style_index(entries, out_path)
+    print("Wrote:", out_path)
+    print(f"Styles: {len(entries)} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print("Error:", e)
+        sys.exit(1)
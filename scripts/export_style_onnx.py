@@ -0,0 +1,99 @@
+"""Export the TF Hub arbitrary-image-stylization model to ONNX for style_onnx.
+
+Needs tensorflow, tensorflow_hub and tf2onnx on the machine that runs the
+export only; the app then runs the model with onnxruntime. After converting,
+both models are run on the same content/style pair and the export is rejected
+if the outputs differ by more than --tolerance.
+
+Usage: python scripts/export_style_onnx.py [output.onnx] [--opset 15] [--tolerance 1e-3]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BASE_DIR)
+
+from style_onnx import CONTENT_INPUT, STYLE_INPUT, STYLE_ONNX_MODEL, stylize  # noqa: E402
+from generate_bg_labels import SUPPORTED_EXTS, find_bg_dir  # noqa: E402
+
+HUB_MODEL_URL = "https://tfhub.dev/google/magenta/arbitrary-image-stylization-v1-256/2"
+
+
+def pop_option(args, name, default, cast):
+    if name not in args:
+        return default
+    i = args.index(name)
+    value = cast(args[i + 1])
+    del args[i:i + 2]
+    return value
+
+
+def sample_pair():
+    """A real artwork as style and a second one as content (deterministic)."""
+    from brush_effect import load_img
+
+    bg_dir = find_bg_dir(BASE_DIR)
+    names = sorted(
+        name for name in os.listdir(bg_dir)
+        if os.path.splitext(name)[1].lower() in SUPPORTED_EXTS
+    )
+    if len(names) < 2:
+        rng = np.random.default_rng(0)
+        return rng.random((1, 384, 288, 3), dtype=np.float32), rng.random((1, 256, 256, 3), dtype=np.float32)
+    content = load_img(os.path.join(bg_dir, names[0]), max_dim=384)
+    style = load_img(os.path.join(bg_dir, names[1]), max_dim=256)
+    return content, style
+
+
+def main():
+    args = sys.argv[1:]
+    opset = pop_option(args, "--opset", 15, int)
+    tolerance = pop_option(args, "--tolerance", 1e-3, float)
+    out_path = args[0] if args else STYLE_ONNX_MODEL
+
+    import tensorflow as tf
+    import tensorflow_hub as hub
+    import tf2onnx
+
+    print("Loading", HUB_MODEL_URL)
+    hub_model = hub.load(HUB_MODEL_URL)
+
+    @tf.function(input_signature=[
+        tf.TensorSpec([None, None, None, 3], tf.float32, name=CONTENT_INPUT),
+        tf.TensorSpec([None, None, None, 3], tf.float32, name=STYLE_INPUT),
+    ])
+    def stylize_fn(content, style):
+        return {"stylized": hub_model(content, style)[0]}
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    started = time.perf_counter()
+    tf2onnx.convert.from_function(
+        stylize_fn,
+        input_signature=stylize_fn.input_signature,
+        opset=opset,
+        output_path=tmp_path,
+    )
+    print(f"Converted in {time.perf_counter() - started:.1f}s")
+
+    content, style = sample_pair()
+    expected = np.asarray(hub_model(tf.constant(content), tf.constant(style))[0])
+    actual = stylize(content, style, tmp_path)
+    diff = np.abs(actual - expected)
+    print(f"Output {actual.shape}: max abs diff {diff.max():.2e}, mean {diff.mean():.2e}"
+          f" (8-bit pixels changed: {np.mean(np.round(actual * 255) != np.round(expected * 255)):.2%})")
+    if actual.shape != expected.shape or diff.max() > tolerance:
+        os.remove(tmp_path)
+        print(f"Error: ONNX output differs from the hub model by more than {tolerance}")
+        sys.exit(1)
+
+    os.replace(tmp_path, out_path)
+    print("Wrote:", out_path, f"({os.path.getsize(out_path) / 1024 / 1024:.1f}MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@ import sys
 from collections import defaultdict
 
 
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BASE_DIR)
+
+from artwork_index import INDEX_PATH, artwork_features, build_index, emotion_affinity, write_index  # noqa: E402
+
+
 SUPPORTED_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
 
 
@@ -59,13 +65,18 @@ def find_bg_dir(base_dir: str) -> str:
     raise FileNotFoundError("BG_image directory not found. Checked: " + ", ".join(candidates))
 
 
-def label_for_filename(filename: str):
+def matches_for_filename(filename: str):
     lower = filename.lower()
     matches_by_emotion = defaultdict(list)
     for emotion, keywords in EMOTION_KEYWORDS.items():
         for kw in keywords:
             if kw in lower:
                 matches_by_emotion[emotion].append(kw)
+    return matches_by_emotion
+
+
+def label_for_filename(filename: str):
+    matches_by_emotion = matches_for_filename(filename)
 
     if not matches_by_emotion:
         return "neutral", []
@@ -82,10 +93,11 @@ def label_for_filename(filename: str):
 
 
 def main():
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    base_dir = BASE_DIR
     bg_dir = find_bg_dir(base_dir)
 
     rows = []
+    entries = []
     for name in sorted(os.listdir(bg_dir)):
         path = os.path.join(bg_dir, name)
         if not os.path.isfile(path):
@@ -101,17 +113,35 @@ def main():
             "matched_keywords": ";".join(sorted(set(kws)))
         })
 
+        # dense feature row for artwork_index (same statistics as simple_emotion)
+        try:
+            histogram, stats = artwork_features(path)
+        except Exception as e:
+            print(f"  no features for {name}: {e}")
+            continue
+        entries.append({
+            "filename": name,
+            "label": label,
+            "histogram": histogram,
+            "stats": stats,
+            "affinity": emotion_affinity(matches_for_filename(name), label),
+        })
+
     out_csv = os.path.join(base_dir, "BG_image_labels.csv")
     with open(out_csv, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=["filename", "relative_path", "label", "matched_keywords"])
         writer.writeheader()
         writer.writerows(rows)
 
+    index = build_index(entries)
+    write_index(index, INDEX_PATH)
+
     # console summary
     counts = defaultdict(int)
     for r in rows:
         counts[r["label"]] += 1
     print("Wrote:", out_csv)
+    print(f"Wrote: {INDEX_PATH} ({len(entries)} x {len(index['feature_names'])} features)")
     print("Counts:")
     for k in PRIORITY:
         if counts[k]:
@@ -0,0 +1,135 @@
+"""Produce an INT8 variant of the FER+ emotion model for MEART_EMOTION_MODEL.
+
+dynamic: weights are quantized offline and activations at run time, so no
+data is needed. Convolutions become ConvInteger, which needs uint8 weights on
+the CPU provider.
+static: QDQ model with per-channel int8 weights. Activation ranges are
+calibrated on face crops from --calibration (a directory of photos or a
+manifest), preprocessed exactly like emotion_analysis. This is usually the
+faster variant for a conv net.
+
+The zoo model is opset 8. It is upgraded to opset 13 and shape-inferred
+before quantization. Check the result with scripts/benchmark_emotion_models.py
+before switching the config.
+
+    python scripts/quantize_emotion_model.py --mode dynamic
+    python scripts/quantize_emotion_model.py --mode static --calibration uploads/ --max-faces 500
+"""
+import argparse
+import os
+import sys
+import shutil
+import tempfile
+
+import numpy as np
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BASE_DIR)
+
+from emotion_analysis import EMOTION_MODEL_VARIANTS, collect_face_crops  # noqa: E402
+from benchmark_emotion_models import image_sources, model_path  # noqa: E402
+
+TARGET_OPSET = 13
+
+
+def prepare_model(src, dst):
+    """Upgrade to TARGET_OPSET and run ORT's quantization pre-processing."""
+    import onnx
+    from onnx import version_converter
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    model = onnx.load(src)
+    opset = next((o.version for o in model.opset_import if o.domain in ("", "ai.onnx")), TARGET_OPSET)
+    if opset < TARGET_OPSET:
+        print(f"Upgrading opset {opset} -> {TARGET_OPSET}")
+        model = version_converter.convert_version(model, TARGET_OPSET)
+    upgraded = dst + ".opset.onnx"
+    onnx.save(model, upgraded)
+    try:
+        quant_pre_process(upgraded, dst, skip_symbolic_shape=True)
+    finally:
+        os.remove(upgraded)
+    return dst
+
+
+class FaceCropReader:
+    """CalibrationDataReader over (N, 1, 64, 64) face crops, one crop per call."""
+
+    def __init__(self, input_name, crops):
+        self.input_name = input_name
+        self.crops = crops
+        self.index = 0
+
+    def get_next(self):
+        if self.index >= len(self.crops):
+            return None
+        crop = self.crops[self.index][np.newaxis]
+        self.index += 1
+        return {self.input_name: crop}
+
+    def rewind(self):
+        self.index = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("dynamic", "static"), default="dynamic")
+    parser.add_argument("--source", default="fp32", help="fp32 model (variant name or path)")
+    parser.add_argument("--output", help="default: the int8-<mode> path in EMOTION_MODEL_VARIANTS")
+    parser.add_argument("--calibration", help="photos directory or manifest (static mode)")
+    parser.add_argument("--max-faces", type=int, default=500)
+    parser.add_argument("--calibrate-method", choices=("minmax", "entropy", "percentile"), default="minmax")
+    args = parser.parse_args()
+
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    src = model_path(args.source)
+    if not os.path.exists(src):
+        print(f"Error: source model not found: {src}")
+        sys.exit(1)
+    out_path = os.path.abspath(args.output) if args.output else model_path(f"int8-{args.mode}")
+    if args.mode == "static" and not args.calibration:
+        print("Error: --calibration is required for static quantization")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = prepare_model(src, os.path.join(tmp, "prepared.onnx"))
+        tmp_out = os.path.join(tmp, "quantized.onnx")
+        if args.mode == "dynamic":
+            quantize_dynamic(prepared, tmp_out, weight_type=QuantType.QUInt8)
+        else:
+            import onnxruntime as ort
+            crops = collect_face_crops(image_sources(args.calibration), args.max_faces)
+            if len(crops) == 0:
+                print("Error: no face crops found in", args.calibration)
+                sys.exit(1)
+            print(f"Calibrating on {len(crops)} face crops ({args.calibrate_method})")
+            input_name = ort.InferenceSession(prepared, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+            method = {
+                "minmax": CalibrationMethod.MinMax,
+                "entropy": CalibrationMethod.Entropy,
+                "percentile": CalibrationMethod.Percentile,
+            }[args.calibrate_method]
+            quantize_static(
+                prepared,
+                tmp_out,
+                FaceCropReader(input_name, crops),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=True,
+                calibrate_method=method,
+            )
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        shutil.move(tmp_out, out_path)
+
+    size = os.path.getsize(out_path) / 1024 / 1024
+    print(f"Wrote: {out_path} ({size:.1f}MB, fp32 {os.path.getsize(src) / 1024 / 1024:.1f}MB)")
+    variant = next((name for name, path in EMOTION_MODEL_VARIANTS.items() if model_path(name) == out_path), None)
+    if variant:
+        print(f"Enable with MEART_EMOTION_MODEL={variant}")
+
+
+if __name__ == "__main__":
+    main()
@@ -408,6 +408,92 @@ const runPythonScript = (scriptName, args = [], timeout = 120000) => {
     });
 };
 
+// 상주 Python 워커 (python_worker.py, stdin/stdout JSON Lines)
+// 파일을 만드는 작업(배경 제거/브러시)은 요청마다 인터프리터를 띄우지 않고 워커에서 실행한다.
+// 워커가 작업을 받아 실행을 시작하면 {"event": "admitted"}를 먼저 보내고, 타임아웃은 그때부터 잰다 (입장 대기열 시간 제외).
+// 실행 전에 워커를 쓸 수 없게 된 경우에만 기존 runPythonScript로 다시 실행한다 - 실행 중인 작업과 같은 파일을 동시에 쓰지 않도록
+// 입장 이후의 타임아웃/실패는 그대로 오류로 전달한다. MEART_PYTHON_WORKER=0이면 비활성화
+const PYTHON_WORKER_ENABLED = process.env.MEART_PYTHON_WORKER !== '0';
+let pythonWorker = null;
+let pythonWorkerSeq = 0;
+const pythonWorkerPending = new Map();
+
+function getPythonWorker() {
+    if (pythonWorker) return pythonWorker;
+    const proc = spawn(pythonPath, ['python_worker.py'], {
+        cwd: __dirname,
+        env: { ...process.env, PYTHONUNBUFFERED: '1' }
+    });
+    const fail = (error) => {
+        // 워커 프로세스가 사라졌으므로 실행 중이던 작업과 겹칠 일이 없다 → 스크립트 재실행 허용
+        error.fallback = true;
+        if (pythonWorker === proc) pythonWorker = null;
+        for (const pending of pythonWorkerPending.values()) {
+            clearTimeout(pending.timer);
+            pending.reject(error);
+        }
+        pythonWorkerPending.clear();
+    };
+    let buffer = '';
+    proc.stdout.on('data', (data) => {
+        buffer += data.toString();
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            let message;
+            try {
+                message = JSON.parse(line);
+            } catch (error) {
+                continue;
+            }
+            const pending = pythonWorkerPending.get(message.id);
+            if (!pending) continue;
+            if (message.event === 'admitted') {
+                pending.admitted();
+                continue;
+            }
+            pythonWorkerPending.delete(message.id);
+            clearTimeout(pending.timer);
+            pending.resolve(message);
+        }
+    });
+    proc.stderr.on('data', (data) => console.log(`[python_worker] ${data.toString().trimEnd()}`));
+    proc.stdin.on('error', fail);
+    proc.on('error', fail);
+    proc.on('exit', (code) => fail(new Error(`python_worker 종료 (코드: ${code})`)));
+    pythonWorker = proc;
+    console.log(`🐍 상주 Python 워커 시작 (pid ${proc.pid})`);
+    return proc;
+}
+
+// 워커 작업 실행 → result. 워커가 작업을 받기 전에 사라진 경우에만 같은 작업을 스크립트로 실행 (fallbackScript, fallbackArgs)
+const runPythonTask = (task, args, fallbackScript, fallbackArgs, timeout = 120000) => {
+    if (!PYTHON_WORKER_ENABLED) return runPythonScript(fallbackScript, fallbackArgs, timeout);
+    return new Promise((resolve, reject) => {
+        const id = `job-${++pythonWorkerSeq}`;
+        const proc = getPythonWorker();
+        const pending = { resolve, reject, timer: null };
+        // 타임아웃은 입장 이후 실행 시간에만 적용 - 만료돼도 워커에서 작업이 계속 돌 수 있으므로 재실행하지 않는다
+        pending.admitted = () => {
+            pending.timer = setTimeout(() => {
+                pythonWorkerPending.delete(id);
+                reject(new Error(`python_worker 타임아웃: ${task} (${timeout}ms)`));
+            }, timeout);
+        };
+        pythonWorkerPending.set(id, pending);
+        proc.stdin.write(JSON.stringify({ id, task, args }) + '\n');
+    }).then((response) => {
+        if (!response.ok) throw new Error(response.error || `python_worker 작업 실패: ${task}`);
+        console.log(`⚡ python_worker ${task} 완료 (${response.elapsed_ms}ms)`);
+        return response.result;
+    }).catch((error) => {
+        if (!error.fallback) throw error;
+        console.warn(`⚠️ python_worker ${task} 실행 불가, 스크립트로 재실행: ${error.message}`);
+        return runPythonScript(fallbackScript, fallbackArgs, timeout);
+    });
+};
+
 // Python 실행 환경 확인 함수 (강화)
 function checkPythonEnvironment() {
     return new Promise((resolve, reject) => {
@@ -571,23 +657,127 @@ function getThumbnailPath(imagePath) {
     }
 }
 
+// 명화 사전 리사이즈 캐시 (scripts/build_artwork_cache.py → cache/artworks/manifest.json)
+// 고정 크기 합성은 미리 cover 크롭해 둔 composite 변형 JPEG를 배경으로 바로 사용 (원본 재디코딩/리사이즈 생략)
+const ARTWORK_CACHE_DIR = process.env.MEART_ARTWORK_CACHE_DIR || path.join(__dirname, 'cache', 'artworks');
+const ARTWORK_MANIFEST_PATH = path.join(ARTWORK_CACHE_DIR, 'manifest.json');
+let artworkManifest = null;
+let artworkManifestMtime = 0;
+
+function loadArtworkManifest() {
+    try {
+        const mtime = fs.statSync(ARTWORK_MANIFEST_PATH).mtimeMs;
+        if (!artworkManifest || artworkManifestMtime !== mtime) {
+            artworkManifest = JSON.parse(fs.readFileSync(ARTWORK_MANIFEST_PATH, 'utf8'));
+            artworkManifestMtime = mtime;
+        }
+        return artworkManifest;
+    } catch (error) {
+        return null;
+    }
+}
+
+// 캐시된 변형 경로 (없거나 원본이 바뀌었으면 null) - 파일명의 원본 mtime/크기 스탬프를 artwork_cache와 같은 방식으로 확인
+function cachedArtworkVariant(bgAbsPath, variant, width, height) {
+    const manifest = loadArtworkManifest();
+    if (!manifest || path.dirname(path.resolve(bgAbsPath)) !== path.join(__dirname, 'BG_image')) return null;
+    const size = manifest.variants && manifest.variants[variant];
+    const entry = manifest.artworks && manifest.artworks[path.basename(bgAbsPath)];
+    if (!size || size[0] !== width || size[1] !== height || !entry || !entry[variant]) return null;
+    try {
+        const st = fs.statSync(bgAbsPath, { bigint: true });
+        const stamp = `${st.mtimeNs.toString(16)}-${st.size.toString(16)}`;
+        const cachedPath = path.join(ARTWORK_CACHE_DIR, entry[variant]);
+        if (path.basename(cachedPath) !== `${path.basename(bgAbsPath)}.${stamp}.jpg` || !fs.existsSync(cachedPath)) return null;
+        return cachedPath;
+    } catch (error) {
+        return null;
+    }
+}
+
+// 고정 크기 합성 배경 버퍼: composite 변형이 있으면 그대로, 없으면 원본을 cover 리사이즈
+async function compositeBackgroundBuffer(bgAbsPath, width, height) {
+    const cachedPath = cachedArtworkVariant(bgAbsPath, 'composite', width, height);
+    if (cachedPath) return fs.promises.readFile(cachedPath);
+    const sharp = require('sharp');
+    return sharp(bgAbsPath)
+        .resize(width, height, { fit: 'cover' })
+        .png()
+        .toBuffer();
+}
+
+// 명화 특징 벡터 색인 (scripts/generate_bg_labels.py → BG_image_features.json) 기반 순위
+// 채점은 artwork_index.py 한 곳에서만 한다: 워커 작업 recommend_artworks, 워커를 쓸 수 없으면 --args-json 스크립트 실행
+const ARTWORK_PHOTO_FEATURES = ['brightness', 'warmth', 'saturation', 'color_histogram', 'top_emotions'];
+
+async function rankArtworks(emotion, photoFeatures, limit, availableImages) {
+    const photo = {};
+    for (const name of ARTWORK_PHOTO_FEATURES) {
+        if (photoFeatures && photoFeatures[name] !== undefined && photoFeatures[name] !== null) photo[name] = photoFeatures[name];
+    }
+    const args = {
+        emotion,
+        photo,
+        top_k: limit,
+        include: availableImages.map(imagePath => path.basename(imagePath))
+    };
+    const argsPath = path.join(uploadDir, `artwork_args_${Date.now()}_${Math.random().toString(36).slice(2, 8)}.json`);
+    await fs.promises.writeFile(argsPath, JSON.stringify(args));
+    try {
+        const result = await runPythonTask('recommend_artworks', args, 'artwork_index.py', ['--args-json', argsPath], 30000);
+        // 스크립트 실행 시에는 stdout 마지막 줄이 JSON 결과
+        return typeof result === 'string' ? JSON.parse(result.trim().split('\n').pop()) : result;
+    } finally {
+        fs.promises.unlink(argsPath).catch(() => {});
+    }
+}
+
+function cleanArtworkTitle(imagePath) {
+    return path.basename(imagePath, path.extname(imagePath))
+        .replace(/_\d+\.\d+\.\d+/g, '') // 연도 제거
+        .replace(/_/g, ' ') // 언더스코어를 공백으로
+        .replace(/\b\w/g, l => l.toUpperCase()); // 첫글자 대문자
+}
+
 // 명화 추천 리스트 생성 함수 (썸네일 포함)
-function getArtworkRecommendations(emotion, selectedBackground, limit = 6) {
+// photoFeatures: simple_emotion 결과 (brightness/warmth/saturation/color_histogram/top_emotions, 선택)
+async function getArtworkRecommendations(emotion, selectedBackground, limit = 6, photoFeatures = null) {
     try {
         console.log('🎨 명화 추천 리스트 생성:', emotion);
     
     const availableImages = getAvailableBackgroundImages();
         let emotionImages = [];
         
-        // 감정별 색인 파일 로드
+        // 특징 벡터 색인 기반 추천 (결정적 순위, 파일 스캔 없음)
+        let ranked = [];
+        try {
+            ranked = await rankArtworks(emotion, photoFeatures, limit, availableImages);
+        } catch (error) {
+            console.warn('⚠️ 특징 벡터 색인 추천 실패:', error.message);
+        }
+        for (const artwork of ranked) {
+            const imagePath = `/BG_image/${artwork.filename}`;
+            emotionImages.push({
+                path: imagePath,
+                thumbnail: getThumbnailPath(imagePath),
+                title: cleanArtworkTitle(imagePath),
+                artist: '클래식 마스터',
+                score: artwork.score
+            });
+        }
+        const indexed = emotionImages.length > 0;
+        
+        // 감정별 색인 파일 로드 (특징 벡터 색인이 없을 때만)
         const emotionIndexPath = path.join(__dirname, 'BG_image', 'emotion_index.json');
         let emotionIndex = null;
         
-        try {
-            const indexData = fs.readFileSync(emotionIndexPath, 'utf8');
-            emotionIndex = JSON.parse(indexData);
-        } catch (error) {
-            console.log('색인 파일 로드 실패, 키워드 방식 사용');
+        if (!indexed) {
+            try {
+                const indexData = fs.readFileSync(emotionIndexPath, 'utf8');
+                emotionIndex = JSON.parse(indexData);
+            } catch (error) {
+                console.log('색인 파일 로드 실패, 키워드 방식 사용');
+            }
         }
         
         // 감정 매핑
@@ -603,8 +793,8 @@ function getArtworkRecommendations(emotion, selectedBackground, limit = 6) {
         
         const normalizedEmotion = emotionMapping[emotion] || emotion;
         
-        // 색인 기반 추천
-        if (emotionIndex && emotionIndex.emotions && emotionIndex.emotions[normalizedEmotion]) {
+        // 색인 기반 추천 (특징 벡터 색인이 없을 때)
+        if (!indexed && emotionIndex && emotionIndex.emotions && emotionIndex.emotions[normalizedEmotion]) {
             const emotionArtworks = emotionIndex.emotions[normalizedEmotion].artworks;
             const sortedArtworks = emotionArtworks.sort((a, b) => (b.emotion_score || 0) - (a.emotion_score || 0));
             
@@ -1084,7 +1274,7 @@ app.post('/api/remove-bg', upload.single('image'), async (req, res) => {
             console.log('기존 nobg 파일 크기:', nobgStats.size, 'bytes');
         } else {
             console.log('🔄 새로운 배경 제거 실행');
-            await runPythonScript('advanced_bg_remove.py', [inputPath, nobgPath]);
+            await runPythonTask('advanced_bg_remove', { input_path: inputPath, output_path: nobgPath }, 'advanced_bg_remove.py', [inputPath, nobgPath]);
             await fs.promises.access(nobgPath, fs.constants.F_OK).catch(() => { throw new Error('배경 제거 실패'); });
             
             console.log('배경 제거 완료:', nobgPath);
@@ -1192,7 +1382,7 @@ app.post('/api/remove-bg', upload.single('image'), async (req, res) => {
         
         // 1단계 결과: 배경 합성된 미리보기 + nobg 파일 경로 저장
         // 명화 추천 리스트 생성 (썸네일 포함)
-        const artworkRecommendations = getArtworkRecommendations(emotion, backgroundPath, 6);
+        const artworkRecommendations = await getArtworkRecommendations(emotion, backgroundPath, 6, emotionData);
         
         res.json({
             processedImageUrl: '/uploads/' + path.basename(previewPath), // 배경 합성된 미리보기 표시
@@ -1387,10 +1577,7 @@ app.post('/api/apply-brush-effect', async (req, res) => {
                 
                 try {
                     // 배경 제거 재실행
-                    await runPythonScript('advanced_bg_remove.py', [
-                        originalFile,
-                        nobgAbsPath
-                    ]);
+                    await runPythonTask('advanced_bg_remove', { input_path: originalFile, output_path: nobgAbsPath }, 'advanced_bg_remove.py', [originalFile, nobgAbsPath]);
                     
                     // 재생성된 파일 확인
                     if (fs.existsSync(nobgAbsPath)) {
@@ -1412,7 +1599,7 @@ app.post('/api/apply-brush-effect', async (req, res) => {
         console.log('🎨 Python 브러시 효과 스크립트 실행:', brushPath);
         
         try {
-            await runPythonScript('brush_effect_minimal.py', [nobgAbsPath, brushPath]);
+            await runPythonTask('brush_effect_minimal', { input_path: nobgAbsPath, output_path: brushPath }, 'brush_effect_minimal.py', [nobgAbsPath, brushPath]);
         } catch (pythonError) {
             console.error('❌ Python 브러시 효과 스크립트 실행 실패:', pythonError);
             throw new Error(`브러시 효과 스크립트 실행 실패: ${pythonError.message}`);
@@ -1518,19 +1705,18 @@ async function processImagePipeline({ inputPath, outputPath, emotion, background
     const nobgPath = inputPath.replace(path.extname(inputPath), '_nobg.png');
     
     // 1. 배경 제거
-    await runPythonScript('u2net_remove_bg.py', [inputPath, nobgPath, 'true', '180', '50', '1']);
+    await runPythonTask('u2net_remove_bg', {
+        input_path: inputPath, output_path: nobgPath, alpha_matting: 'true', fg_threshold: 180, bg_threshold: 50, erode_size: 1
+    }, 'u2net_remove_bg.py', [inputPath, nobgPath, 'true', '180', '50', '1']);
     await fs.promises.access(nobgPath, fs.constants.F_OK).catch(() => { throw new Error('배경 제거 실패'); });
     
     // 2. 브러쉬 효과 + 합성 (Sharp 사용)
     const brushPath = nobgPath.replace('_nobg.png', '_brush.png');
-    await runPythonScript('brush_effect_minimal.py', [nobgPath, brushPath]);
+    await runPythonTask('brush_effect_minimal', { input_path: nobgPath, output_path: brushPath }, 'brush_effect_minimal.py', [nobgPath, brushPath]);
     
     // Sharp로 합성
     const sharp = require('sharp');
-    const backgroundBuffer = await sharp(backgroundPath)
-        .resize(1121, 1500, { fit: 'cover' })
-        .png()
-        .toBuffer();
+    const backgroundBuffer = await compositeBackgroundBuffer(backgroundPath, 1121, 1500);
     
     await sharp(backgroundBuffer)
         .composite([{ input: brushPath, top: 0, left: 0, blend: 'over' }])
@@ -1868,7 +2054,7 @@ app.post('/api/brush-effect-only', upload.single('image'), async (req, res) => {
         const ext = path.extname(req.file.originalname) || '.png';
         const baseName = path.basename(req.file.filename, path.extname(req.file.filename));
         const brushedPath = path.join('uploads', `${baseName}_brush.png`);
-        await runPythonScript('brush_effect_minimal.py', [req.file.path, brushedPath]);
+        await runPythonTask('brush_effect_minimal', { input_path: req.file.path, output_path: brushedPath }, 'brush_effect_minimal.py', [req.file.path, brushedPath]);
         if (!fs.existsSync(brushedPath)) throw new Error('브러쉬 효과 적용 실패');
         // 임시 파일 정리 (원본)
         fs.promises.unlink(req.file.path).catch(()=>{});
@@ -1907,18 +2093,15 @@ app.post('/api/brush-composite', upload.single('image'), async (req, res) => {
         const brushPath = optimizedInputPath.replace(ext, '_brush.png');
         const outputPath = path.join(uploadDir, `${baseName}_final_${Date.now()}.png`);
         // 1. 배경 제거 (Python 직접 실행)
-        await runPythonScript('advanced_bg_remove.py', [optimizedInputPath, nobgPath]);
+        await runPythonTask('advanced_bg_remove', { input_path: optimizedInputPath, output_path: nobgPath }, 'advanced_bg_remove.py', [optimizedInputPath, nobgPath]);
         await fs.promises.access(nobgPath, fs.constants.F_OK).catch(() => { throw new Error('배경 제거 실패'); });
         
         // 2. 브러쉬 효과 (Python 직접 실행)
-        await runPythonScript('brush_effect_minimal.py', [nobgPath, brushPath]);
+        await runPythonTask('brush_effect_minimal', { input_path: nobgPath, output_path: brushPath }, 'brush_effect_minimal.py', [nobgPath, brushPath]);
         await fs.promises.access(brushPath, fs.constants.F_OK).catch(() => { throw new Error('브러쉬 효과 적용 실패'); });
         // 3. 배경 합성 (Sharp 사용)
         const sharp = require('sharp');
-        const backgroundBuffer = await sharp(bgAbsPath)
-            .resize(1121, 1500, { fit: 'cover' })
-            .png()
-            .toBuffer();
+        const backgroundBuffer = await compositeBackgroundBuffer(bgAbsPath, 1121, 1500);
         
         await sharp(backgroundBuffer)
             .composite([{ input: brushPath, top: 0, left: 0, blend: 'over' }])
@@ -2433,10 +2616,7 @@ app.post('/api/composite', async (req, res) => {
         const outputPath = path.join(uploadDir, `${baseName}_${emotion||'neutral'}_${shortTimestamp}_composite.png`);
         // 합성 실행 (Sharp 사용)
         const sharp = require('sharp');
-        const backgroundBuffer = await sharp(bgAbsPath)
-            .resize(1121, 1500, { fit: 'cover' })
-            .png()
-            .toBuffer();
+        const backgroundBuffer = await compositeBackgroundBuffer(bgAbsPath, 1121, 1500);
         
         await sharp(backgroundBuffer)
             .composite([{ input: fgAbsPath, top: 0, left: 0, blend: 'over' }])
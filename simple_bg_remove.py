@@ -6,8 +6,32 @@
 """
 import sys
 import os
+from functools import lru_cache
 import numpy as np
 from PIL import Image
+from instrumentation import stage
+from image_loader import load_pil, save_image
+
+@lru_cache(maxsize=8)
+def elliptical_alpha_mask(w, h):
+    """중앙 타원 + 부드러운 경계 알파 마스크 (해상도별 캐시, 읽기 전용)"""
+    center_x, center_y = w // 2, h // 2
+    
+    # 타원 크기 (이미지의 70% 영역)
+    radius_x = max(1, int(w * 0.35))  # 가로 반지름
+    radius_y = max(1, int(h * 0.40))  # 세로 반지름 (인물 비율 고려)
+    
+    # 타원 방정식: (x-cx)²/rx² + (y-cy)²/ry² <= 1 (행/열 브로드캐스팅)
+    dx = (np.arange(w) - center_x) / radius_x
+    dy = (np.arange(h) - center_y) / radius_y
+    distance_sq = dy[:, np.newaxis] ** 2 + dx[np.newaxis, :] ** 2
+    distance = np.sqrt(distance_sq)
+    
+    # 내부 255, 1.0~1.2 구간은 선형 페이드, 그 밖은 0
+    fade = np.clip(255 - np.floor((distance - 1) * 255 * 5), 0, 255)
+    alpha = np.where(distance_sq <= 1, 255, np.where(distance <= 1.2, fade, 0)).astype(np.uint8)
+    alpha.flags.writeable = False
+    return alpha
 
 def simple_background_removal(input_path, output_path):
     """초간단 배경 제거 - 중앙 타원 영역만 보존"""
@@ -15,54 +39,28 @@ def simple_background_removal(input_path, output_path):
     
     try:
         # 이미지 로드
-        img = Image.open(input_path).convert('RGBA')
+        img = load_pil(input_path, 'RGBA')
         w, h = img.size
         print(f"📏 이미지 크기: {w}x{h}")
         
         # NumPy 배열로 변환
         img_array = np.array(img)
         
-        # 알파 채널 생성 (초기값: 모두 투명)
-        alpha = np.zeros((h, w), dtype=np.uint8)
-        
-        # 중앙 타원 영역 계산 (인물 보존 영역)
-        center_x, center_y = w // 2, h // 2
-        
-        # 타원 크기 (이미지의 70% 영역)
-        radius_x = int(w * 0.35)  # 가로 반지름
-        radius_y = int(h * 0.40)  # 세로 반지름 (인물 비율 고려)
-        
-        print(f"🎯 보존 영역: 중앙 타원 ({radius_x*2}x{radius_y*2})")
-        
-        # 타원 마스크 생성
-        for y in range(h):
-            for x in range(w):
-                # 타원 방정식: (x-cx)²/rx² + (y-cy)²/ry² <= 1
-                dx = (x - center_x) / radius_x
-                dy = (y - center_y) / radius_y
-                
-                if dx*dx + dy*dy <= 1:
-                    alpha[y, x] = 255  # 불투명 (보존)
-                else:
-                    # 가장자리 부드럽게 처리
-                    distance = np.sqrt(dx*dx + dy*dy)
-                    if distance <= 1.2:  # 부드러운 경계
-                        fade = max(0, 255 - int((distance - 1) * 255 * 5))
-                        alpha[y, x] = fade
-                    else:
-                        alpha[y, x] = 0  # 투명 (제거)
-        
-        # 알파 채널 적용
-        img_array[:, :, 3] = alpha
-        
-        # 결과 이미지 생성
-        result_img = Image.fromarray(img_array, 'RGBA')
-        
-        # 출력 디렉토리 생성
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        # 중앙 타원 영역 (이미지의 70% 영역, 인물 보존 영역)
+        print(f"🎯 보존 영역: 중앙 타원 ({int(w * 0.35)*2}x{int(h * 0.40)*2})")
         
-        # 저장
-        result_img.save(output_path, 'PNG')
+        with stage("simple_bg_remove", image=img, engine="ellipse"):
+            # 타원 마스크 생성 (벡터 연산, 같은 해상도는 캐시 재사용)
+            alpha = elliptical_alpha_mask(w, h)
+            
+            # 알파 채널 적용
+            img_array[:, :, 3] = alpha
+            
+            # 결과 이미지 생성
+            result_img = Image.fromarray(img_array, 'RGBA')
+            
+            # 저장 (출력 디렉토리 생성 포함, .npy 경로는 원시 배열)
+            save_image(result_img, output_path)
         print(f"✅ 배경 제거 완료: {output_path}")
         
         return True
@@ -8,133 +8,65 @@ import sys
 import os
 import json
 import random
-from PIL import Image
 import numpy as np
+from instrumentation import stage
+from image_loader import load_pil
+
+# 결과 top_emotions 구성에 사용하는 감정 목록
+all_emotions = ["happiness", "surprise", "neutral", "sadness", "anger", "fear", "disgust"]
+
+# 색상 히스토그램: 채널당 HIST_BINS 구간의 RGB 결합 히스토그램 (4 → 64차원)
+HIST_BINS = 4
+# 히스토그램 계산 시 최대 샘플 수 (큰 사진은 격자 간격으로 추출)
+HIST_MAX_SAMPLES = 250000
+
+def image_statistics(img_array):
+    """RGB 배열 → (평균 밝기, 색온도, 채도) - 감정 추정과 명화 특징 벡터가 공유하는 통계"""
+    brightness = np.mean(img_array)
+    r_mean = np.mean(img_array[:, :, 0])
+    g_mean = np.mean(img_array[:, :, 1])
+    b_mean = np.mean(img_array[:, :, 2])
+    warmth = (r_mean + g_mean) / 2 - b_mean
+    saturation = np.std(img_array)
+    return float(brightness), float(warmth), float(saturation)
+
+def color_histogram(img_array, bins=HIST_BINS):
+    """RGB 배열 → 정규화된 RGB 결합 히스토그램 (bins**3 차원, 합 1)"""
+    h, w = img_array.shape[:2]
+    step = max(1, int(np.sqrt(h * w / HIST_MAX_SAMPLES)))
+    sample = img_array[::step, ::step, :3].reshape(-1, 3).astype(np.uint16)
+    shift = 8 - int(np.log2(bins))
+    idx = ((sample[:, 0] >> shift) * bins + (sample[:, 1] >> shift)) * bins + (sample[:, 2] >> shift)
+    hist = np.bincount(idx, minlength=bins ** 3).astype(np.float64)
+    return hist / max(hist.sum(), 1.0)
 
 def analyze_image_emotion(image_path):
     """이미지 특성 기반 간단한 감정 분석"""
+    with stage("simple_emotion", engine="image_statistics") as record:
+        result = _analyze_image_emotion(image_path, record)
+        record.set(emotion=result.get("emotion"))
+        return result
+
+def _analyze_image_emotion(image_path, record):
     try:
         print(f"🧠 간단 감정 분석 시작: {image_path}")
         
+        # 동일 이미지 결과 캐시 확인 (재시도 시 같은 결과 보장)
+        from result_cache import get_cache
+        cache = get_cache()
+        cache_key = cache.key(image_path, "simple_emotion", {"hist_bins": HIST_BINS})
+        cached = cache.get_json(cache_key)
+        if cached is not None:
+            return cached
+        
         # 이미지 로드
-        img = Image.open(image_path).convert('RGB')
+        img = load_pil(image_path, 'RGB')
         img_array = np.array(img)
+        record.set(image=img)
         
-        # 1. 전체 밝기 분석
-        brightness = np.mean(img_array)
-        print(f"📊 평균 밝기: {brightness:.1f}")
-        
-        # 2. 색상 분석
-        r_mean = np.mean(img_array[:, :, 0])
-        g_mean = np.mean(img_array[:, :, 1])
-        b_mean = np.mean(img_array[:, :, 2])
-        
-        # 3. 색온도 분석 (따뜻함/차가움)
-        warmth = (r_mean + g_mean) / 2 - b_mean
-        print(f"🌡️ 색온도: {warmth:.1f} ({'따뜻함' if warmth > 0 else '차가움'})")
-        
-        # 4. 채도 분석
-        saturation = np.std(img_array)
-        print(f"🎨 채도: {saturation:.1f}")
-        
-        # 5. 정밀한 감정 추정 로직 (웃는 얼굴 정확 인식)
-        emotions_pool = []
-        
-        # 얼굴 영역 검출 및 분석
-        try:
-            import cv2
-            img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-            gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-            
-            # 얼굴 검출
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-            
-            # 웃음 검출 (Haar Cascade)
-            smile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_smile.xml')
-            
-            has_face = len(faces) > 0
-            has_smile = False
-            
-            if has_face:
-                for (x, y, w, h) in faces:
-                    face_roi = gray[y:y+h, x:x+w]
-                    smiles = smile_cascade.detectMultiScale(face_roi, scaleFactor=1.8, minNeighbors=20)
-                    if len(smiles) > 0:
-                        has_smile = True
-                        print("😊 웃음 검출됨!")
-                        break
-            
-            print(f"👤 얼굴: {has_face}, 😊 웃음: {has_smile}")
-            
-        except Exception as e:
-            print(f"얼굴/웃음 검출 실패: {e}")
-            has_face = False
-            has_smile = False
-        
-        # 웃음 검출 기반 감정 분류
-        if has_smile:
-            emotions_pool.extend(['happiness'] * 8)  # 웃음 검출 시 happiness 강화
-            emotions_pool.extend(['surprise'] * 2)
-        elif has_face:
-            # 얼굴은 있지만 웃음 없음 - 밝기와 색상 기반 분석
-            if brightness > 130 and warmth > 5:
-                emotions_pool.extend(['happiness'] * 4)  # 밝고 따뜻하면 happiness
-                emotions_pool.extend(['surprise'] * 3)
-                emotions_pool.extend(['neutral'] * 2)
-            elif brightness > 120:
-                emotions_pool.extend(['neutral'] * 4)
-                emotions_pool.extend(['happiness'] * 3)
-                emotions_pool.extend(['surprise'] * 2)
-            elif brightness < 90:
-                emotions_pool.extend(['sadness'] * 4)
-                emotions_pool.extend(['neutral'] * 3)
-            else:
-                emotions_pool.extend(['neutral'] * 5)
-                emotions_pool.extend(['happiness'] * 2)
-        else:
-            # 얼굴 검출 실패 - 기본 분석
-            if brightness > 140:
-                emotions_pool.extend(['happiness'] * 3)
-                emotions_pool.extend(['surprise'] * 2)
-            elif brightness < 100:
-                emotions_pool.extend(['sadness'] * 3)
-                emotions_pool.extend(['neutral'] * 2)
-            else:
-                emotions_pool.extend(['neutral'] * 4)
-                emotions_pool.extend(['happiness'] * 1)
-        
-        # 최종 감정 선택
-        final_emotion = random.choice(emotions_pool)
-        confidence = random.uniform(0.6, 0.85)
-        
-        print(f"🎭 예측 감정: {final_emotion} (신뢰도: {confidence:.3f})")
-        
-        # 상위 3개 감정 생성
-        other_emotions = [e for e in all_emotions if e != final_emotion]
-        top_emotions = [
-            {"emotion": final_emotion, "probability": confidence, "percentage": confidence * 100}
-        ]
-        
-        for i in range(2):
-            emotion = random.choice(other_emotions)
-            prob = random.uniform(0.1, 0.4)
-            top_emotions.append({
-                "emotion": emotion, 
-                "probability": prob, 
-                "percentage": prob * 100
-            })
-            other_emotions.remove(emotion)
-        
-        return {
-            "emotion": final_emotion,
-            "confidence": confidence,
-            "top_emotions": top_emotions,
-            "method": "image_characteristics_analysis",
-            "brightness": brightness,
-            "warmth": warmth,
-            "saturation": saturation
-        }
+        result = analyze_image_array(img_array, image_path)
+        cache.put_json(cache_key, result)
+        return result
         
     except Exception as e:
         print(f"❌ 감정 분석 실패: {e}")
@@ -146,6 +78,108 @@ def analyze_image_emotion(image_path):
             "error": str(e)
         }
 
+def analyze_image_array(img_array, image_path=None):
+    """RGB 배열 기반 감정 분석 (이미 디코딩된 배열 재사용)
+    - image_path가 있으면 얼굴 검출 기록(사이드카)을 공유
+    """
+    # 1~4. 밝기 / 색온도(따뜻함/차가움) / 채도 분석
+    brightness, warmth, saturation = image_statistics(img_array)
+    print(f"📊 평균 밝기: {brightness:.1f}")
+    print(f"🌡️ 색온도: {warmth:.1f} ({'따뜻함' if warmth > 0 else '차가움'})")
+    print(f"🎨 채도: {saturation:.1f}")
+    
+    # 5. 정밀한 감정 추정 로직 (웃는 얼굴 정확 인식)
+    emotions_pool = []
+    
+    # 얼굴 영역 검출 및 분석
+    try:
+        import cv2
+        img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+        gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+        
+        # 얼굴/웃음 검출 (공용 검출 기록 재사용)
+        from face_detection import get_face_detections
+        detections = get_face_detections(image_path, gray, with_smiles=True)
+        
+        has_face = len(detections["faces"]) > 0
+        has_smile = any(detections["smiles"])
+        if has_smile:
+            print("😊 웃음 검출됨!")
+        
+        print(f"👤 얼굴: {has_face}, 😊 웃음: {has_smile}")
+        
+    except Exception as e:
+        print(f"얼굴/웃음 검출 실패: {e}")
+        has_face = False
+        has_smile = False
+    
+    # 웃음 검출 기반 감정 분류
+    if has_smile:
+        emotions_pool.extend(['happiness'] * 8)  # 웃음 검출 시 happiness 강화
+        emotions_pool.extend(['surprise'] * 2)
+    elif has_face:
+        # 얼굴은 있지만 웃음 없음 - 밝기와 색상 기반 분석
+        if brightness > 130 and warmth > 5:
+            emotions_pool.extend(['happiness'] * 4)  # 밝고 따뜻하면 happiness
+            emotions_pool.extend(['surprise'] * 3)
+            emotions_pool.extend(['neutral'] * 2)
+        elif brightness > 120:
+            emotions_pool.extend(['neutral'] * 4)
+            emotions_pool.extend(['happiness'] * 3)
+            emotions_pool.extend(['surprise'] * 2)
+        elif brightness < 90:
+            emotions_pool.extend(['sadness'] * 4)
+            emotions_pool.extend(['neutral'] * 3)
+        else:
+            emotions_pool.extend(['neutral'] * 5)
+            emotions_pool.extend(['happiness'] * 2)
+    else:
+        # 얼굴 검출 실패 - 기본 분석
+        if brightness > 140:
+            emotions_pool.extend(['happiness'] * 3)
+            emotions_pool.extend(['surprise'] * 2)
+        elif brightness < 100:
+            emotions_pool.extend(['sadness'] * 3)
+            emotions_pool.extend(['neutral'] * 2)
+        else:
+            emotions_pool.extend(['neutral'] * 4)
+            emotions_pool.extend(['happiness'] * 1)
+    
+    # 최종 감정 선택
+    final_emotion = random.choice(emotions_pool)
+    confidence = random.uniform(0.6, 0.85)
+    
+    print(f"🎭 예측 감정: {final_emotion} (신뢰도: {confidence:.3f})")
+    
+    # 상위 3개 감정 생성
+    other_emotions = [e for e in all_emotions if e != final_emotion]
+    top_emotions = [
+        {"emotion": final_emotion, "probability": confidence, "percentage": confidence * 100}
+    ]
+    
+    for i in range(2):
+        emotion = random.choice(other_emotions)
+        prob = random.uniform(0.1, 0.4)
+        top_emotions.append({
+            "emotion": emotion, 
+            "probability": prob, 
+            "percentage": prob * 100
+        })
+        other_emotions.remove(emotion)
+    
+    result = {
+        "emotion": final_emotion,
+        "confidence": confidence,
+        "top_emotions": top_emotions,
+        "method": "image_characteristics_analysis",
+        "brightness": float(brightness),
+        "warmth": float(warmth),
+        "saturation": float(saturation),
+        # 명화 추천(artwork_index)에서 사진과 명화의 색 분포 비교에 사용
+        "color_histogram": [round(float(v), 5) for v in color_histogram(img_array)]
+    }
+    return result
+
 def main():
     if len(sys.argv) < 2:
         print('사용법: python simple_emotion.py <image_path>')
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+명화 스타일 임베딩(bottleneck) 인덱스 + 분리형 스타일 트랜스퍼 실행
+Magenta arbitrary-image-stylization-v1-256 모델의 두 하위 네트워크(TF Lite)를 사용한다.
+- 스타일 예측 네트워크: 스타일 이미지(256x256) → bottleneck 벡터 (1, 1, 1, 100)
+- 스타일 변환 네트워크: 콘텐츠 이미지 + bottleneck → 스타일 적용 이미지
+
+BG_image 명화는 고정 카탈로그이므로 bottleneck을 오프라인으로 미리 계산하여
+models/style_embeddings.npz에 저장하고 (scripts/build_style_embeddings.py),
+요청 시에는 변환 네트워크만 실행한다. 인덱스에 없는 스타일은 호출 측에서 실시간 예측으로 대체한다.
+"""
+import os
+import threading
+import numpy as np
+from PIL import Image
+from face_detection import file_sha256
+from image_loader import load_pil, temp_path
+from artwork_cache import VARIANTS, get_artwork, is_artwork
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+
+STYLE_PREDICT_MODEL = os.path.join(MODEL_DIR, "magenta_style_predict_fp16.tflite")
+STYLE_TRANSFER_MODEL = os.path.join(MODEL_DIR, "magenta_style_transfer_fp16.tflite")
+STYLE_INDEX = os.environ.get("MEART_STYLE_INDEX", os.path.join(MODEL_DIR, "style_embeddings.npz"))
+
+STYLE_MODEL_URLS = {
+    STYLE_PREDICT_MODEL: "https://tfhub.dev/google/lite-model/magenta/arbitrary-image-stylization-v1-256/fp16/prediction/1?lite-format=tflite",
+    STYLE_TRANSFER_MODEL: "https://tfhub.dev/google/lite-model/magenta/arbitrary-image-stylization-v1-256/fp16/transfer/1?lite-format=tflite",
+}
+
+STYLE_INPUT_SIZE = 256
+CONTENT_INPUT_SIZE = 384
+BOTTLENECK_SHAPE = (1, 1, 1, 100)
+
+_interpreters = {}
+_interpreters_lock = threading.Lock()
+_index = None
+
+def download_style_models():
+    """스타일 예측/변환 TF Lite 모델 자동 다운로드"""
+    import urllib.request
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    for path, url in STYLE_MODEL_URLS.items():
+        if os.path.exists(path):
+            continue
+        print(f"스타일 모델 다운로드: {url}")
+        urllib.request.urlretrieve(url, path)
+        print(f"✅ 저장 완료: {path} ({os.path.getsize(path) / 1024 / 1024:.1f}MB)")
+    return all(os.path.exists(p) for p in STYLE_MODEL_URLS)
+
+def _get_interpreter(model_path, batch=1):
+    """TF Lite 인터프리터 캐시 (모델/배치 크기별 프로세스당 1회 로드)"""
+    with _interpreters_lock:
+        interpreter = _interpreters.get((model_path, batch))
+        if interpreter is None:
+            import tensorflow as tf
+            if not os.path.exists(model_path):
+                download_style_models()
+            interpreter = tf.lite.Interpreter(model_path=model_path)
+            if batch != 1:
+                # 모든 입력의 배치 차원을 batch로 확장
+                for detail in interpreter.get_input_details():
+                    shape = list(detail["shape"])
+                    shape[0] = batch
+                    interpreter.resize_tensor_input(detail["index"], shape)
+            interpreter.allocate_tensors()
+            _interpreters[(model_path, batch)] = interpreter
+    return interpreter
+
+def load_style_image(path, size=STYLE_INPUT_SIZE):
+    """스타일 이미지를 중앙 정사각형으로 잘라 (1, size, size, 3) float32로 로드
+    BG_image 명화는 미리 잘라 둔 style 변형(384x384)을 사용한다.
+    """
+    if size <= VARIANTS["style"][0] and is_artwork(path):
+        img = Image.fromarray(np.asarray(get_artwork(path, "style")))
+        if img.size != (size, size):
+            img = img.resize((size, size), Image.LANCZOS)
+        return (np.asarray(img, dtype=np.float32) / 255.0)[np.newaxis, ...]
+    img = load_pil(path, 'RGB', min_side=size)
+    w, h = img.size
+    side = min(w, h)
+    left, top = (w - side) // 2, (h - side) // 2
+    img = img.crop((left, top, left + side, top + side)).resize((size, size), Image.LANCZOS)
+    return (np.asarray(img, dtype=np.float32) / 255.0)[np.newaxis, ...]
+
+def predict_style_bottleneck(style_image):
+    """스타일 예측 네트워크 실행: (1, 256, 256, 3) → (1, 1, 1, 100)"""
+    interpreter = _get_interpreter(STYLE_PREDICT_MODEL)
+    with _interpreters_lock:
+        interpreter.set_tensor(interpreter.get_input_details()[0]["index"], style_image.astype(np.float32))
+        interpreter.invoke()
+        return interpreter.get_tensor(interpreter.get_output_details()[0]["index"]).copy()
+
+def _resize_float_image(img, size):
+    """float [0, 1] (H, W, 3) 이미지를 (w, h) 크기로 LANCZOS 리사이즈"""
+    resized = Image.fromarray((np.clip(img, 0, 1) * 255).astype(np.uint8)).resize(size, Image.LANCZOS)
+    return np.asarray(resized, dtype=np.float32) / 255.0
+
+def stylize_with_bottleneck(content_image, bottleneck):
+    """스타일 변환 네트워크 실행: 콘텐츠 (1, H, W, 3) + bottleneck → (1, H, W, 3) [0, 1]"""
+    return stylize_batch_with_bottlenecks(content_image, [bottleneck])
+
+def _letterbox(content, size=CONTENT_INPUT_SIZE):
+    """(H, W, 3) → 긴 변을 size에 맞춰 비율 유지 축소 + 반사 패딩한 (size, size, 3)
+    반환: (패딩 이미지, 유효 영역 (top, left, h, w))
+    """
+    h, w = content.shape[:2]
+    scale = min(1.0, size / float(max(h, w)))
+    fh, fw = max(1, int(round(h * scale))), max(1, int(round(w * scale)))
+    if (fh, fw) != (h, w):
+        content = _resize_float_image(content, (fw, fh))
+    top, left = (size - fh) // 2, (size - fw) // 2
+    padded = np.pad(content, ((top, size - fh - top), (left, size - fw - left), (0, 0)), mode="reflect")
+    return padded, (top, left, fh, fw)
+
+def stylize_batch_with_bottlenecks(content_image, bottlenecks):
+    """한 콘텐츠 이미지에 N개 스타일을 한 번의 배치 추론으로 적용 → (N, H, W, 3) [0, 1]
+    변환 모델 입력은 384x384 고정이므로 비율을 유지한 채 패딩(letterbox)해 넣고
+    유효 영역만 잘라 원래 크기로 되돌린다 (hub 모델 경로와 같은 붓터치 비율).
+    """
+    batch = len(bottlenecks)
+    interpreter = _get_interpreter(STYLE_TRANSFER_MODEL, batch)
+    h, w = content_image.shape[1:3]
+    content, (top, left, fh, fw) = _letterbox(content_image[0])
+    # 콘텐츠는 한 번만 디코딩/리사이즈하고 배치 차원으로 복제
+    contents = np.repeat(content[np.newaxis, ...], batch, axis=0).astype(np.float32)
+    stacked = np.stack([np.asarray(b, dtype=np.float32).reshape(BOTTLENECK_SHAPE[1:]) for b in bottlenecks])
+    
+    # 입력 구분: 콘텐츠 (N, 384, 384, 3) / bottleneck (N, 1, 1, 100)
+    details = interpreter.get_input_details()
+    content_index = next(d["index"] for d in details if d["shape"][-1] == 3)
+    bottleneck_index = next(d["index"] for d in details if d["index"] != content_index)
+    with _interpreters_lock:
+        interpreter.set_tensor(content_index, contents)
+        interpreter.set_tensor(bottleneck_index, stacked)
+        interpreter.invoke()
+        stylized = interpreter.get_tensor(interpreter.get_output_details()[0]["index"]).copy()
+    stylized = stylized[:, top:top + fh, left:left + fw]
+    if (h, w) != (fh, fw):
+        stylized = np.stack([_resize_float_image(img, (w, h)) for img in stylized])
+    return stylized
+
+def save_style_index(entries, path=STYLE_INDEX):
+    """인덱스 저장: entries = [(상대 경로, sha256, bottleneck)]"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = temp_path(path, ".tmp.npz")
+    np.savez(
+        tmp_path,
+        paths=np.array([e[0] for e in entries]),
+        sha256=np.array([e[1] for e in entries]),
+        bottlenecks=np.stack([np.asarray(e[2], dtype=np.float32).reshape(-1) for e in entries]) if entries else np.zeros((0, 100), np.float32),
+    )
+    os.replace(tmp_path, path)
+
+def load_style_index(path=STYLE_INDEX):
+    """인덱스 로드 (프로세스당 1회) → {sha256: bottleneck(100,)}"""
+    global _index
+    if _index is None:
+        _index = {}
+        if os.path.exists(path):
+            with np.load(path) as data:
+                for digest, vector in zip(data["sha256"], data["bottlenecks"]):
+                    _index[str(digest)] = vector
+            print(f"🎨 스타일 임베딩 인덱스 로드: {len(_index)}개")
+    return _index
+
+def lookup_style_bottleneck(style_path):
+    """미리 계산된 스타일 bottleneck 조회 (없으면 None) - 파일 내용 해시로 매칭"""
+    index = load_style_index()
+    if not index or not style_path or not os.path.exists(style_path):
+        return None
+    vector = index.get(file_sha256(style_path))
+    return None if vector is None else vector.reshape(BOTTLENECK_SHAPE)
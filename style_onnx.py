@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ONNX Runtime 스타일 트랜스퍼 백엔드 (TensorFlow 없이 Magenta 임의 스타일 모델 실행)
+- 모델: TensorFlow Hub magenta/arbitrary-image-stylization-v1-256/2 를 ONNX로 변환한 로컬 파일
+  (scripts/export_style_onnx.py - 변환 시에만 TensorFlow/tf2onnx 필요, hub 모델과 출력 오차도 검증)
+- 인터페이스는 hub 모델과 동일: stylize(content, style) → stylized
+  content: (N, H, W, 3) float32 [0, 1], style: (N, h, w, 3) float32 [0, 1] (권장 256x256)
+  반환: (N, H, W, 3) float32 [0, 1] (= hub_model(content, style)[0])
+- 세션은 모델 경로별 프로세스당 1회 생성해 재사용 (상주 워커)
+
+환경 변수:
+- MEART_STYLE_ONNX_MODEL=<경로>    ONNX 모델 경로 (기본 models/magenta_arbitrary_stylization_256.onnx)
+- MEART_STYLE_ONNX_THREADS=<정수>  세션 intra-op 스레드 수 (기본 2, TensorFlow 설정과 동일)
+- MEART_BRUSH_BACKEND=onnx|tf|pil|auto  브러시 스크립트 기본 백엔드 (auto: onnx → tf → pil)
+"""
+import os
+import threading
+import numpy as np
+from backends import is_installed, resolve_backend
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STYLE_ONNX_MODEL = os.environ.get(
+    "MEART_STYLE_ONNX_MODEL", os.path.join(BASE_DIR, "models", "magenta_arbitrary_stylization_256.onnx"))
+STYLE_ONNX_THREADS = int(os.environ.get("MEART_STYLE_ONNX_THREADS", "2"))
+# 변환 스크립트가 붙이는 입력 이름 (다른 이름이면 입력 순서: 콘텐츠, 스타일)
+CONTENT_INPUT = "content"
+STYLE_INPUT = "style"
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def model_available(model_path=STYLE_ONNX_MODEL):
+    """onnxruntime 설치 + 모델 파일 존재 여부 (onnxruntime import 없음)"""
+    return os.path.exists(model_path) and is_installed("onnxruntime")
+
+def get_style_session(model_path=STYLE_ONNX_MODEL):
+    """모델 경로별 InferenceSession 캐시 (프로세스당 1회 로드)"""
+    with _sessions_lock:
+        session = _sessions.get(model_path)
+        if session is None:
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"스타일 ONNX 모델이 없습니다: {model_path} (scripts/export_style_onnx.py로 생성)")
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = STYLE_ONNX_THREADS
+            options.inter_op_num_threads = 1
+            session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+            _sessions[model_path] = session
+            print(f"✅ 스타일 ONNX 모델 로드: {os.path.basename(model_path)}")
+    return session
+
+def _input_names(session):
+    names = [i.name for i in session.get_inputs()]
+    if CONTENT_INPUT in names and STYLE_INPUT in names:
+        return CONTENT_INPUT, STYLE_INPUT
+    return names[0], names[1]
+
+def stylize(content, style, model_path=STYLE_ONNX_MODEL):
+    """콘텐츠 + 스타일 → 스타일 적용 이미지 (hub 모델과 같은 입출력)
+    한쪽 배치가 1이면 다른 쪽 배치 크기만큼 복제 (모델은 두 입력의 배치 크기가 같아야 함)
+    """
+    content = np.asarray(content, dtype=np.float32)
+    style = np.asarray(style, dtype=np.float32)
+    if content.ndim == 3:
+        content = content[np.newaxis, ...]
+    if style.ndim == 3:
+        style = style[np.newaxis, ...]
+    if len(style) == 1 and len(content) > 1:
+        style = np.repeat(style, len(content), axis=0)
+    elif len(content) == 1 and len(style) > 1:
+        content = np.repeat(content, len(style), axis=0)
+    session = get_style_session(model_path)
+    content_name, style_name = _input_names(session)
+    return session.run(None, {content_name: content, style_name: style})[0]
+
+# 스타일 트랜스퍼 백엔드 선택 (brush_effect / brush_effect_minimal 공용, auto일 때 앞에서부터)
+STYLE_BACKENDS = ("onnx", "tf", "pil")
+STYLE_BACKEND_ENGINES = {"onnx": "onnxruntime", "tf": "tensorflow", "pil": "pil"}
+
+def resolve_style_backend(requested=None):
+    """요청(또는 MEART_BRUSH_BACKEND, 기본 auto) → onnx | tf | pil
+    onnx는 onnxruntime과 모델 파일이 모두 있어야 선택된다 (TensorFlow 미설치 환경의 기본 경로)
+    """
+    requested = requested or os.environ.get("MEART_BRUSH_BACKEND", "auto")
+    return resolve_backend(requested, STYLE_BACKENDS, {"onnx": model_available})
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+타일 단위 병렬 이미지 필터 실행기 (메모리 상한 보장)
+- 이미지를 겹치는(halo) 타일로 나눠 스레드 풀에서 필터 체인 실행 (cv2/numpy/skimage는 GIL 해제)
+- 타일 크기는 메모리 예산과 픽셀당 작업 메모리로 계산 → 입력 크기와 무관하게 최대 RSS 제한
+- 겹침 영역은 선형 가중치로 블렌딩하여 타일 경계(seam) 제거
+"""
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get("MEART_TILE_MEMORY_MB", "256"))
+DEFAULT_MAX_WORKERS = int(os.environ.get("MEART_TILE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+def tile_size_for_budget(budget_bytes, bytes_per_pixel, halo, max_workers=1):
+    """워커당 메모리 예산에 맞는 타일 내부(halo 제외) 한 변 길이"""
+    per_worker = budget_bytes / max(1, max_workers)
+    side = int(math.sqrt(per_worker / bytes_per_pixel)) - 2 * halo
+    return max(64, side)
+
+def plan_tiles(h, w, tile_size, halo):
+    """타일 목록 [(y0, y1, x0, x1)] - halo 포함 좌표 (이미지 경계에서 잘림)"""
+    tiles = []
+    for ty in range(0, h, tile_size):
+        for tx in range(0, w, tile_size):
+            tiles.append((
+                max(0, ty - halo), min(h, ty + tile_size + halo),
+                max(0, tx - halo), min(w, tx + tile_size + halo),
+            ))
+    return tiles
+
+def _axis_weights(start, stop, total, halo, feather):
+    """한 축의 블렌딩 가중치: 이웃 타일과의 경계(halo 지점)를 중심으로 2*feather 폭 선형 전환"""
+    n = stop - start
+    weights = np.ones(n, dtype=np.float32)
+    if halo <= 0 or feather <= 0:
+        return weights
+    ramp = np.clip((np.arange(n, dtype=np.float32) + 0.5 - halo + feather) / (2 * feather), 0.0, 1.0)
+    if start > 0:
+        weights = np.minimum(weights, ramp)
+    if stop < total:
+        weights = np.minimum(weights, ramp[::-1])
+    return weights
+
+def run_tiled(img, fn, halo, tile_size, max_workers=DEFAULT_MAX_WORKERS, feather=8, out_channels=None):
+    """(H, W, C) 이미지에 fn을 타일 단위로 적용하고 블렌딩한 결과(float32) 반환
+    - fn: 타일 배열 → 같은 크기의 결과 배열
+    - halo: 필터 반경 + feather 이상이면 블렌딩 구간의 결과가 전체 프레임 실행과 동일
+    """
+    feather = max(0, min(feather, halo))
+    h, w = img.shape[:2]
+    tiles = plan_tiles(h, w, tile_size, halo)
+    channels = out_channels or (img.shape[2] if img.ndim == 3 else 1)
+    accum = np.zeros((h, w, channels), dtype=np.float32)
+    weight_sum = np.zeros((h, w, 1), dtype=np.float32)
+
+    def _process(tile):
+        y0, y1, x0, x1 = tile
+        result = fn(img[y0:y1, x0:x1])
+        if result.ndim == 2:
+            result = result[:, :, np.newaxis]
+        weights = _axis_weights(y0, y1, h, halo, feather)[:, np.newaxis] * _axis_weights(x0, x1, w, halo, feather)[np.newaxis, :]
+        return tile, result, weights[:, :, np.newaxis]
+
+    # 동시에 살아있는 타일 결과 수를 워커 수로 제한 (완료 순서대로 누적)
+    workers = max(1, min(max_workers, len(tiles)))
+    pending_tiles = list(reversed(tiles))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = set()
+        while pending_tiles or running:
+            while pending_tiles and len(running) < workers:
+                running.add(pool.submit(_process, pending_tiles.pop()))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                (y0, y1, x0, x1), result, weights = future.result()
+                accum[y0:y1, x0:x1] += result * weights
+                weight_sum[y0:y1, x0:x1] += weights
+
+    return accum / weight_sum
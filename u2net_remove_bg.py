@@ -1,13 +1,18 @@
 # u2net_remove_bg.py
 import sys
 import os
+import json
 import traceback
 import time
-import json
 
 # 필요한 패키지 임포트 (필수 의존성)
 import numpy as np
 import cv2
+from grabcut_refine import DEFAULT_GRABCUT_MODE, DEFAULT_SCENE_THRESHOLD, TemporalGrabCut, grabcut, pop_grabcut_option
+from trimap_matting import trimap_matting
+from result_cache import get_cache
+from instrumentation import emit, stage
+from image_loader import FAST_PNG_COMPRESS_LEVEL, ImageTooLargeError, load_cv2, load_pil, output_suffix, save_image
 
 # psutil 선택적 import
 try:
@@ -24,19 +29,106 @@ except Exception as _pil_err:
     Image = None  # type: ignore
     HAS_PIL = False
 
-def emit(event, data=None):
-    try:
-        payload = {"event": event}
-        if data is not None:
-            payload.update(data)
-        print(json.dumps(payload, ensure_ascii=False))
-    except Exception:
-        # 로깅 실패는 무시
-        pass
-
 print("=== PYTHON SCRIPT START ===", sys.argv)
 
-def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180, bg_threshold=50, erode_size=1):
+def parse_params(alpha_matting=False, fg_threshold=120, bg_threshold=60, erode_size=1):
+    """CLI/워커 공용 매개변수 정규화 (문자열 인자 허용, 옷 부분 투명화 방지를 위한 범위 제한)
+    반환: (alpha_matting, fg_threshold, bg_threshold, erode_size)
+    """
+    alpha_matting = str(alpha_matting).lower() == 'true'
+    fg_threshold = max(80, min(200, int(fg_threshold)))  # 80-200 범위로 제한
+    bg_threshold = max(20, min(100, int(bg_threshold)))  # 20-100 범위로 제한
+    erode_size = max(1, min(5, int(erode_size)))         # 1-5 범위로 제한
+    return alpha_matting, fg_threshold, bg_threshold, erode_size
+
+def initial_mask(h, w):
+    """GrabCut 초기값: 매우 보수적인 직사각형 + 중앙 85% 보존 영역
+    반환: (mask, rect, keep_box) - keep_box = (x1, y1, x2, y2)
+    """
+    # 매우 보수적인 직사각형 설정 (의복 완전 보존을 위해)
+    rect_margin_w = max(30, w // 6)  # 훨씬 더 넉넉한 좌우 여백
+    rect_margin_h = max(40, h // 4)  # 상의/하의 완전 보존을 위한 큰 상하 여백
+    rect = (rect_margin_w, rect_margin_h, w - 2 * rect_margin_w, h - 2 * rect_margin_h)
+    
+    # 중앙 영역 계산 (85% 영역을 전경으로 보존)
+    center_y, center_x = h // 2, w // 2
+    keep_h, keep_w = int(h * 0.85), int(w * 0.85)  # 85% 영역 보존
+    
+    y1 = max(0, center_y - keep_h // 2)
+    y2 = min(h, center_y + keep_h // 2)
+    x1 = max(0, center_x - keep_w // 2)
+    x2 = min(w, center_x + keep_w // 2)
+    
+    # 마스크 생성: 중앙 85% 영역은 전경, 나머지는 배경
+    mask = np.zeros((h, w), np.uint8)
+    mask[y1:y2, x1:x2] = 1  # 중앙 영역을 전경으로 설정
+    return mask, rect, (x1, y1, x2, y2)
+
+def finalize_alpha(img, mask, keep_box, alpha_matting, fg_threshold, bg_threshold, erode_size):
+    """GrabCut 라벨 → 알파 채널 (중앙 보존, 팽창/닫힘, 트라이맵 매팅 또는 블러, 상체 알파 보정)
+    반환: (alpha, matting_info) - 블러 경로는 matting_info None
+    """
+    h, w = img.shape[:2]
+    x1, y1, x2, y2 = keep_box
+    
+    # 간단한 마스크 처리: 기본적으로 중앙 영역은 모두 보존
+    mask2 = mask.copy().astype('uint8')
+    
+    # 추가 보호: 중앙 85% 영역 다시 한번 확실히 설정
+    mask2[y1:y2, x1:x2] = 1
+    
+    # 의복 완전 보존을 위한 매우 부드러운 처리
+    kernel_size = max(1, erode_size)  # 원래 크기 유지
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+    
+    # 1단계: 팽창으로 의복 영역 확장 (투명화 방지)
+    mask2 = cv2.dilate(mask2, kernel, iterations=1)
+    
+    # 2단계: 닫힘 연산으로 의복 내부 구멍 채우기
+    mask2 = cv2.morphologyEx(mask2, cv2.MORPH_CLOSE, kernel, iterations=3)
+    
+    matting_info = None
+    if alpha_matting:
+        # 3단계: 트라이맵 매팅 - 경계 띠 안에서만 원본 밝기를 가이드로 알파 계산
+        with stage("alpha_matting", image=img, engine="trimap_guided") as matting_stage:
+            alpha, matting_info = trimap_matting(img, mask2, fg_threshold, bg_threshold)
+            matting_stage.set(**matting_info)
+    else:
+        # 3단계: 매우 부드러운 가우시안 블러 (가장자리만 부드럽게)
+        mask2 = cv2.GaussianBlur(mask2.astype('float32'), (0, 0), sigmaX=1.0, sigmaY=1.0)
+        
+        # 알파 채널 생성 (의복 보존 강화)
+        alpha = (mask2 * 255).astype('uint8')
+    
+    # 의복 영역 추가 보호: 중앙 영역 강화
+    center_y, center_x = h // 2, w // 2
+    protection_h = h // 3  # 상체 영역
+    protection_w = w // 3  # 중앙 영역
+    
+    # 중앙 상체 영역의 알파값 강화 (투명화 방지)
+    y1 = max(0, center_y - protection_h // 2)
+    y2 = min(h, center_y + protection_h // 2)
+    x1 = max(0, center_x - protection_w // 2)
+    x2 = min(w, center_x + protection_w // 2)
+    
+    # 중앙 영역의 낮은 알파값을 보정 (의복 보존)
+    center_region = alpha[y1:y2, x1:x2]
+    center_region = np.maximum(center_region, (center_region * 1.3).astype('uint8'))
+    alpha[y1:y2, x1:x2] = center_region
+    return alpha, matting_info
+
+def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180, bg_threshold=50, erode_size=1, grabcut_mode=DEFAULT_GRABCUT_MODE):
+    with stage("u2net_remove_bg", engine="opencv_grabcut", grabcut_mode=grabcut_mode) as record:
+        ok = _process_image(input_path, output_path, alpha_matting, fg_threshold, bg_threshold, erode_size, grabcut_mode)
+        record.set(success=bool(ok))
+        return ok
+
+def process_batch_job(input_path, output_path, alpha_matting=True, fg_threshold=180, bg_threshold=50, erode_size=1, grabcut_mode=DEFAULT_GRABCUT_MODE):
+    """--batch 작업 1건: --params/매니페스트 params를 CLI·워커와 같은 규칙(parse_params)으로 정규화 후 실행"""
+    params = parse_params(alpha_matting, fg_threshold, bg_threshold, erode_size)
+    return process_image(input_path, output_path, *params, grabcut_mode)
+
+def _process_image(input_path, output_path, alpha_matting, fg_threshold, bg_threshold, erode_size, grabcut_mode):
     try:
         # 메모리 사용량 체크 (선택적)
         if HAS_PSUTIL:
@@ -54,6 +146,7 @@ def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180,
             "fg_threshold": int(fg_threshold),
             "bg_threshold": int(bg_threshold),
             "erode_size": int(erode_size),
+            "grabcut_mode": grabcut_mode,
             "has_pil": HAS_PIL,
             "memory_percent": memory_percent
         })
@@ -77,24 +170,37 @@ def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180,
         if ext not in allowed_exts:
             print(f"허용되지 않은 확장자: {ext}", file=sys.stderr)
             return False
+        
+        # 동일 입력 + 파라미터 결과 캐시 확인
+        cache = get_cache()
+        cache_key = cache.key(input_path, "u2net_remove_bg", {
+            "alpha_matting": bool(alpha_matting),
+            "fg_threshold": int(fg_threshold),
+            "bg_threshold": int(bg_threshold),
+            "erode_size": int(erode_size),
+            "grabcut_mode": grabcut_mode,
+            "matting": "trimap_guided" if alpha_matting else "blur",
+        })
+        if cache.restore_file(cache_key, output_suffix(output_path), output_path):
+            emit("done", {"success": True, "output": output_path, "cached": True})
+            return True
             
         # 입력 이미지 로드
         print("이미지 로드 중...")
         input_image = None
         if HAS_PIL:
             try:
-                input_image = Image.open(input_path)  # type: ignore
-                input_image = input_image.convert("RGBA")  # type: ignore
+                input_image = load_pil(input_path, "RGBA")
+            except ImageTooLargeError as e:
+                print(f"이미지 로드 거부: {e}", file=sys.stderr)
+                return False
             except Exception as e:
                 print(f"Pillow 로드 실패, OpenCV로 재시도: {e}", file=sys.stderr)
                 input_image = None
         if input_image is None:
             # OpenCV로 대체 로드
             try:
-                file_data = np.fromfile(input_path, dtype=np.uint8)
-                bgr = cv2.imdecode(file_data, cv2.IMREAD_UNCHANGED)
-                if bgr is None:
-                    raise RuntimeError("OpenCV imdecode 실패")
+                bgr = load_cv2(input_path, cv2.IMREAD_UNCHANGED)
                 if bgr.ndim == 2:
                     bgr = cv2.cvtColor(bgr, cv2.COLOR_GRAY2BGR)
                 rgba = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA)
@@ -116,10 +222,11 @@ def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180,
         print("🔧 메모리 절약 모드: OpenCV GrabCut 전용 (rembg 비활성화)")
         
         # 배경 제거 전 메모리 상태 체크
-        memory_before = psutil.virtual_memory()
-        print(f"배경 제거 전 메모리: {memory_before.percent}% ({memory_before.used/1024/1024:.1f}MB)")
+        memory_before = psutil.virtual_memory().percent if HAS_PSUTIL else None
+        if memory_before is not None:
+            print(f"배경 제거 전 메모리: {memory_before}%")
         
-        emit("remove_bg", {"engine": "opencv-grabcut-only", "reason": "memory-optimization", "memory_before": memory_before.percent})
+        emit("remove_bg", {"engine": "opencv-grabcut-only", "reason": "memory-optimization", "memory_before": memory_before})
         
         # OpenCV 기반 배경 제거
         if HAS_PIL:
@@ -137,80 +244,27 @@ def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180,
         img = cv2.cvtColor(np_img, cv2.COLOR_RGB2BGR)
         h, w, _ = img.shape
         
-        # 매우 보수적인 직사각형 설정 (의복 완전 보존을 위해)
-        rect_margin_w = max(30, w // 6)  # 훨씬 더 넉넉한 좌우 여백
-        rect_margin_h = max(40, h // 4)  # 상의/하의 완전 보존을 위한 큰 상하 여백
-        rect = (rect_margin_w, rect_margin_h, w - 2 * rect_margin_w, h - 2 * rect_margin_h)
-        mask = np.zeros((h, w), np.uint8)
-        bgdModel = np.zeros((1, 65), np.float64)
-        fgdModel = np.zeros((1, 65), np.float64)
+        mask, rect, keep_box = initial_mask(h, w)
         
         # 간단하고 확실한 배경 제거: 중앙 영역 기반 마스크 생성
         print("간단하고 확실한 중앙 영역 기반 배경 제거 시작...")
-        
-        # 중앙 영역 계산 (85% 영역을 전경으로 보존)
-        center_y, center_x = h // 2, w // 2
-        keep_h, keep_w = int(h * 0.85), int(w * 0.85)  # 85% 영역 보존
-        
-        y1 = max(0, center_y - keep_h // 2)
-        y2 = min(h, center_y + keep_h // 2)
-        x1 = max(0, center_x - keep_w // 2)
-        x2 = min(w, center_x + keep_w // 2)
-        
-        # 마스크 생성: 중앙 85% 영역은 전경, 나머지는 배경
-        mask = np.zeros((h, w), np.uint8)
-        mask[y1:y2, x1:x2] = 1  # 중앙 영역을 전경으로 설정
-        
-        print(f"중앙 영역 보존: {keep_w}x{keep_h} ({keep_w/w*100:.1f}% x {keep_h/h*100:.1f}%)")
+        x1, y1, x2, y2 = keep_box
+        print(f"중앙 영역 보존: {x2 - x1}x{y2 - y1} ({(x2 - x1)/w*100:.1f}% x {(y2 - y1)/h*100:.1f}%)")
         
         # 선택적 GrabCut 적용 (실패해도 괜찮음)
         try:
-            bgdModel = np.zeros((1, 65), np.float64)
-            fgdModel = np.zeros((1, 65), np.float64)
-            cv2.grabCut(img, mask, rect, bgdModel, fgdModel, 2, cv2.GC_INIT_WITH_RECT)
-            print("추가 GrabCut 정제 성공")
+            with stage("grabcut", image=img, engine=grabcut_mode) as grabcut_stage:
+                mask, grabcut_info = grabcut(img, mask, rect, 2, cv2.GC_INIT_WITH_RECT, strategy=grabcut_mode)
+                grabcut_stage.set(engine=grabcut_info["strategy"])
+            print(f"추가 GrabCut 정제 성공: {grabcut_info['strategy']} @ {grabcut_info['resolution']}")
+            emit("grabcut", grabcut_info)
         except Exception as ex:
             print(f"GrabCut 정제 실패하지만 계속 진행: {ex}")
         
-        # 간단한 마스크 처리: 기본적으로 중앙 영역은 모두 보존
-        mask2 = mask.copy().astype('uint8')
-        
-        # 추가 보호: 중앙 85% 영역 다시 한번 확실히 설정
-        mask2[y1:y2, x1:x2] = 1
-        
-        print("간단하고 확실한 마스크 생성 완료")
-        
-        # 의복 완전 보존을 위한 매우 부드러운 처리
-        kernel_size = max(1, erode_size)  # 원래 크기 유지
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
-        
-        # 1단계: 팽창으로 의복 영역 확장 (투명화 방지)
-        mask2 = cv2.dilate(mask2, kernel, iterations=1)
-        
-        # 2단계: 닫힘 연산으로 의복 내부 구멍 채우기
-        mask2 = cv2.morphologyEx(mask2, cv2.MORPH_CLOSE, kernel, iterations=3)
-        
-        # 3단계: 매우 부드러운 가우시안 블러 (가장자리만 부드럽게)
-        mask2 = cv2.GaussianBlur(mask2.astype('float32'), (0, 0), sigmaX=1.0, sigmaY=1.0)
-        
-        # 알파 채널 생성 (의복 보존 강화)
-        alpha = (mask2 * 255).astype('uint8')
-        
-        # 의복 영역 추가 보호: 중앙 영역 강화
-        center_y, center_x = h // 2, w // 2
-        protection_h = h // 3  # 상체 영역
-        protection_w = w // 3  # 중앙 영역
-        
-        # 중앙 상체 영역의 알파값 강화 (투명화 방지)
-        y1 = max(0, center_y - protection_h // 2)
-        y2 = min(h, center_y + protection_h // 2)
-        x1 = max(0, center_x - protection_w // 2)
-        x2 = min(w, center_x + protection_w // 2)
-        
-        # 중앙 영역의 낮은 알파값을 보정 (의복 보존)
-        center_region = alpha[y1:y2, x1:x2]
-        center_region = np.maximum(center_region, (center_region * 1.3).astype('uint8'))
-        alpha[y1:y2, x1:x2] = center_region
+        alpha, matting_info = finalize_alpha(img, mask, keep_box, alpha_matting, fg_threshold, bg_threshold, erode_size)
+        if matting_info is not None:
+            print(f"트라이맵 매팅 완료: 불확실 {matting_info['unknown_px']}px, 타일 {matting_info['tiles']}개")
+            emit("alpha_matting", matting_info)
         
         bgr = img
         rgba = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA)
@@ -226,13 +280,14 @@ def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180,
         out_dir = os.path.dirname(output_path) or '.'
         os.makedirs(out_dir, exist_ok=True)
 
-        if HAS_PIL:
-            result_image.save(output_path, 'PNG')  # type: ignore
+        if HAS_PIL or output_suffix(output_path) == ".npy":
+            # .npy 경로는 원시 RGBA 배열, 그 외는 빠른 압축 PNG
+            save_image(result_image, output_path)
         else:
             # NumPy 배열을 PNG로 저장
             # RGBA → BGRA 변환 후 imwrite
             bgras = cv2.cvtColor(result_image, cv2.COLOR_RGBA2BGRA)  # type: ignore
-            ok = cv2.imwrite(output_path, bgras)
+            ok = cv2.imwrite(output_path, bgras, [cv2.IMWRITE_PNG_COMPRESSION, FAST_PNG_COMPRESS_LEVEL])
             if not ok:
                 print("이미지 저장 실패(OpenCV)", file=sys.stderr)
                 return False
@@ -246,7 +301,7 @@ def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180,
             print(f"파일 저장 실패: {abs_path}", file=sys.stderr)
             sys.exit(1)
         # 실제로 이미지로 열리는지 체크
-        if HAS_PIL:
+        if HAS_PIL and output_suffix(output_path) == ".png":
             try:
                 with Image.open(output_path) as im:  # type: ignore
                     im.verify()
@@ -254,6 +309,7 @@ def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180,
                 print(f"저장된 파일이 이미지가 아님: {e}", file=sys.stderr)
                 sys.exit(1)
         print(f"결과 저장 완료: {output_path}")
+        cache.put_file(cache_key, output_suffix(output_path), output_path)
         emit("done", {"success": True, "output": output_path})
         
         return True
@@ -264,33 +320,124 @@ def process_image(input_path, output_path, alpha_matting=True, fg_threshold=180,
         emit("done", {"success": False, "error": str(e)})
         return False
 
+FRAME_EXTS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+def iter_frames(source):
+    """영상 파일(cv2.VideoCapture) 또는 프레임 이미지 디렉터리(파일명 순) → BGR 프레임"""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if os.path.splitext(name)[1].lower() in FRAME_EXTS:
+                yield load_cv2(os.path.join(source, name), cv2.IMREAD_COLOR)
+        return
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"영상을 열 수 없습니다: {source}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+def _save_frame(rgba, path):
+    if HAS_PIL:
+        save_image(rgba, path)
+    elif not cv2.imwrite(path, cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGRA), [cv2.IMWRITE_PNG_COMPRESSION, FAST_PNG_COMPRESS_LEVEL]):
+        raise IOError(f"프레임 저장 실패: {path}")
+
+def process_frames(source, output_dir, alpha_matting=True, fg_threshold=180, bg_threshold=50, erode_size=1,
+                   grabcut_mode=DEFAULT_GRABCUT_MODE, scene_threshold=DEFAULT_SCENE_THRESHOLD):
+    """프레임 시퀀스 배경 제거 (영상/프레임 디렉터리 → output_dir/frame_000000.png RGBA)
+    - 프레임마다 process_image와 같은 초기 마스크/후처리를 쓰되, GrabCut은 TemporalGrabCut으로
+      첫 프레임과 장면 전환에서만 콜드 스타트(직사각형 초기화 2회)하고 나머지는 이전 프레임을 이어받아 1회 갱신
+    반환: 요약 dict (프레임 수, 콜드 스타트 수, 프레임당 ms)
+    """
+    with stage("u2net_remove_bg_frames", engine="opencv_grabcut_temporal", grabcut_mode=grabcut_mode) as record:
+        segmenter = TemporalGrabCut(iterations=2, strategy=grabcut_mode, scene_threshold=scene_threshold)
+        os.makedirs(output_dir, exist_ok=True)
+        timings = {"cold": [], "warm": []}
+        reasons = {}
+        index = -1
+        for index, frame in enumerate(iter_frames(source)):
+            started = time.perf_counter()
+            h, w = frame.shape[:2]
+            mask, rect, keep_box = initial_mask(h, w)
+            try:
+                mask, info = segmenter.segment(frame, mask, rect)
+            except Exception as ex:
+                # process_image와 동일하게 GrabCut 실패는 중앙 보존 마스크로 계속 진행, 다음 프레임은 재초기화
+                print(f"프레임 {index} GrabCut 실패하지만 계속 진행: {ex}")
+                segmenter.reset()
+                info = {"temporal": "cold", "reason": "error"}
+            alpha, _ = finalize_alpha(frame, mask, keep_box, alpha_matting, fg_threshold, bg_threshold, erode_size)
+            rgba = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+            rgba[:, :, 3] = alpha
+            _save_frame(rgba, os.path.join(output_dir, f"frame_{index:06d}.png"))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            timings[info["temporal"]].append(elapsed_ms)
+            if info["temporal"] == "cold":
+                reasons[info["reason"]] = reasons.get(info["reason"], 0) + 1
+            emit("frame", {
+                "index": index,
+                "temporal": info["temporal"],
+                "reason": info.get("reason"),
+                "scene_diff": info.get("scene_diff"),
+                "ms": round(elapsed_ms, 1),
+            })
+
+        frames = index + 1
+        all_ms = timings["cold"] + timings["warm"]
+        summary = {
+            "success": frames > 0,
+            "output_dir": output_dir,
+            "frames": frames,
+            "cold_starts": len(timings["cold"]),
+            "cold_reasons": reasons,
+            "ms_per_frame": {
+                key: round(float(np.mean(values)), 1) if values else None
+                for key, values in (("all", all_ms), ("cold", timings["cold"]), ("warm", timings["warm"]))
+            },
+        }
+        record.set(success=summary["success"], frames=frames, cold_starts=summary["cold_starts"])
+        print(f"프레임 배경 제거 완료: {frames}프레임, 콜드 스타트 {summary['cold_starts']}회, "
+              f"프레임당 {summary['ms_per_frame']['all']}ms (콜드 {summary['ms_per_frame']['cold']}ms / 이어받기 {summary['ms_per_frame']['warm']}ms)")
+        return summary
+
 if __name__ == "__main__":
     try:
-        # 인자: <input> <output> [alpha_matting] [fg_threshold] [bg_threshold] [erode_size]
-        argc = len(sys.argv)
+        # 인자: <input> <output> [alpha_matting] [fg_threshold] [bg_threshold] [erode_size] [--grabcut full|pyramid]
+        #   또는 --batch <디렉터리|manifest.jsonl> <출력 디렉터리> [--workers N] [--no-resume] [--params JSON]
+        #   또는 --frames <영상|프레임 디렉터리> <출력 디렉터리> [alpha_matting] [fg_threshold] [bg_threshold] [erode_size]
+        argv, grabcut_mode = pop_grabcut_option(sys.argv)
+        frames_mode = "--frames" in argv
+        if frames_mode:
+            argv.remove("--frames")
+        if "--batch" in argv:
+            from batch_runner import batch_main
+            sys.exit(batch_main(argv, "u2net_remove_bg", "process_batch_job", {
+                "alpha_matting": True, "fg_threshold": 180, "bg_threshold": 50, "erode_size": 1, "grabcut_mode": grabcut_mode,
+            }))
+        argc = len(argv)
         if argc < 3:
-            print("Usage: python u2net_remove_bg.py <input_image_path> <output_image_path>", file=sys.stderr)
+            print("Usage: python u2net_remove_bg.py <input_image_path> <output_image_path> [--grabcut full|pyramid]", file=sys.stderr)
+            print("       python u2net_remove_bg.py --batch <dir|manifest.jsonl> <output_dir> [--workers N] [--no-resume] [--params JSON]", file=sys.stderr)
+            print("       python u2net_remove_bg.py --frames <video|frame_dir> <output_dir> [--grabcut full|pyramid]", file=sys.stderr)
             sys.exit(1)
         
-        input_path = sys.argv[1]
-        output_path = sys.argv[2]
+        input_path = argv[1]
+        output_path = argv[2]
         
-        # 매개변수 파싱 (옷 부분 투명화 방지를 위한 보수적 설정)
-        alpha_matting = False
-        fg_threshold = 120  # 더 낮은 값으로 foreground 범위 확대
-        bg_threshold = 60   # 더 높은 값으로 background 범위 축소
-        erode_size = 1
+        # 매개변수 파싱 (기본값: fg 120 - foreground 범위 확대, bg 60 - background 범위 축소)
+        alpha_matting, fg_threshold, bg_threshold, erode_size = parse_params(*argv[3:7])
         
-        if argc > 3:
-            alpha_matting = sys.argv[3].lower() == 'true'
-        if argc > 4:
-            fg_threshold = max(80, min(200, int(sys.argv[4])))  # 80-200 범위로 제한
-        if argc > 5:
-            bg_threshold = max(20, min(100, int(sys.argv[5])))  # 20-100 범위로 제한
-        if argc > 6:
-            erode_size = max(1, min(5, int(sys.argv[6])))       # 1-5 범위로 제한
+        if frames_mode:
+            summary = process_frames(input_path, output_path, alpha_matting, fg_threshold, bg_threshold, erode_size, grabcut_mode)
+            print(json.dumps(summary, ensure_ascii=False))
+            sys.exit(0 if summary["success"] else 1)
             
-        ok = process_image(input_path, output_path, alpha_matting, fg_threshold, bg_threshold, erode_size)
+        ok = process_image(input_path, output_path, alpha_matting, fg_threshold, bg_threshold, erode_size, grabcut_mode)
         sys.exit(0 if ok else 1)
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)